@@ -95,9 +95,29 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, "DB.sqlite3"),
+        'OPTIONS': {
+            # Plusieurs workers de scraping écrivent en même temps : prendre le verrou
+            # d'écriture dès le début de chaque transaction (attente : voir SQLITE_PROFIL)
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# PRAGMA appliqués à chaque connexion (voir Commentaires/sqlite_profil.py) :
+# 'concurrent' (WAL, synchronous=NORMAL, busy_timeout, cache, mmap), 'aucun' ou un dictionnaire
+SQLITE_PROFIL = 'concurrent'
+
+
+# Scraping LeFaso.net (politesse envers le serveur)
+SCRAPER_CONCURRENCE = 4             # téléchargements simultanés
+SCRAPER_REQUETES_PAR_SECONDE = 0.5  # débit maximal par hôte
+SCRAPER_RAFALE = 1                  # requêtes autorisées d'un coup par hôte
+SCRAPER_TIMEOUT = 30                # délai maximal par URL (secondes)
+SCRAPER_CACHE_DIR = os.path.join(BASE_DIR, 'cache_html')  # pages brutes (None pour désactiver)
+SCRAPER_PARSER = 'auto'             # 'auto' (lxml si installé), 'html.parser', 'lxml' ou 'selectolax'
+SCRAPER_SOURCE = None               # rejeu hors ligne : répertoire de pages HTML, cache ou archive WARC
+SCRAPER_PROCESSUS_ANALYSE = None    # processus d'analyse HTML (None : un par cœur, 0 : dans le thread de scraping)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
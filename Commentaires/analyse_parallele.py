@@ -0,0 +1,153 @@
+"""
+Analyse des pages LeFaso.net dans un pool de processus
+Description: Le téléchargement (AsyncFetcher, limité par le réseau) tourne dans un
+thread ; l'analyse HTML (limitée par le processeur et le GIL) est confiée à un pool
+de processus qui reçoit les octets bruts et renvoie le dictionnaire de l'article.
+L'écriture en base reste dans le processus principal.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    from .html_cache import HTMLCache
+    from .lefaso_scraper import LefasoCommentScraper
+except ImportError:
+    # Exécution en script depuis le dossier Commentaires
+    from html_cache import HTMLCache
+    from lefaso_scraper import LefasoCommentScraper
+
+# Scraper propre à chaque processus de travail (créé une fois par _initialiser)
+_scraper = None
+
+
+def _initialiser(parser: str, cache_dir: Optional[str], silencieux: bool):
+    global _scraper
+    if silencieux:
+        sys.stdout = open(os.devnull, 'w')
+    _scraper = LefasoCommentScraper(cache=HTMLCache(cache_dir) if cache_dir else None, parser=parser)
+
+
+def _analyser(url: str, contenu: bytes, hash_connu: Optional[str] = None) -> Tuple[Dict[str, Any], float]:
+    debut = time.perf_counter()
+    try:
+        data = _scraper.scrape_article_from_html(url, contenu, hash_connu)
+    except Exception as e:
+        data = {'erreur': f"Erreur d'analyse: {e}", 'url': url}
+    return data, time.perf_counter() - debut
+
+
+class AnalyseurParallele:
+    """
+    Analyse les pages téléchargées dans un pool de processus
+
+    Utilisation:
+        with AnalyseurParallele(processus=4, cache_dir=...) as analyseur:
+            for page, data in analyseur.iter_analyses(fetcher.iter_resultats(urls)):
+                ...
+
+    data est le résultat de LefasoCommentScraper.scrape_article_from_html, ou
+    {'erreur', 'url'} si le téléchargement a échoué. La durée de l'analyse
+    (secondes, mesurée dans le processus d'analyse) est ajoutée à la page
+    sous la clé 'duree_analyse'. Une page portant 'hash_commentaires_connu'
+    (empreinte enregistrée en base) est ignorée si ses commentaires n'ont pas changé.
+    """
+
+    def __init__(self, processus: Optional[int] = None, parser: str = 'auto', cache_dir: Optional[str] = None,
+                 en_vol: Optional[int] = None, silencieux: bool = True):
+        """
+        Args:
+            processus (int): Nombre de processus d'analyse (None : un par cœur, 0 : analyse dans le processus courant)
+            parser (str): Moteur d'analyse HTML (voir LefasoCommentScraper.PARSERS)
+            cache_dir (str): Répertoire du cache HTML, pour ignorer les fils inchangés
+            en_vol (int): Nombre maximal de pages en attente d'analyse (défaut: 2 par processus)
+            silencieux (bool): Masquer les messages des processus d'analyse
+        """
+        self.processus = (os.cpu_count() or 1) if processus is None else processus
+        self.parser = LefasoCommentScraper.resolve_parser(parser)
+        self.cache_dir = cache_dir
+        self.en_vol = en_vol or 2 * max(self.processus, 1)
+        self.silencieux = silencieux
+        self.executor = None
+
+    def __enter__(self) -> 'AnalyseurParallele':
+        if self.processus > 0:
+            # forkserver : pas de fork d'un processus où tourne déjà le thread de téléchargement
+            methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processus,
+                mp_context=multiprocessing.get_context(methode),
+                initializer=_initialiser,
+                initargs=(self.parser, self.cache_dir, self.silencieux),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def iter_analyses(self, pages: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Rend (page, data) pour chaque page, dans l'ordre où les analyses se terminent
+
+        Au plus `en_vol` pages sont confiées au pool à la fois ; les suivantes
+        attendent que des analyses se terminent (et leurs résultats consommés).
+
+        Args:
+            pages (Iterable[Dict]): Résultats d'AsyncFetcher (url, contenu, erreur, ...)
+        """
+        if self.executor is None:
+            # Analyse dans le processus courant (petits lots, tests)
+            scraper = LefasoCommentScraper(cache=HTMLCache(self.cache_dir) if self.cache_dir else None, parser=self.parser)
+            for page in pages:
+                page['duree_analyse'] = 0.0
+                if page['erreur']:
+                    yield page, {'erreur': page['erreur'], 'url': page['url']}
+                    continue
+                debut = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()) if self.silencieux else contextlib.nullcontext():
+                    data = scraper.scrape_article_from_html(page['url'], page['contenu'], page.get('hash_commentaires_connu'))
+                page['duree_analyse'] = time.perf_counter() - debut
+                yield page, data
+            return
+
+        en_cours = {}
+        for page in pages:
+            page['duree_analyse'] = 0.0
+            if page['erreur']:
+                yield page, {'erreur': page['erreur'], 'url': page['url']}
+                continue
+
+            try:
+                future = self.executor.submit(_analyser, page['url'], page['contenu'], page.get('hash_commentaires_connu'))
+            except BrokenProcessPool as e:
+                yield page, {'erreur': f"Erreur d'analyse: {e}", 'url': page['url']}
+                continue
+            # Les octets sont dans le pool : inutile de les garder ici
+            en_cours[future] = {cle: valeur for cle, valeur in page.items() if cle != 'contenu'}
+            if len(en_cours) >= self.en_vol:
+                yield from self._recuperer(en_cours)
+
+        while en_cours:
+            yield from self._recuperer(en_cours)
+
+    def _recuperer(self, en_cours: Dict) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Rend les analyses terminées (attend au moins la première)"""
+        terminees, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+        for future in terminees:
+            page = en_cours.pop(future)
+            try:
+                data, page['duree_analyse'] = future.result()
+            except Exception as e:
+                # Processus d'analyse interrompu (BrokenProcessPool, ...)
+                yield page, {'erreur': f"Erreur d'analyse: {e}", 'url': page['url']}
+                continue
+            yield page, data
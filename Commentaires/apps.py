@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CommentairesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Commentaires'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, pre_delete
+        from .models import Article, Commentaire, article_supprime, commentaire_supprime
+        from .sqlite_profil import appliquer_profil
+
+        connection_created.connect(appliquer_profil, dispatch_uid='Commentaires.sqlite_profil')
+        pre_delete.connect(article_supprime, sender=Article, dispatch_uid='Commentaires.article_supprime')
+        post_delete.connect(commentaire_supprime, sender=Commentaire, dispatch_uid='Commentaires.commentaire_supprime')
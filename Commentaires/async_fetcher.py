@@ -0,0 +1,282 @@
+"""
+Téléchargement concurrent des articles LeFaso.net
+Description: Moteur asyncio (aiohttp) qui télécharge un lot d'URLs avec une limite
+de concurrence, un débit maximal par hôte (seau à jetons) et un délai par URL.
+Les résultats sont rendus au fur et à mesure de leur arrivée.
+
+Une réponse 429 suspend l'hôte pendant la durée de l'en-tête Retry-After et divise
+son débit par deux ; le débit remonte ensuite progressivement à chaque succès.
+Les seaux par hôte vivent au niveau du module : d'un lot (et d'un AsyncFetcher)
+à l'autre, un worker garde le même débit et les mêmes suspensions.
+"""
+
+import asyncio
+import email.utils
+import queue
+import random
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Seau à jetons : `debit` requêtes par seconde en moyenne, rafales de `capacite`
+
+    L'état (jetons, débit courant, fin de suspension) survit aux boucles asyncio :
+    il est protégé par un verrou de thread, seul le verrou asyncio (qui ordonne les
+    attentes) est propre à chaque boucle.
+    """
+
+    def __init__(self, debit: float, capacite: int = 1, debit_min: Optional[float] = None):
+        self.debit_nominal = debit
+        self.debit = debit
+        self.debit_min = debit_min if debit_min is not None else debit / 16
+        self.capacite = capacite
+        self.jetons = float(capacite)
+        self.mise_a_jour = time.monotonic()
+        self.reprise = 0.0
+        self.etat = threading.Lock()
+        self._verrous = weakref.WeakKeyDictionary()
+
+    def _verrou(self) -> asyncio.Lock:
+        """Verrou asyncio de la boucle courante"""
+        boucle = asyncio.get_running_loop()
+        with self.etat:
+            verrou = self._verrous.get(boucle)
+            if verrou is None:
+                verrou = self._verrous[boucle] = asyncio.Lock()
+            return verrou
+
+    def _prendre_jeton(self) -> float:
+        """Prend un jeton s'il y en a un (renvoie 0), sinon renvoie l'attente nécessaire en secondes"""
+        maintenant = time.monotonic()
+        if maintenant < self.reprise:
+            # Hôte suspendu après un 429 : aucun jeton pendant la pause
+            self.mise_a_jour = self.reprise
+            return self.reprise - maintenant
+        self.jetons = min(self.capacite, self.jetons + max(maintenant - self.mise_a_jour, 0.0) * self.debit)
+        self.mise_a_jour = maintenant
+        if self.jetons >= 1:
+            self.jetons -= 1
+            return 0.0
+        return (1 - self.jetons) / self.debit
+
+    async def acquerir(self):
+        async with self._verrou():
+            while True:
+                with self.etat:
+                    attente = self._prendre_jeton()
+                if attente <= 0:
+                    return
+                await asyncio.sleep(attente)
+
+    def ralentir(self, delai: float = 0.0):
+        """429 reçu : suspend l'hôte `delai` secondes et divise son débit par deux (jusqu'à debit_min)"""
+        with self.etat:
+            self.debit = max(self.debit / 2, self.debit_min)
+            self.reprise = max(self.reprise, time.monotonic() + delai)
+
+    def retablir(self):
+        """Succès : le débit remonte d'un dixième du débit nominal, sans le dépasser"""
+        with self.etat:
+            self.debit = min(self.debit_nominal, self.debit + self.debit_nominal / 10)
+
+
+# Seaux par hôte, partagés par tous les AsyncFetcher du processus : la politesse envers
+# un hôte (et un ralentissement après 429) ne repart pas de zéro à chaque lot
+_seaux: Dict[Tuple[str, float, int], TokenBucket] = {}
+_seaux_verrou = threading.Lock()
+
+
+def seau_hote(hote: str, debit: float, capacite: int = 1) -> TokenBucket:
+    """Seau à jetons de l'hôte pour cette configuration de débit, créé au premier appel"""
+    with _seaux_verrou:
+        cle = (hote, debit, capacite)
+        if cle not in _seaux:
+            _seaux[cle] = TokenBucket(debit, capacite)
+        return _seaux[cle]
+
+
+class AsyncFetcher:
+    """
+    Télécharge des pages en parallèle en restant poli envers chaque hôte
+
+    Chaque résultat est un dictionnaire :
+    {'url', 'statut', 'contenu', 'octets', 'duree', 'tentatives', 'erreur'}
+    """
+
+    STATUTS_A_REESSAYER = (429, 500, 502, 503, 504)
+    # Pause maximale accordée à un Retry-After (secondes)
+    RETRY_AFTER_MAX = 120.0
+
+    def __init__(self, concurrence: int = 4, requetes_par_seconde: float = 1.0, rafale: int = 1,
+                 timeout: float = 30, tentatives: int = 2, backoff_factor: float = 0.5,
+                 headers: Optional[Dict[str, str]] = None, cache=None, source=None):
+        """
+        Args:
+            concurrence (int): Nombre maximal de téléchargements simultanés
+            requetes_par_seconde (float): Débit maximal par hôte
+            rafale (int): Nombre de requêtes autorisées d'un coup par hôte
+            timeout (float): Délai maximal par URL (secondes)
+            tentatives (int): Nouvelles tentatives sur 429/5xx et erreurs réseau
+            backoff_factor (float): Base de l'attente exponentielle entre tentatives
+            headers (Dict): En-têtes HTTP (ex: ceux de LefasoCommentScraper.session)
+            cache (HTMLCache): Cache disque pour les requêtes conditionnelles, optionnel
+            source: Source locale (voir source_locale.ouvrir_source) remplaçant le réseau, optionnelle
+        """
+        self.concurrence = concurrence
+        self.requetes_par_seconde = requetes_par_seconde
+        self.rafale = rafale
+        self.timeout = timeout
+        self.tentatives = tentatives
+        self.backoff_factor = backoff_factor
+        self.headers = dict(headers or {})
+        # aiohttp ne décode le brotli que si le paquet optionnel est installé
+        self.headers['Accept-Encoding'] = 'gzip, deflate'
+        self.cache = cache
+        self.source = source
+
+    def seau_pour(self, url: str) -> TokenBucket:
+        return seau_hote(urlsplit(url).netloc, self.requetes_par_seconde, self.rafale)
+
+    def delai_backoff(self, tentative: int) -> float:
+        """Backoff exponentiel avec jitter"""
+        return self.backoff_factor * (2 ** tentative) + random.uniform(0, self.backoff_factor)
+
+    async def attendre_avant_tentative(self, tentative: int):
+        await asyncio.sleep(self.delai_backoff(tentative))
+
+    @staticmethod
+    def delai_retry_after(valeur: Optional[str]) -> Optional[float]:
+        """Délai en secondes d'un en-tête Retry-After (nombre de secondes ou date HTTP), None s'il est absent ou invalide"""
+        if not valeur:
+            return None
+        valeur = valeur.strip()
+        if valeur.isdigit():
+            return float(valeur)
+        try:
+            date = email.utils.parsedate_to_datetime(valeur)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+    async def fetch(self, session, semaphore: asyncio.Semaphore, url: str) -> Dict[str, Any]:
+        """Télécharge une URL (avec nouvelles tentatives) et renvoie son résultat"""
+        import aiohttp
+
+        resultat = {'url': url, 'statut': None, 'contenu': None, 'octets': 0, 'duree': 0.0, 'tentatives': 0, 'erreur': None}
+
+        if self.source is not None:
+            # Rejeu hors ligne : ni réseau ni limitation de débit
+            debut = time.perf_counter()
+            contenu = await asyncio.to_thread(self.source.lire, url)
+            resultat.update(
+                statut=200 if contenu is not None else 404,
+                contenu=contenu,
+                octets=len(contenu or b''),
+                duree=time.perf_counter() - debut,
+                tentatives=1,
+                erreur=None if contenu is not None else "Page absente de la source locale",
+            )
+            return resultat
+        seau = self.seau_pour(url)
+        en_tetes = self.cache.en_tetes_conditionnels(url) if self.cache else {}
+
+        async with semaphore:
+            for tentative in range(self.tentatives + 1):
+                await seau.acquerir()
+                resultat['tentatives'] = tentative + 1
+                debut = time.perf_counter()
+                try:
+                    async with session.get(url, headers=en_tetes, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+                        contenu = await response.read()
+                    resultat['duree'] = time.perf_counter() - debut
+                    resultat['statut'] = response.status
+
+                    if response.status == 429:
+                        # Hôte saturé : pause demandée par le serveur (sinon backoff) et débit réduit,
+                        # pour cette URL comme pour toutes celles du même hôte
+                        delai = self.delai_retry_after(response.headers.get('Retry-After'))
+                        seau.ralentir(min(delai, self.RETRY_AFTER_MAX) if delai is not None else self.delai_backoff(tentative))
+                        if tentative < self.tentatives:
+                            continue
+                    elif response.status in self.STATUTS_A_REESSAYER and tentative < self.tentatives:
+                        await self.attendre_avant_tentative(tentative)
+                        continue
+                    elif response.status < 400:
+                        seau.retablir()
+
+                    if response.status == 304 and self.cache:
+                        # Page inchangée : contenu repris du cache
+                        self.cache.revalider(url)
+                        resultat['contenu'] = self.cache.lire(url)
+                        resultat['erreur'] = None if resultat['contenu'] is not None else "Cache introuvable"
+                    elif response.status >= 400:
+                        resultat['erreur'] = f"HTTP {response.status}"
+                    else:
+                        resultat['contenu'] = contenu
+                        resultat['octets'] = len(contenu)
+                        resultat['erreur'] = None
+                        if self.cache:
+                            self.cache.enregistrer(url, contenu, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                    return resultat
+
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    resultat['duree'] = time.perf_counter() - debut
+                    resultat['erreur'] = str(e) or e.__class__.__name__
+                    if tentative < self.tentatives:
+                        await self.attendre_avant_tentative(tentative)
+                        continue
+                    return resultat
+
+        return resultat
+
+    async def iter_fetch(self, urls: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Générateur asynchrone : rend chaque résultat dès qu'il est disponible"""
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(self.concurrence)
+        connector = aiohttp.TCPConnector(limit=self.concurrence)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector) as session:
+            taches = [asyncio.ensure_future(self.fetch(session, semaphore, url)) for url in urls]
+            for tache in asyncio.as_completed(taches):
+                yield await tache
+
+    def iter_resultats(self, urls: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Version synchrone de iter_fetch, utilisable depuis du code Django
+
+        La boucle asyncio tourne dans un thread dédié ; l'appelant (parsing,
+        écriture en base) consomme les résultats au fil de l'eau.
+        """
+        urls = list(urls)
+        resultats = queue.Queue()
+        fin = object()
+
+        def executer():
+            async def consommer():
+                async for resultat in self.iter_fetch(urls):
+                    resultats.put(resultat)
+            try:
+                asyncio.run(consommer())
+            except Exception as e:
+                resultats.put(e)
+            finally:
+                resultats.put(fin)
+
+        thread = threading.Thread(target=executer, daemon=True)
+        thread.start()
+
+        while True:
+            element = resultats.get()
+            if element is fin:
+                break
+            if isinstance(element, Exception):
+                raise element
+            yield element
@@ -0,0 +1,93 @@
+"""
+Analyse des dates françaises de LeFaso.net
+Description: Convertit les dates textuelles des articles ("mardi 22 avril 2025 à 21h35min")
+et des commentaires ("22 avril 11:40", souvent sans année) en datetimes indexables
+"""
+
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from django.utils import timezone
+
+MOIS = {
+    'janvier': 1, 'fevrier': 2, 'mars': 3, 'avril': 4, 'mai': 5, 'juin': 6,
+    'juillet': 7, 'aout': 8, 'septembre': 9, 'octobre': 10, 'novembre': 11, 'decembre': 12,
+}
+
+# "[mardi] 22 avril [2025] [à] 21h35[min]" ou "1er avril 09:37"
+DATE_PATTERN = re.compile(
+    r'(\d{1,2})(?:er)?\s+([a-z]+)\.?\s+(?:(\d{4})\s+)?(?:a\s+)?(\d{1,2})\s*[h:]\s*(\d{2})'
+)
+
+
+def _normaliser(texte: str) -> str:
+    """Minuscules sans accents (février -> fevrier, à -> a)"""
+    texte = unicodedata.normalize('NFKD', texte.lower())
+    return ''.join(c for c in texte if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=8192)
+def decomposer_date(texte: str) -> Optional[Tuple[int, int, Optional[int], int, int]]:
+    """
+    Décompose une date française en (jour, mois, année ou None, heure, minute)
+
+    Les chaînes identiques (très fréquentes dans un même fil) ne sont analysées qu'une fois.
+    """
+    if not texte:
+        return None
+
+    match = DATE_PATTERN.search(_normaliser(texte))
+    if not match:
+        return None
+
+    jour, nom_mois, annee, heure, minute = match.groups()
+    mois = MOIS.get(nom_mois)
+    if mois is None:
+        return None
+
+    return int(jour), mois, int(annee) if annee else None, int(heure), int(minute)
+
+
+def _construire(annee: int, mois: int, jour: int, heure: int, minute: int) -> Optional[datetime]:
+    try:
+        return timezone.make_aware(datetime(annee, mois, jour, heure, minute), timezone.get_default_timezone())
+    except ValueError:
+        return None
+
+
+def parse_date_article(texte: str) -> Optional[datetime]:
+    """Convertit la date de publication d'un article (année toujours présente)"""
+    parties = decomposer_date(texte)
+    if not parties or parties[2] is None:
+        return None
+
+    jour, mois, annee, heure, minute = parties
+    return _construire(annee, mois, jour, heure, minute)
+
+
+def parse_date_commentaire(texte: str, date_article: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Convertit la date d'un commentaire
+
+    Sans année explicite, l'année est déduite de l'article parent : un commentaire
+    daté avant la publication de l'article appartient à l'année suivante
+    (article de décembre commenté en janvier).
+    """
+    parties = decomposer_date(texte)
+    if not parties:
+        return None
+
+    jour, mois, annee, heure, minute = parties
+    if annee is not None:
+        return _construire(annee, mois, jour, heure, minute)
+
+    if date_article is None:
+        return None
+
+    date = _construire(date_article.year, mois, jour, heure, minute)
+    if date is not None and (mois, jour) < (date_article.month, date_article.day):
+        date = _construire(date_article.year + 1, mois, jour, heure, minute)
+    return date
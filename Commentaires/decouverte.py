@@ -0,0 +1,140 @@
+"""
+Découverte automatique des articles LeFaso.net
+Description: Parcourt les pages de rubriques (et leur pagination), le flux RSS et le
+plan du site, extrait les liens spip.php?articleNNN directement dans le HTML brut et
+les met en file dans URLStorage par insertion groupée.
+
+Le dédoublonnage se fait en mémoire avec un bitmap des numéros d'articles (un bit par
+numéro, environ 20 Ko pour 160 000 articles) : aucune requête exists() par URL.
+"""
+
+import html
+import re
+from collections import deque
+from typing import Iterable, Iterator, List, Optional, Set
+
+BASE_URL = "https://lefaso.net"
+URL_RSS = f"{BASE_URL}/spip.php?page=backend"
+URL_PLAN = f"{BASE_URL}/sitemap.xml"
+
+_LIEN_ARTICLE = re.compile(rb'spip\.php\?article(\d+)')
+_LIEN_RUBRIQUE = re.compile(rb'spip\.php\?rubrique(\d+)(?:&(?:amp;)?(debut_\w+=\d+))?')
+
+
+def url_article(numero: int) -> str:
+    """URL canonique d'un article"""
+    return f"{BASE_URL}/spip.php?article{numero}"
+
+
+def url_rubrique(numero: int, pagination: Optional[str] = None) -> str:
+    """URL d'une page de rubrique (pagination SPIP : debut_articles=20, ...)"""
+    return f"{BASE_URL}/spip.php?rubrique{numero}" + (f"&{pagination}" if pagination else "")
+
+
+def numero_article(url: str) -> Optional[int]:
+    correspondance = _LIEN_ARTICLE.search(url.encode('utf-8'))
+    return int(correspondance.group(1)) if correspondance else None
+
+
+def extraire_articles(contenu: bytes) -> Set[int]:
+    """Numéros des articles cités dans une page (HTML, RSS ou sitemap), sans construire d'arbre"""
+    return {int(numero) for numero in _LIEN_ARTICLE.findall(contenu)}
+
+
+def extraire_pages_rubrique(contenu: bytes, rubriques: Set[int]) -> Set[str]:
+    """Pages de pagination des rubriques suivies, citées dans une page"""
+    pages = set()
+    for numero, pagination in _LIEN_RUBRIQUE.findall(contenu):
+        if int(numero) in rubriques:
+            pages.add(url_rubrique(int(numero), html.unescape(pagination.decode('ascii')) or None))
+    return pages
+
+
+class BitmapArticles:
+    """Ensemble de numéros d'articles : un bit par numéro, agrandi à la demande"""
+
+    def __init__(self, numeros: Iterable[int] = ()):
+        self.bits = bytearray()
+        self.taille = 0
+        for numero in numeros:
+            self.ajouter(numero)
+
+    def __contains__(self, numero: int) -> bool:
+        octet = numero >> 3
+        return octet < len(self.bits) and bool(self.bits[octet] & (1 << (numero & 7)))
+
+    def ajouter(self, numero: int) -> bool:
+        """Ajoute le numéro ; renvoie False s'il était déjà présent"""
+        octet = numero >> 3
+        if octet >= len(self.bits):
+            self.bits.extend(bytes(max(octet + 1 - len(self.bits), len(self.bits))))
+        masque = 1 << (numero & 7)
+        if self.bits[octet] & masque:
+            return False
+        self.bits[octet] |= masque
+        self.taille += 1
+        return True
+
+    def __len__(self):
+        return self.taille
+
+
+class CrawlerDecouverte:
+    """
+    Parcourt les pages de listes et rend les URLs d'articles jamais vues
+
+    Les pages sont téléchargées par vagues avec AsyncFetcher (concurrence et
+    débit par hôte limités) ; la frontière des pages de listes est dédoublonnée
+    par un ensemble d'URLs, les articles par le bitmap.
+    """
+
+    def __init__(self, fetcher, connus: Optional[BitmapArticles] = None, rubriques: Iterable[int] = (),
+                 rss: bool = True, plan: bool = True, max_pages: int = 50):
+        """
+        Args:
+            fetcher (AsyncFetcher): Téléchargeur (éventuellement sur une source locale)
+            connus (BitmapArticles): Articles déjà en file ou en base
+            rubriques (Iterable[int]): Rubriques à parcourir, pagination comprise
+            rss (bool): Lire le flux RSS du site
+            plan (bool): Lire le plan du site (sitemap.xml)
+            max_pages (int): Nombre maximal de pages de listes téléchargées
+        """
+        self.fetcher = fetcher
+        self.connus = connus if connus is not None else BitmapArticles()
+        self.rubriques = set(rubriques)
+        self.max_pages = max_pages
+        self.frontiere = deque(url_rubrique(numero) for numero in sorted(self.rubriques))
+        if rss:
+            self.frontiere.appendleft(URL_RSS)
+        if plan:
+            self.frontiere.appendleft(URL_PLAN)
+        self.pages_vues = set(self.frontiere)
+        self.statistiques = {'pages': 0, 'erreurs': 0, 'liens': 0, 'nouveaux': 0}
+
+    def iter_nouveaux(self) -> Iterator[str]:
+        """Rend l'URL canonique de chaque article découvert pour la première fois"""
+        while self.frontiere and self.statistiques['pages'] < self.max_pages:
+            taille_vague = min(len(self.frontiere), self.max_pages - self.statistiques['pages'], max(self.fetcher.concurrence * 2, 1))
+            vague = [self.frontiere.popleft() for _ in range(taille_vague)]
+
+            for page in self.fetcher.iter_resultats(vague):
+                self.statistiques['pages'] += 1
+                if page['erreur'] or not page['contenu']:
+                    self.statistiques['erreurs'] += 1
+                    print(f"⚠️ {page['url']} : {page['erreur']}")
+                    continue
+
+                numeros = extraire_articles(page['contenu'])
+                self.statistiques['liens'] += len(numeros)
+                for numero in sorted(numeros, reverse=True):
+                    if self.connus.ajouter(numero):
+                        self.statistiques['nouveaux'] += 1
+                        yield url_article(numero)
+
+                for suivante in extraire_pages_rubrique(page['contenu'], self.rubriques):
+                    if suivante not in self.pages_vues:
+                        self.pages_vues.add(suivante)
+                        self.frontiere.append(suivante)
+
+    def decouvrir(self) -> List[str]:
+        return list(self.iter_nouveaux())
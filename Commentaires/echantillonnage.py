@@ -0,0 +1,110 @@
+"""
+Échantillonnage stratifié pour l'analyse approximative des sentiments
+Description: Tire un échantillon de commentaires stratifié par article (allocation
+proportionnelle au nombre de commentaires), ordonné pour que tout préfixe reste
+représentatif, et estime les pourcentages de sentiments avec intervalles de confiance.
+"""
+
+import random
+from statistics import NormalDist
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+LABELS = ('POSITIVE', 'NEGATIVE', 'NEUTRAL')
+
+
+def plan_stratifie(strates: Dict[Hashable, Sequence[Any]], taille: int, rng: Optional[random.Random] = None) -> List[Tuple[Hashable, Any]]:
+    """
+    Construit l'ordre de traitement d'un échantillon stratifié
+
+    Args:
+        strates (Dict): {strate: identifiants des commentaires}
+        taille (int): Taille totale de l'échantillon
+        rng (random.Random): Générateur (reproductibilité)
+
+    Returns:
+        List[Tuple]: Couples (strate, identifiant) ; chaque préfixe respecte
+        approximativement l'allocation proportionnelle
+    """
+    rng = rng or random.Random()
+    population = sum(len(ids) for ids in strates.values())
+    if population == 0:
+        return []
+    taille = min(taille, population)
+
+    ordre = []
+    for strate, ids in strates.items():
+        if not ids:
+            continue
+        # Allocation proportionnelle, au moins un commentaire par article
+        n_h = min(len(ids), max(1, round(taille * len(ids) / population)))
+        for k, identifiant in enumerate(rng.sample(list(ids), n_h)):
+            # Position (k + U) / n_h : les strates avancent au même rythme relatif
+            ordre.append(((k + rng.random()) / n_h, strate, identifiant))
+
+    ordre.sort(key=lambda element: element[0])
+    return [(strate, identifiant) for _, strate, identifiant in ordre]
+
+
+class EstimateurStratifie:
+    """Estimateur stratifié des proportions de chaque label, avec correction de population finie"""
+
+    def __init__(self, tailles_strates: Dict[Hashable, int]):
+        self.tailles = {strate: taille for strate, taille in tailles_strates.items() if taille}
+        self.population = sum(self.tailles.values())
+        self.comptes = {strate: dict.fromkeys(LABELS, 0) for strate in self.tailles}
+        self.observes = dict.fromkeys(self.tailles, 0)
+
+    def ajouter(self, strate: Hashable, label: str):
+        label = label if label in LABELS else 'NEUTRAL'
+        self.comptes[strate][label] += 1
+        self.observes[strate] += 1
+
+    @property
+    def taille_echantillon(self) -> int:
+        return sum(self.observes.values())
+
+    def estimation(self, confiance: float = 0.95) -> Dict[str, Any]:
+        """
+        Pourcentages estimés et intervalles de confiance (approximation normale)
+
+        Les strates pas encore échantillonnées sont exclues et les poids renormalisés.
+        """
+        z = NormalDist().inv_cdf((1 + confiance) / 2)
+        strates = [strate for strate, n_h in self.observes.items() if n_h]
+        couverte = sum(self.tailles[strate] for strate in strates)
+
+        resultat = {
+            'echantillon': self.taille_echantillon,
+            'population': self.population,
+            'confiance': confiance,
+            'exact': self.taille_echantillon == self.population,
+            'intervalles': {},
+        }
+        noms = {'POSITIVE': 'positif', 'NEGATIVE': 'negatif', 'NEUTRAL': 'neutre'}
+
+        for label, nom in noms.items():
+            if not couverte:
+                resultat[nom] = 0.0
+                resultat['intervalles'][nom] = [0.0, 100.0]
+                continue
+
+            proportion = 0.0
+            variance = 0.0
+            for strate in strates:
+                n_h = self.observes[strate]
+                N_h = self.tailles[strate]
+                w_h = N_h / couverte
+                p_h = self.comptes[strate][label] / n_h
+                proportion += w_h * p_h
+                # Une seule observation : variance bornée par le cas le plus défavorable
+                s2 = p_h * (1 - p_h) * n_h / (n_h - 1) if n_h > 1 else 0.25
+                variance += w_h * w_h * (1 - n_h / N_h) * s2 / n_h
+
+            marge = z * variance ** 0.5
+            resultat[nom] = round(proportion * 100, 1)
+            resultat['intervalles'][nom] = [
+                round(max(0.0, proportion - marge) * 100, 1),
+                round(min(1.0, proportion + marge) * 100, 1),
+            ]
+
+        return resultat
@@ -0,0 +1,143 @@
+"""
+Cache disque des pages LeFaso.net
+Description: Stocke les réponses brutes compressées, adressées par leur contenu (sha256,
+dédupliquées), avec pour chaque URL les validateurs HTTP (ETag, Last-Modified) pour
+les requêtes conditionnelles et l'empreinte de la section des commentaires déjà analysée.
+Les pages mises en cache peuvent être rejouées sans réseau.
+
+Arborescence:
+    <repertoire>/objets/ab/abcdef....html.gz   contenu compressé
+    <repertoire>/urls/<sha1(url)>.json         métadonnées de l'URL
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+_BALISES_UL = re.compile(rb'<ul\b|</ul\s*>', re.IGNORECASE)
+_DEBUT_FORUM = re.compile(rb'<ul\b[^>]*\bid=["\']?navforum\b', re.IGNORECASE)
+
+
+def extraire_section_commentaires(contenu: bytes) -> Optional[bytes]:
+    """
+    Découpe le HTML brut de ul#navforum sans construire d'arbre
+
+    Les balises <ul> imbriquées (réponses) sont comptées pour trouver la fermeture.
+    """
+    debut = _DEBUT_FORUM.search(contenu)
+    if not debut:
+        return None
+
+    profondeur = 0
+    for balise in _BALISES_UL.finditer(contenu, debut.start()):
+        if balise.group().startswith(b'</'):
+            profondeur -= 1
+            if profondeur == 0:
+                return contenu[debut.start():balise.end()]
+        else:
+            profondeur += 1
+    return contenu[debut.start():]
+
+
+def hash_commentaires(contenu: bytes) -> Optional[str]:
+    """Empreinte de la section des commentaires (None si la page n'en a pas)"""
+    section = extraire_section_commentaires(contenu)
+    return hashlib.sha256(section).hexdigest() if section is not None else None
+
+
+class HTMLCache:
+    """Cache des réponses HTTP brutes, adressé par contenu"""
+
+    def __init__(self, repertoire: str):
+        self.repertoire = repertoire
+        os.makedirs(os.path.join(repertoire, 'objets'), exist_ok=True)
+        os.makedirs(os.path.join(repertoire, 'urls'), exist_ok=True)
+
+    def _chemin_url(self, url: str) -> str:
+        return os.path.join(self.repertoire, 'urls', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _chemin_objet(self, empreinte: str) -> str:
+        return os.path.join(self.repertoire, 'objets', empreinte[:2], empreinte + '.html.gz')
+
+    def _ecrire(self, chemin: str, octets: bytes):
+        """Écriture atomique (fichier temporaire puis renommage)"""
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin))
+        with os.fdopen(descripteur, 'wb') as f:
+            f.write(octets)
+        os.replace(temporaire, chemin)
+
+    def entree(self, url: str) -> Optional[Dict[str, Any]]:
+        """Métadonnées de l'URL, ou None si elle n'a jamais été mise en cache"""
+        try:
+            with open(self._chemin_url(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _enregistrer_entree(self, entree: Dict[str, Any]):
+        self._ecrire(self._chemin_url(entree['url']), json.dumps(entree, ensure_ascii=False).encode('utf-8'))
+
+    def lire(self, url: str) -> Optional[bytes]:
+        """Contenu brut mis en cache pour l'URL"""
+        entree = self.entree(url)
+        if not entree or not entree.get('contenu'):
+            return None
+        try:
+            with gzip.open(self._chemin_objet(entree['contenu']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def en_tetes_conditionnels(self, url: str) -> Dict[str, str]:
+        """En-têtes If-None-Match / If-Modified-Since pour revalider l'URL"""
+        entree = self.entree(url)
+        if not entree or not entree.get('contenu') or not os.path.exists(self._chemin_objet(entree['contenu'])):
+            return {}
+
+        en_tetes = {}
+        if entree.get('etag'):
+            en_tetes['If-None-Match'] = entree['etag']
+        if entree.get('last_modified'):
+            en_tetes['If-Modified-Since'] = entree['last_modified']
+        return en_tetes
+
+    def enregistrer(self, url: str, contenu: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, Any]:
+        """Stocke une réponse 200 ; le contenu identique n'est écrit qu'une fois"""
+        empreinte = hashlib.sha256(contenu).hexdigest()
+        chemin = self._chemin_objet(empreinte)
+        if not os.path.exists(chemin):
+            self._ecrire(chemin, gzip.compress(contenu))
+
+        entree = self.entree(url) or {'url': url}
+        entree.update({
+            'contenu': empreinte,
+            'etag': etag,
+            'last_modified': last_modified,
+            'date': datetime.now().isoformat(),
+        })
+        self._enregistrer_entree(entree)
+        return entree
+
+    def revalider(self, url: str):
+        """Note une réponse 304 : le contenu en cache est toujours valide"""
+        entree = self.entree(url)
+        if entree:
+            entree['date'] = datetime.now().isoformat()
+            self._enregistrer_entree(entree)
+
+    def hash_commentaires_analyse(self, url: str) -> Optional[str]:
+        """Empreinte de la section des commentaires lors de la dernière analyse"""
+        entree = self.entree(url)
+        return entree.get('hash_commentaires') if entree else None
+
+    def marquer_analyse(self, url: str, empreinte: Optional[str]):
+        """Mémorise l'empreinte de la section des commentaires analysée"""
+        entree = self.entree(url) or {'url': url, 'contenu': None}
+        entree['hash_commentaires'] = empreinte
+        self._enregistrer_entree(entree)
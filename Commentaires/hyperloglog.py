@@ -0,0 +1,81 @@
+"""
+Sketches HyperLogLog pour le décompte approché des auteurs distincts
+Description: Registres compacts (2 Ko) fusionnables par maximum, stockés par article
+et par jour dans ActiviteJournaliere, pour estimer le nombre de commentateurs
+uniques sur n'importe quelle sélection sans COUNT(DISTINCT auteur).
+
+Erreur: l'erreur type relative vaut 1.04 / sqrt(m) avec m = 2**PRECISION registres,
+soit environ 2.3 % pour PRECISION = 11 (≈ 95 % des estimations à ± 4.6 %).
+En dessous de 2.5 * m valeurs, la correction « linear counting » est utilisée et
+l'estimation est quasi exacte pour les petites sélections.
+"""
+
+import hashlib
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+PRECISION = 11
+NB_REGISTRES = 1 << PRECISION
+ERREUR_RELATIVE = 1.04 / math.sqrt(NB_REGISTRES)
+
+_BITS_RESTANTS = 64 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / NB_REGISTRES)
+
+
+def _hacher(valeur: str) -> int:
+    return int.from_bytes(hashlib.blake2b(valeur.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog dense (un octet par registre)"""
+
+    def __init__(self, registres: Optional[bytes] = None):
+        if registres:
+            self.registres = np.frombuffer(registres, dtype=np.uint8).copy()
+        else:
+            self.registres = np.zeros(NB_REGISTRES, dtype=np.uint8)
+
+    def ajouter(self, valeur: str):
+        """Ajoute une valeur (nom d'auteur normalisé) au sketch"""
+        h = _hacher(valeur)
+        index = h >> _BITS_RESTANTS
+        reste = h & ((1 << _BITS_RESTANTS) - 1)
+        rang = _BITS_RESTANTS - reste.bit_length() + 1
+        if rang > self.registres[index]:
+            self.registres[index] = rang
+
+    def fusionner(self, autre: 'HyperLogLog') -> 'HyperLogLog':
+        """Union en place : maximum registre par registre"""
+        np.maximum(self.registres, autre.registres, out=self.registres)
+        return self
+
+    @classmethod
+    def union(cls, sketches: Iterable[Optional[bytes]]) -> 'HyperLogLog':
+        """Fusionne des sketches sérialisés (les valeurs vides sont ignorées)"""
+        resultat = cls()
+        for octets in sketches:
+            if octets:
+                np.maximum(resultat.registres, np.frombuffer(octets, dtype=np.uint8), out=resultat.registres)
+        return resultat
+
+    def estimation(self) -> int:
+        """Nombre estimé de valeurs distinctes"""
+        registres_vides = int(np.count_nonzero(self.registres == 0))
+        if registres_vides == NB_REGISTRES:
+            return 0
+
+        brute = _ALPHA * NB_REGISTRES * NB_REGISTRES / float(np.sum(np.exp2(-self.registres.astype(np.float64))))
+        if brute <= 2.5 * NB_REGISTRES and registres_vides:
+            return int(round(NB_REGISTRES * math.log(NB_REGISTRES / registres_vides)))
+        return int(round(brute))
+
+    def est_vide(self) -> bool:
+        return not self.registres.any()
+
+    def octets(self) -> bytes:
+        return self.registres.tobytes()
+
+    def __len__(self):
+        return self.estimation()
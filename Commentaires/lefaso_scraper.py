@@ -6,26 +6,92 @@ Description: Ce script scrape les commentaires d'articles de LeFaso.net et les s
 """
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import BeautifulSoup, Tag, UnicodeDammit
 import pandas as pd
 import json
 from datetime import datetime
 import re
 import os
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Any, TypedDict
+
+try:
+    from .html_cache import HTMLCache, hash_commentaires
+except ImportError:
+    # Exécution en script depuis le dossier Commentaires
+    from html_cache import HTMLCache, hash_commentaires
+
+# Moteurs d'analyse HTML optionnels (plus rapides que html.parser)
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+class CommentRecord(TypedDict):
+    """Commentaire (ou réponse) à plat, tel que rendu par LefasoCommentScraper.iter_comments"""
+    url_article: str
+    fil: int                      # id_commentaire du commentaire principal du fil
+    id_commentaire: int           # rang dans l'article (commentaire) ou dans le fil (réponse)
+    auteur: str
+    date_publication: str
+    contenu: str
+    type: str                     # 'commentaire' ou 'reponse'
+    longueur_contenu: int
+    mots_contenu: int
+    timestamp_extraction: str
+    profondeur: int               # 0 pour le commentaire principal
+    parent_id: Optional[int]      # rang de la réponse parente, None si réponse au commentaire principal
+
 
 class LefasoCommentScraper:
     """
     Classe principale pour scraper et structurer les commentaires de LeFaso.net
     """
     
-    def __init__(self):
-        """Initialise le scraper avec les paramètres de base"""
+    # Codes HTTP pour lesquels une nouvelle tentative est faite
+    STATUTS_A_REESSAYER = (429, 500, 502, 503, 504)
+    
+    # Moteurs d'analyse disponibles ('auto' : lxml si installé, sinon html.parser)
+    PARSERS = ('auto', 'html.parser', 'lxml', 'selectolax')
+    
+    # Classes du contenu d'un commentaire, par ordre de priorité
+    CONTENT_CLASSES = ('ugccmt-commenttext', 'forum-texte', 'comment-text', 'comment-content', 'commentaire-texte')
+    
+    def __init__(self, pool_size: int = 10, timeout: tuple = (5, 30), max_retries: int = 3, backoff_factor: float = 0.5,
+                 cache: Optional[HTMLCache] = None, parser: str = 'auto', source=None):
+        """
+        Initialise le scraper avec les paramètres de base
+        
+        Args:
+            pool_size (int): Nombre de connexions conservées (keep-alive) par hôte
+            timeout (tuple): Délais (connexion, lecture) en secondes
+            max_retries (int): Nombre maximal de nouvelles tentatives
+            backoff_factor (float): Base de l'attente exponentielle entre tentatives
+            cache (HTMLCache): Cache disque des pages (requêtes conditionnelles), optionnel
+            parser (str): Moteur d'analyse HTML ('auto', 'html.parser', 'lxml', 'selectolax')
+            source: Source locale (voir source_locale.ouvrir_source) remplaçant le réseau, optionnelle
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.source = source
+        self.parser = self.resolve_parser(parser)
         self.session = requests.Session()
         self.setup_headers()
+        self.setup_adapter(pool_size, max_retries, backoff_factor)
         self.base_url = "https://lefaso.net"
         self.dataframe = None
         
+        # Mesures des requêtes HTTP
+        self.derniere_requete = None
+        self.statistiques_requetes = {'requetes': 0, 'erreurs': 0, 'octets': 0, 'duree': 0.0}
+        
     def setup_headers(self):
         """Configure les en-têtes HTTP pour simuler un navigateur réel"""
         self.session.headers.update({
@@ -37,25 +103,186 @@ class LefasoCommentScraper:
             'Upgrade-Insecure-Requests': '1',
         })
     
-    def fetch_page(self, url: str) -> Optional[BeautifulSoup]:
+    def setup_adapter(self, pool_size: int, max_retries: int, backoff_factor: float):
+        """Monte un pool de connexions avec nouvelles tentatives (backoff exponentiel + jitter)"""
+        options = {
+            'total': max_retries,
+            'connect': max_retries,
+            'read': max_retries,
+            'status': max_retries,
+            'backoff_factor': backoff_factor,
+            'status_forcelist': self.STATUTS_A_REESSAYER,
+            'allowed_methods': frozenset(['GET', 'HEAD']),
+            'respect_retry_after_header': True,
+            'raise_on_status': False,
+        }
+        try:
+            retry = Retry(backoff_jitter=backoff_factor, **options)
+        except TypeError:
+            # urllib3 < 2 : pas de jitter natif
+            retry = Retry(**options)
+        
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
+    def enregistrer_requete(self, url: str, statut: Optional[int], octets: int, duree: float, tentatives: int = 1):
+        """Mémorise la latence et le volume de la dernière requête et cumule les totaux"""
+        self.derniere_requete = {
+            'url': url,
+            'statut': statut,
+            'octets': octets,
+            'duree': duree,
+            'tentatives': tentatives,
+        }
+        self.statistiques_requetes['requetes'] += 1
+        self.statistiques_requetes['octets'] += octets
+        self.statistiques_requetes['duree'] += duree
+        if statut is None or statut >= 400:
+            self.statistiques_requetes['erreurs'] += 1
+    
+    def fetch_content(self, url: str) -> Optional[bytes]:
         """
-        Récupère le contenu HTML d'une page
+        Récupère le contenu HTML brut d'une page
+        
+        Avec un cache, la requête est conditionnelle (If-None-Match / If-Modified-Since)
+        et une réponse 304 renvoie le contenu déjà stocké. Avec une source locale,
+        la page est lue dans la source sans accès réseau.
         
         Args:
             url (str): URL de la page à scraper
             
         Returns:
-            Optional[BeautifulSoup]: Objet BeautifulSoup ou None en cas d'erreur
+            Optional[bytes]: Contenu brut ou None en cas d'erreur
         """
+        debut = time.perf_counter()
+        if self.source is not None:
+            contenu = self.source.lire(url)
+            self.enregistrer_requete(url, 200 if contenu is not None else 404, len(contenu or b''), time.perf_counter() - debut)
+            if contenu is None:
+                print(f"❌ Page absente de la source locale: {url}")
+            return contenu
+        
         try:
             print(f"📡 Récupération de la page: {url}")
-            response = requests.get(url, headers=self.setup_headers())
+            en_tetes = self.cache.en_tetes_conditionnels(url) if self.cache else {}
+            response = self.session.get(url, timeout=self.timeout, headers=en_tetes)
+            retries = getattr(response.raw, 'retries', None)
+            tentatives = len(retries.history) + 1 if retries is not None else 1
+            self.enregistrer_requete(url, response.status_code, len(response.content), time.perf_counter() - debut, tentatives)
+            print(f"⏱️ {response.status_code} - {len(response.content)} octets en {self.derniere_requete['duree']:.2f}s")
+            
+            if response.status_code == 304 and self.cache:
+                print("♻️ Page inchangée, contenu repris du cache")
+                self.cache.revalider(url)
+                return self.cache.lire(url)
+            
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            if self.cache:
+                self.cache.enregistrer(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return response.content
         except requests.RequestException as e:
+            if getattr(e, 'response', None) is None:
+                self.enregistrer_requete(url, None, 0, time.perf_counter() - debut)
             print(f"❌ Erreur lors de la récupération de la page: {e}")
             return None
     
+    def fetch_page(self, url: str) -> Optional[BeautifulSoup]:
+        """
+        Récupère le contenu HTML d'une page
+        
+        Args:
+            url (str): URL de la page à scraper
+            
+        Returns:
+            Optional[BeautifulSoup]: Objet BeautifulSoup ou None en cas d'erreur
+        """
+        content = self.fetch_content(url)
+        if content is None:
+            return None
+        return self.parse_html(content)
+    
+    @staticmethod
+    def resolve_parser(parser: str) -> str:
+        """Vérifie le moteur demandé et résout 'auto' selon les paquets installés"""
+        if parser not in LefasoCommentScraper.PARSERS:
+            raise ValueError(f"Moteur d'analyse inconnu: {parser} (attendu: {', '.join(LefasoCommentScraper.PARSERS)})")
+        if parser == 'auto':
+            return 'lxml' if lxml is not None else 'html.parser'
+        if parser == 'lxml' and lxml is None:
+            raise ImportError("Le moteur 'lxml' nécessite le paquet lxml")
+        if parser == 'selectolax' and SelectolaxParser is None:
+            raise ImportError("Le moteur 'selectolax' nécessite le paquet selectolax")
+        return parser
+    
+    def parse_html(self, content: bytes) -> BeautifulSoup:
+        """
+        Construit l'arbre HTML d'une page déjà téléchargée
+        
+        Avec lxml ou selectolax, seules les régions utiles (titres h1.entry-title,
+        paragraphe « Publié le », div#hierarchie et ul#navforum) sont extraites
+        puis reconstruites en un petit arbre BeautifulSoup ; le reste de la page
+        n'est jamais converti en objets Python.
+        
+        Args:
+            content (bytes): Contenu brut de la réponse HTTP
+            
+        Returns:
+            BeautifulSoup: Objet BeautifulSoup de la page (ou des régions utiles)
+        """
+        if self.parser != 'html.parser':
+            try:
+                fragments = self.extract_regions(content)
+                if fragments is not None:
+                    return BeautifulSoup(''.join(fragments), 'lxml' if lxml is not None else 'html.parser')
+            except Exception as e:
+                print(f"⚠️ Analyse rapide impossible ({self.parser}), analyse complète: {e}")
+        
+        # Page atypique (pas de ul#navforum) : arbre complet pour les sélecteurs de secours
+        return BeautifulSoup(content, 'html.parser')
+    
+    def extract_regions(self, content: bytes) -> Optional[List[str]]:
+        """
+        Extrait le HTML des régions utiles avec le moteur rapide
+        
+        Args:
+            content (bytes): Contenu brut de la page
+            
+        Returns:
+            Optional[List[str]]: Fragments HTML dans l'ordre du document, ou None si
+            la page n'a pas de ul#navforum
+        """
+        markup = UnicodeDammit(content, is_html=True).unicode_markup
+        
+        if self.parser == 'selectolax':
+            tree = SelectolaxParser(markup)
+            navforum = tree.css_first('ul#navforum')
+            if navforum is None:
+                return None
+            titres = [node.html for node in tree.css('h1.entry-title')]
+            publie = next((node.html for node in tree.css('p') if 'Publié le' in node.text(deep=True)), None)
+            hierarchie = tree.css_first('div#hierarchie')
+            fragments = titres + [publie, hierarchie.html if hierarchie is not None else None, navforum.html]
+        else:
+            tree = lxml.html.document_fromstring(markup)
+            navforum = tree.xpath('//ul[@id="navforum"]')
+            if not navforum:
+                return None
+            
+            def html(element):
+                return lxml.html.tostring(element, encoding='unicode', with_tail=False)
+            
+            titres = [html(e) for e in tree.xpath('//h1[contains(concat(" ", normalize-space(@class), " "), " entry-title ")]')]
+            publie = tree.xpath('(//p[contains(., "Publié le")])[1]')
+            hierarchie = tree.xpath('//div[@id="hierarchie"]')
+            fragments = titres + [
+                html(publie[0]) if publie else None,
+                html(hierarchie[0]) if hierarchie else None,
+                html(navforum[0]),
+            ]
+        
+        return [fragment for fragment in fragments if fragment]
+    
     def extract_article_info(self, soup: BeautifulSoup) -> Dict[str, Any]:
         """
         Extrait les informations principales de l'article
@@ -183,29 +410,80 @@ class LefasoCommentScraper:
             
         return auteur, date
     
-    def extract_comment_content(self, comment_element) -> str:
+    def walk_thread(self, racine) -> Iterator[Dict[str, Any]]:
+        """
+        Parcourt un fil de discussion en une seule passe
+        
+        Chaque <li> du fil (le commentaire racine puis ses réponses, à toute
+        profondeur, dans l'ordre du document) est rendu une seule fois. Les
+        descendants propres d'un <li> sont visités une fois pour y repérer
+        l'en-tête et le contenu ; les <ul> imbriqués ne sont pas parcourus avec
+        lui mais donnent les <li> suivants du fil.
+        
+        Args:
+            racine: Élément <li> du commentaire principal
+            
+        Yields:
+            Dict: {'element', 'rang' (0 pour la racine), 'profondeur', 'parent'
+            (rang du parent, None pour la racine), 'chapo', 'contenus'}
+        """
+        pile = [(racine, 0, None)]
+        rang = 0
+        
+        while pile:
+            element, profondeur, parent = pile.pop()
+            noeud = {
+                'element': element,
+                'rang': rang,
+                'profondeur': profondeur,
+                'parent': parent,
+                'chapo': None,
+                'contenus': {},
+            }
+            enfants = []
+            
+            a_visiter = [enfant for enfant in reversed(element.contents) if isinstance(enfant, Tag)]
+            while a_visiter:
+                tag = a_visiter.pop()
+                if tag.name == 'ul':
+                    # Liste de réponses : ses <li> sont des nœuds du fil
+                    enfants.extend(tag.find_all('li', recursive=False))
+                    continue
+                
+                classes = tag.get('class') or ()
+                if noeud['chapo'] is None and tag.name == 'div' and 'forum-chapo' in classes:
+                    noeud['chapo'] = tag
+                for classe in self.CONTENT_CLASSES:
+                    if classe in classes and classe not in noeud['contenus']:
+                        noeud['contenus'][classe] = tag
+                
+                a_visiter.extend(enfant for enfant in reversed(tag.contents) if isinstance(enfant, Tag))
+            
+            yield noeud
+            
+            for enfant in reversed(enfants):
+                pile.append((enfant, profondeur + 1, rang))
+            rang += 1
+    
+    def extract_comment_content(self, comment_element, noeud: Optional[Dict[str, Any]] = None) -> str:
         """
         Extrait le contenu textuel d'un commentaire
         
         Args:
             comment_element: Élément HTML du commentaire
+            noeud (Dict): Nœud rendu par walk_thread (contenus déjà repérés), optionnel
             
         Returns:
             str: Contenu nettoyé du commentaire
         """
         content = ""
         
-        # Sélecteurs prioritaires pour le contenu
-        content_selectors = [
-            '.ugccmt-commenttext',
-            '.forum-texte',
-            '.comment-text',
-            '.comment-content',
-            '.commentaire-texte'
-        ]
-        
-        for selector in content_selectors:
-            content_elem = comment_element.select_one(selector)
+        # Classes prioritaires pour le contenu
+        for classe in self.CONTENT_CLASSES:
+            if noeud is not None:
+                content_elem = noeud['contenus'].get(classe)
+            else:
+                content_elem = comment_element.select_one(f'.{classe}')
             if content_elem:
                 content = content_elem.get_text(strip=True)
                 if content and len(content) > 10:  # Vérifier que le contenu est significatif
@@ -227,42 +505,61 @@ class LefasoCommentScraper:
         
         return self.clean_text(content)
     
-    def extract_replies(self, comment_element) -> List[Dict[str, str]]:
+    def iter_replies(self, comment_element, noeuds: Optional[Iterator[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Extrait les réponses à un commentaire
+        Rend les réponses à un commentaire au fur et à mesure du parcours du fil
         
         Args:
             comment_element: Élément HTML du commentaire parent
+            noeuds (Iterator): Suite de walk_thread après la racine, optionnelle
             
-        Returns:
-            List[Dict]: Liste des réponses structurées
+        Yields:
+            Dict: Réponse structurée, une seule fois, avec sa profondeur et le
+            rang de son parent dans le fil
         """
-        replies = []
-        
         try:
-            # Les réponses peuvent être dans différentes structures
-            reply_containers = [
-                comment_element.find('ul'),
-                comment_element.find('div', class_=re.compile(r'reply|reponse')),
-                comment_element.find_next_sibling('div', class_=re.compile(r'reply|reponse'))
-            ]
+            if noeuds is None:
+                noeuds = self.walk_thread(comment_element)
+                next(noeuds)  # la racine est le commentaire lui-même
             
-            for container in reply_containers:
+            trouve = False
+            for noeud in noeuds:
+                trouve = True
+                reply_data = self.parse_single_comment(noeud['element'], noeud['rang'], is_reply=True, noeud=noeud)
+                if reply_data and reply_data.get('contenu'):
+                    reply_data['profondeur'] = noeud['profondeur']
+                    reply_data['parent_id'] = noeud['parent'] or None  # None : réponse au commentaire principal
+                    yield reply_data
+            
+            if not trouve:
+                # Autres structures : réponses dans un bloc div
+                container = (comment_element.find('div', class_=re.compile(r'reply|reponse'))
+                             or comment_element.find_next_sibling('div', class_=re.compile(r'reply|reponse')))
                 if container:
-                    reply_items = container.find_all('li') if container.name == 'ul' else [container]
-                    
-                    for i, reply_item in enumerate(reply_items, 1):
-                        reply_data = self.parse_single_comment(reply_item, i, is_reply=True)
-                        if reply_data and reply_data.get('contenu'):
-                            replies.append(reply_data)
-                    break  # Prendre le premier container valide
+                    reply_data = self.parse_single_comment(container, 1, is_reply=True)
+                    if reply_data and reply_data.get('contenu'):
+                        reply_data['profondeur'] = 1
+                        reply_data['parent_id'] = None
+                        yield reply_data
                         
         except Exception as e:
             print(f"⚠️ Erreur extraction réponses: {e}")
+    
+    def extract_replies(self, comment_element, noeuds: Optional[Iterator[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Extrait les réponses à un commentaire
+        
+        Args:
+            comment_element: Élément HTML du commentaire parent
+            noeuds (Iterator): Suite de walk_thread après la racine, optionnelle
             
-        return replies
+        Returns:
+            List[Dict]: Liste des réponses structurées
+        """
+        return list(self.iter_replies(comment_element, noeuds))
     
-    def parse_single_comment(self, comment_element, comment_id: int, is_reply: bool = False) -> Optional[Dict[str, Any]]:
+    def parse_single_comment(self, comment_element, comment_id: int, is_reply: bool = False,
+                             noeud: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Parse un commentaire individuel (ou une réponse)
         
@@ -270,13 +567,17 @@ class LefasoCommentScraper:
             comment_element: Élément HTML du commentaire
             comment_id (int): ID du commentaire
             is_reply (bool): Si c'est une réponse
+            noeud (Dict): Nœud rendu par walk_thread, optionnel
             
         Returns:
             Optional[Dict]: Données structurées du commentaire
         """
         try:
             # Extraire l'en-tête (auteur et date)
-            chapo_elem = comment_element.find('div', class_='forum-chapo')
+            if noeud is not None:
+                chapo_elem = noeud['chapo']
+            else:
+                chapo_elem = comment_element.find('div', class_='forum-chapo')
             auteur, date = "Anonyme", "Date inconnue"
             
             if chapo_elem:
@@ -291,7 +592,7 @@ class LefasoCommentScraper:
                         break
             
             # Extraire le contenu
-            contenu = self.extract_comment_content(comment_element)
+            contenu = self.extract_comment_content(comment_element, noeud)
             
             # Filtrer les contenus non significatifs
             if not contenu or len(contenu) < 10:  # Augmenté le seuil minimum
@@ -357,29 +658,54 @@ class LefasoCommentScraper:
         print(f"\n🎯 Début du scraping pour: {url}")
         
         # Récupérer la page
-        soup = self.fetch_page(url)
-        if not soup:
+        content = self.fetch_content(url)
+        if content is None:
             return {'erreur': 'Impossible de récupérer la page', 'url': url}
         
-        # Extraire les informations de l'article
-        article_info = self.extract_article_info(soup)
+        return self.scrape_article_from_html(url, content)
+    
+    def iter_comments(self, url: str) -> Iterator[CommentRecord]:
+        """
+        Télécharge un article et rend ses commentaires à plat au fil de l'analyse
         
-        # Localiser la section des commentaires
+        Chaque commentaire principal est suivi de ses réponses ; le consommateur
+        (nettoyage, écriture en base, export) peut commencer avant la fin de
+        l'analyse sans que toute la structure imbriquée soit gardée en mémoire.
+        
+        Args:
+            url (str): URL de l'article
+            
+        Yields:
+            CommentRecord: Commentaire ou réponse
+            
+        Raises:
+            ConnectionError: Si la page n'a pas pu être récupérée
+        """
+        content = self.fetch_content(url)
+        if content is None:
+            raise ConnectionError(f"Impossible de récupérer la page: {url}")
+        yield from self.iter_comments_from_soup(url, self.parse_html(content))
+    
+    def iter_comments_from_soup(self, url: str, soup: BeautifulSoup) -> Iterator[CommentRecord]:
+        """Rend les commentaires d'une page déjà analysée (voir iter_comments)"""
         comments_section = self.extract_comments_section(soup)
-        if not comments_section:
-            article_info['commentaires'] = []
-            article_info['statistiques'] = {
-                'total_commentaires': 0, 
-                'total_reponses': 0,
-                'total_interventions': 0,
-                'statut': 'Aucun commentaire trouvé'
-            }
-            return article_info
+        if comments_section:
+            yield from self.iter_section_comments(url, comments_section)
+    
+    def find_comment_items(self, comments_section) -> List[Any]:
+        """
+        Localise les éléments des commentaires principaux dans la section
         
-        # Extraire les commentaires principaux - avec sélecteurs plus flexibles
-        commentaires_principaux = []
+        Args:
+            comments_section: Section des commentaires
+            
+        Returns:
+            List: Un élément par fil de discussion
+        """
+        # Structure SPIP : chaque <li> direct de ul#navforum ouvre un fil
+        comment_items = comments_section.find_all('li', recursive=False) if comments_section.name == 'ul' else []
         
-        # Essayer différents sélecteurs pour les commentaires
+        # Sinon, essayer différents sélecteurs pour les commentaires
         comment_selectors = [
             'li.forum-fil',
             '.comment',
@@ -388,31 +714,125 @@ class LefasoCommentScraper:
             '.forum-message'
         ]
         
-        comment_items = []
         for selector in comment_selectors:
+            if comment_items:
+                break
             comment_items = comments_section.select(selector)
             if comment_items:
                 print(f"✅ Commentaires trouvés avec le sélecteur: {selector}")
-                break
+                # Les éléments imbriqués dans un autre sont des réponses, pas des fils
+                retenus = set(map(id, comment_items))
+                comment_items = [item for item in comment_items if not any(id(parent) in retenus for parent in item.parents)]
         
         # Fallback: prendre tous les li dans la section
         if not comment_items:
             comment_items = comments_section.find_all('li')
         
         print(f"📊 {len(comment_items)} élément(s) de commentaire(s) trouvé(s)")
+        return comment_items
+    
+    def iter_section_comments(self, url: str, comments_section) -> Iterator[CommentRecord]:
+        """
+        Rend les commentaires d'une section, fil par fil, sans rien accumuler
         
-        for i, comment_item in enumerate(comment_items, 1):
+        Args:
+            url (str): URL de l'article
+            comments_section: Section des commentaires
+            
+        Yields:
+            CommentRecord: Commentaire principal puis ses réponses
+        """
+        for i, comment_item in enumerate(self.find_comment_items(comments_section), 1):
+            # Un seul parcours par fil : le commentaire principal puis ses réponses
+            noeuds = self.walk_thread(comment_item)
+            
             # Parser le commentaire principal
-            comment_data = self.parse_single_comment(comment_item, i)
+            comment_data = self.parse_single_comment(comment_item, i, noeud=next(noeuds))
             if not comment_data:
                 continue
+            comment_data.update(profondeur=0, parent_id=None)
+            yield CommentRecord(url_article=url, fil=i, **comment_data)
             
-            # Extraire les réponses
-            reponses = self.extract_replies(comment_item)
-            comment_data['reponses'] = reponses
-            comment_data['nombre_reponses'] = len(reponses)
+            # Puis les réponses
+            for reponse in self.iter_replies(comment_item, noeuds):
+                yield CommentRecord(url_article=url, fil=i, **reponse)
+    
+    def scrape_article_from_html(self, url: str, content: bytes, hash_connu: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Scrape les commentaires d'une page déjà téléchargée (ex: par AsyncFetcher)
+        
+        Args:
+            url (str): URL de l'article
+            content (bytes): Contenu HTML brut de la page
+            hash_connu (str): Empreinte des commentaires déjà enregistrés en base
+                (Article.hash_commentaires) ; à défaut, celle notée dans le cache
+            
+        Returns:
+            Dict: Données complètes de l'article et ses commentaires
+        """
+        print(f"\n🎯 Analyse de la page téléchargée: {url}")
+        
+        # Section des commentaires identique à la dernière analyse : rien à refaire
+        empreinte = hash_commentaires(content)
+        if hash_connu is None and self.cache:
+            hash_connu = self.cache.hash_commentaires_analyse(url)
+        if empreinte is not None and empreinte == hash_connu:
+            print("♻️ Section des commentaires inchangée, analyse ignorée")
+            return {'url': url, 'inchange': True, 'hash_commentaires': empreinte}
+        
+        data = self.parse_article(url, self.parse_html(content))
+        data['hash_commentaires'] = empreinte
+        return data
+    
+    def marquer_traite(self, data: Dict[str, Any]):
+        """
+        Mémorise dans le cache l'empreinte des commentaires une fois les données enregistrées
+        
+        Args:
+            data (Dict): Données renvoyées par scrape_article_comments
+        """
+        if self.cache and data.get('url') and not data.get('erreur') and not data.get('inchange'):
+            self.cache.marquer_analyse(data['url'], data.get('hash_commentaires'))
+    
+    def parse_article(self, url: str, soup: BeautifulSoup) -> Dict[str, Any]:
+        """
+        Extrait l'article et ses commentaires d'une page analysée
+        
+        Args:
+            url (str): URL de l'article
+            soup (BeautifulSoup): Objet BeautifulSoup de la page
             
-            commentaires_principaux.append(comment_data)
+        Returns:
+            Dict: Données complètes de l'article et ses commentaires
+        """
+        # Extraire les informations de l'article
+        article_info = self.extract_article_info(soup)
+        article_info['url'] = url
+        
+        # Localiser la section des commentaires
+        comments_section = self.extract_comments_section(soup)
+        if not comments_section:
+            article_info['commentaires'] = []
+            article_info['statistiques'] = {
+                'total_commentaires': 0, 
+                'total_reponses': 0,
+                'total_interventions': 0,
+                'statut': 'Aucun commentaire trouvé'
+            }
+            return article_info
+        
+        # Reconstituer la structure imbriquée à partir du flux de commentaires
+        commentaires_principaux = []
+        for record in self.iter_section_comments(url, comments_section):
+            comment_data = {cle: valeur for cle, valeur in record.items() if cle not in ('url_article', 'fil')}
+            if record['type'] == 'commentaire':
+                comment_data['reponses'] = []
+                commentaires_principaux.append(comment_data)
+            else:
+                commentaires_principaux[-1]['reponses'].append(comment_data)
+        
+        for comment_data in commentaires_principaux:
+            comment_data['nombre_reponses'] = len(comment_data['reponses'])
         
         # Compiler les statistiques
         total_reponses = sum(comment['nombre_reponses'] for comment in commentaires_principaux)
@@ -430,73 +850,83 @@ class LefasoCommentScraper:
         
         return article_info
     
-    def create_dataframe(self, data: Dict[str, Any]) -> pd.DataFrame:
+    def flatten_comments(self, data: Dict[str, Any]) -> Iterator[CommentRecord]:
+        """Rend à plat les commentaires d'un résultat de scrape_article_comments"""
+        for commentaire in data.get('commentaires', []):
+            principal = {cle: valeur for cle, valeur in commentaire.items() if cle not in ('reponses', 'nombre_reponses')}
+            principal.setdefault('profondeur', 0)
+            principal.setdefault('parent_id', None)
+            yield CommentRecord(url_article=data.get('url', ''), fil=commentaire['id_commentaire'], **principal)
+            for reponse in commentaire.get('reponses', []):
+                reponse = dict(reponse)
+                reponse.setdefault('profondeur', 1)
+                reponse.setdefault('parent_id', None)
+                yield CommentRecord(url_article=data.get('url', ''), fil=commentaire['id_commentaire'], **reponse)
+    
+    def iter_rows(self, article_info: Dict[str, Any], records: Iterable[CommentRecord]) -> Iterator[Dict[str, Any]]:
         """
-        Crée un DataFrame pandas structuré à partir des données scrapées
+        Transforme un flux de commentaires en lignes d'export
         
         Args:
-            data (Dict): Données scrapées
+            article_info (Dict): Métadonnées de l'article (titre, url, date_publication, ...)
+            records (Iterable[CommentRecord]): Commentaires à plat (iter_comments ou flatten_comments)
             
-        Returns:
-            pd.DataFrame: DataFrame structuré
+        Yields:
+            Dict: Ligne avec identifiants textuels et colonnes de l'article
         """
-        rows = []
+        # ID unique pour l'article (basé sur l'URL)
+        article_id = re.sub(r'[^\w]', '_', article_info.get('url', 'unknown'))[:50]
         
-        # Vérifier si des commentaires existent
-        if not data.get('commentaires'):
-            print("⚠️ Aucun commentaire à structurer")
-            return pd.DataFrame()
-        
-        for commentaire in data.get('commentaires', []):
-            # ID unique pour l'article (basé sur l'URL)
-            article_id = re.sub(r'[^\w]', '_', data.get('url', 'unknown'))[:50]
-            
-            # Ligne pour le commentaire principal
-            row_comment = {
+        for record in records:
+            id_fil = f"{article_id}_C{record['fil']:03d}"
+            est_reponse = record['type'] == 'reponse'
+            yield {
                 'id_article': article_id,
-                'titre_article': data.get('titre', ''),
-                'url_article': data.get('url', ''),
-                'date_publication_article': data.get('date_publication', ''),
-                'categorie_article': data.get('categorie', ''),
-                'date_scraping': data.get('date_scraping', ''),
+                'titre_article': article_info.get('titre', ''),
+                'url_article': article_info.get('url', ''),
+                'date_publication_article': article_info.get('date_publication', ''),
+                'categorie_article': article_info.get('categorie', ''),
+                'date_scraping': article_info.get('date_scraping', ''),
                 
-                'id_commentaire': f"{article_id}_C{commentaire['id_commentaire']:03d}",
-                'id_parent': None,
-                'type': 'commentaire',
-                'auteur': commentaire['auteur'],
-                'date_publication': commentaire['date_publication'],
-                'contenu': commentaire['contenu'],
-                'longueur_contenu': commentaire['longueur_contenu'],
-                'mots_contenu': commentaire['mots_contenu'],
-                'nombre_reponses': commentaire.get('nombre_reponses', 0),
-                'timestamp_extraction': commentaire.get('timestamp_extraction', '')
+                'id_commentaire': f"{id_fil}R{record['id_commentaire']:02d}" if est_reponse else id_fil,
+                'id_parent': id_fil if est_reponse else None,
+                'type': record['type'],
+                'auteur': record['auteur'],
+                'date_publication': record['date_publication'],
+                'contenu': record['contenu'],
+                'longueur_contenu': record['longueur_contenu'],
+                'mots_contenu': record['mots_contenu'],
+                'profondeur': record['profondeur'],
+                'timestamp_extraction': record.get('timestamp_extraction', '')
             }
-            rows.append(row_comment)
+    
+    def create_dataframe(self, data: Dict[str, Any], records: Optional[Iterable[CommentRecord]] = None) -> pd.DataFrame:
+        """
+        Crée un DataFrame pandas structuré à partir des données scrapées
+        
+        Args:
+            data (Dict): Données scrapées (ou seulement les métadonnées de l'article si records est fourni)
+            records (Iterable[CommentRecord]): Flux de commentaires (ex: iter_comments), optionnel
             
-            # Lignes pour les réponses
-            for reponse in commentaire.get('reponses', []):
-                row_reponse = {
-                    'id_article': article_id,
-                    'titre_article': data.get('titre', ''),
-                    'url_article': data.get('url', ''),
-                    'date_publication_article': data.get('date_publication', ''),
-                    'categorie_article': data.get('categorie', ''),
-                    'date_scraping': data.get('date_scraping', ''),
-                    
-                    'id_commentaire': f"{article_id}_C{commentaire['id_commentaire']:03d}R{reponse['id_commentaire']:02d}",
-                    'id_parent': f"{article_id}_C{commentaire['id_commentaire']:03d}",
-                    'type': 'reponse',
-                    'auteur': reponse['auteur'],
-                    'date_publication': reponse['date_publication'],
-                    'contenu': reponse['contenu'],
-                    'longueur_contenu': reponse['longueur_contenu'],
-                    'mots_contenu': reponse['mots_contenu'],
-                    'nombre_reponses': 0,
-                    'timestamp_extraction': reponse.get('timestamp_extraction', '')
-                }
-                rows.append(row_reponse)
+        Returns:
+            pd.DataFrame: DataFrame structuré
+        """
+        if records is None:
+            # Vérifier si des commentaires existent
+            if not data.get('commentaires'):
+                print("⚠️ Aucun commentaire à structurer")
+                return pd.DataFrame()
+            records = self.flatten_comments(data)
+        
+        self.dataframe = pd.DataFrame(self.iter_rows(data, records))
+        if self.dataframe.empty:
+            print("⚠️ Aucun commentaire à structurer")
+            return self.dataframe
         
-        self.dataframe = pd.DataFrame(rows)
+        # Nombre de réponses de chaque commentaire principal
+        reponses_par_fil = self.dataframe.loc[self.dataframe['type'] == 'reponse', 'id_parent'].value_counts()
+        self.dataframe['nombre_reponses'] = self.dataframe['id_commentaire'].map(reponses_par_fil).fillna(0).astype(int)
+        self.dataframe.loc[self.dataframe['type'] == 'reponse', 'nombre_reponses'] = 0
         
         # Réorganiser les colonnes pour une meilleure lisibilité
         column_order = [
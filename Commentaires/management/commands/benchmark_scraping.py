@@ -0,0 +1,98 @@
+import contextlib
+import io
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from Commentaires.models import Article, Commentaire, ScrapeAttempt, ScrapingHistory, URLStorage
+from Commentaires.serveur_local import ServeurLefaso
+from Commentaires.source_locale import ouvrir_source
+from Commentaires.views import Home
+
+
+class Command(BaseCommand):
+    help = ("Mesure le pipeline complet (téléchargement → analyse → enregistrement) contre un serveur "
+            "local imitant LeFaso.net ; les données écrites sont annulées à la fin")
+
+    def add_arguments(self, parser):
+        groupe = parser.add_argument_group("serveur local")
+        groupe.add_argument('--articles', type=int, default=50, help="Nombre d'articles à scraper")
+        groupe.add_argument('--commentaires', type=int, default=20, help="Commentaires principaux par article")
+        groupe.add_argument('--profondeur', type=int, default=2, help="Profondeur maximale des réponses")
+        groupe.add_argument('--reponses', type=int, default=2, help="Réponses maximales par commentaire et par niveau")
+        groupe.add_argument('--latence', type=float, default=0.02, help="Latence moyenne par réponse (secondes)")
+        groupe.add_argument('--taux-erreurs', type=float, default=0.0, help="Proportion de réponses 500")
+        groupe.add_argument('--taux-429', type=float, default=0.0, help="Proportion de réponses 429")
+        groupe.add_argument('--source', help="Servir des pages enregistrées (répertoire ou WARC) au lieu de pages synthétiques")
+        groupe.add_argument('--graine', type=int, default=0, help="Graine du tirage des pannes")
+
+        groupe = parser.add_argument_group("scraper")
+        groupe.add_argument('--concurrence', type=int, default=8, help="Téléchargements simultanés")
+        groupe.add_argument('--debit', type=float, default=50.0, help="Requêtes par seconde maximales")
+        groupe.add_argument('--rafale', type=int, default=8, help="Requêtes autorisées d'un coup")
+        groupe.add_argument('--processus', type=int, default=None, help="Processus d'analyse (défaut: un par cœur, 0 : aucun)")
+        groupe.add_argument('--parser', default='auto', help="Moteur d'analyse HTML")
+        groupe.add_argument('--garder', action='store_true', help="Conserver les données écrites en base")
+
+    def handle(self, *args, **options):
+        serveur = ServeurLefaso(
+            commentaires=options['commentaires'],
+            profondeur=options['profondeur'],
+            reponses=options['reponses'],
+            latence=options['latence'],
+            taux_erreurs=options['taux_erreurs'],
+            taux_429=options['taux_429'],
+            source=ouvrir_source(options['source']) if options['source'] else None,
+            graine=options['graine'],
+        )
+        reglages = override_settings(
+            SCRAPER_CONCURRENCE=options['concurrence'],
+            SCRAPER_REQUETES_PAR_SECONDE=options['debit'],
+            SCRAPER_RAFALE=options['rafale'],
+            SCRAPER_PROCESSUS_ANALYSE=options['processus'],
+            SCRAPER_PARSER=options['parser'],
+            SCRAPER_CACHE_DIR=None,
+            SCRAPER_SOURCE=None,
+        )
+
+        with serveur, reglages, transaction.atomic():
+            urls = [serveur.url_article(numero) for numero in range(1, options['articles'] + 1)]
+            URLStorage.objects.bulk_create([URLStorage(url=url) for url in urls])
+            historique = ScrapingHistory.objects.create(urls_selectionnees=json.dumps(urls))
+
+            self.stdout.write(f"🌐 Serveur local {serveur.base_url} : {len(urls)} article(s)")
+            debut = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                Home().executer_scraping_background(urls, historique.id)
+            duree = time.perf_counter() - debut
+
+            articles = Article.objects.filter(url__in=urls)
+            interventions = Commentaire.objects.filter(article__in=articles).count()
+            nb_articles = articles.count()
+            erreurs = URLStorage.objects.filter(url__in=urls).exclude(statut=URLStorage.TERMINE).count()
+            resume = ScrapeAttempt.resume(ScrapeAttempt.objects.filter(url__in=urls))
+
+            if not options['garder']:
+                transaction.set_rollback(True)
+
+        stats = serveur.statistiques
+        self.stdout.write(
+            f"📡 Serveur : {stats['requetes']} requête(s) — 200: {stats['200']}, 304: {stats['304']}, "
+            f"429: {stats['429']}, 500: {stats['500']}, {stats['octets'] / 1e6:.1f} Mo"
+        )
+        etapes = resume['etapes']
+        self.stdout.write(
+            "⏱️ Par page : " + ", ".join(
+                f"{nom} {etapes[etape]['moyenne'] * 1000:.1f} ms"
+                for nom, etape in (('téléchargement', 'duree_telechargement'), ('analyse', 'duree_analyse'),
+                                   ('nettoyage', 'duree_nettoyage'), ('écriture', 'duree_ecriture'))
+            )
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {nb_articles} article(s), {interventions} commentaire(s) en {duree:.2f}s — "
+            f"{nb_articles / duree:.1f} articles/s, {interventions / duree:.0f} commentaires/s"
+            + (f" ({erreurs} page(s) en erreur)" if erreurs else "")
+        ))
@@ -0,0 +1,139 @@
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from Commentaires.lefaso_scraper import LefasoCommentScraper
+from Commentaires.models import ActiviteJournaliere, Article, Auteur, Commentaire
+from Commentaires.serveur_local import generer_article
+from Commentaires.sqlite_profil import PROFILS
+from Commentaires.views import Home
+
+
+def lecture_tableau_de_bord():
+    """Requêtes de lecture du tableau de bord (sans l'analyse de sentiments)"""
+    articles = list(Article.objects.all().prefetch_related('commentaires'))
+    Commentaire.objects.count()
+    ActiviteJournaliere.auteurs_distincts()
+    aujourd_hui = timezone.localdate()
+    ActiviteJournaliere.serie(aujourd_hui - timedelta(days=30), aujourd_hui)
+    list(Auteur.objects.order_by('-nombre_interventions')[:10])
+    return len(articles)
+
+
+class Command(BaseCommand):
+    help = ("Mesure l'ingestion groupée concurrente des lectures du tableau de bord sur une base SQLite "
+            "temporaire, pour chaque profil de connexion (erreurs de verrou et latences)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profils', default='aucun,concurrent', help=f"Profils à comparer ({', '.join(PROFILS)})")
+        parser.add_argument('--duree', type=float, default=20.0, help="Durée de chaque mesure (secondes)")
+        parser.add_argument('--ecrivains', type=int, default=2, help="Threads d'ingestion")
+        parser.add_argument('--lecteurs', type=int, default=4, help="Threads de lecture du tableau de bord")
+        parser.add_argument('--commentaires', type=int, default=40, help="Commentaires principaux par article ingéré")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Ce benchmark ne concerne que SQLite")
+        profils = [profil.strip() for profil in options['profils'].split(',') if profil.strip()]
+        inconnus = [profil for profil in profils if profil not in PROFILS]
+        if inconnus:
+            raise CommandError(f"Profil(s) inconnu(s): {', '.join(inconnus)}")
+
+        for profil in profils:
+            with tempfile.TemporaryDirectory() as dossier:
+                resultats = self.mesurer(profil, os.path.join(dossier, 'benchmark.sqlite3'), options)
+            self.afficher(profil, resultats, options['duree'])
+
+    def mesurer(self, profil, chemin, options):
+        """Lance écrivains et lecteurs sur une base neuve ; renvoie leurs latences et erreurs"""
+        reglages = connections.settings['default']
+        nom_origine = reglages['NAME']
+        connections.close_all()
+        reglages['NAME'] = chemin
+        resultats = {'ecritures': [], 'lectures': [], 'erreurs_ecriture': 0, 'erreurs_lecture': 0, 'interventions': 0}
+        verrou = threading.Lock()
+        compteur = iter(range(1, 10**9))
+
+        def ecrivain():
+            scraper = LefasoCommentScraper(parser='auto')
+            home = Home()
+            try:
+                while time.monotonic() < fin:
+                    with verrou:
+                        numero = next(compteur)
+                    url = f"https://lefaso.net/spip.php?article{numero}"
+                    data = scraper.scrape_article_from_html(url, generer_article(numero, options['commentaires'], 2, 2))
+                    debut = time.perf_counter()
+                    try:
+                        mesures = {}
+                        home.sauvegarder_dans_base(data, mesures)
+                    except OperationalError:
+                        with verrou:
+                            resultats['erreurs_ecriture'] += 1
+                        continue
+                    with verrou:
+                        resultats['ecritures'].append(time.perf_counter() - debut)
+                        resultats['interventions'] += mesures['inseres']
+            finally:
+                connection.close()
+
+        def lecteur():
+            try:
+                while time.monotonic() < fin:
+                    debut = time.perf_counter()
+                    try:
+                        lecture_tableau_de_bord()
+                    except OperationalError:
+                        with verrou:
+                            resultats['erreurs_lecture'] += 1
+                        continue
+                    with verrou:
+                        resultats['lectures'].append(time.perf_counter() - debut)
+            finally:
+                connection.close()
+
+        try:
+            # redirect_stdout n'est pas propre à un thread : messages des écrivains masqués ici
+            with override_settings(SQLITE_PROFIL=profil), contextlib.redirect_stdout(io.StringIO()):
+                call_command('migrate', verbosity=0)
+                connections.close_all()
+                fin = time.monotonic() + options['duree']
+                threads = ([threading.Thread(target=ecrivain) for _ in range(options['ecrivains'])]
+                           + [threading.Thread(target=lecteur) for _ in range(options['lecteurs'])])
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            connections.close_all()
+            reglages['NAME'] = nom_origine
+        return resultats
+
+    def afficher(self, profil, resultats, duree):
+        def percentiles(latences):
+            if not latences:
+                return "—"
+            latences = sorted(latences)
+            p95 = latences[min(len(latences) - 1, int(len(latences) * 0.95))]
+            return f"médiane {statistics.median(latences) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms, max {latences[-1] * 1000:.0f} ms"
+
+        self.stdout.write(self.style.SUCCESS(f"📊 Profil « {profil} »"))
+        self.stdout.write(
+            f"   ✍️ {len(resultats['ecritures'])} article(s) ingéré(s) ({resultats['interventions'] / duree:.0f} interventions/s), "
+            f"{resultats['erreurs_ecriture']} erreur(s) de verrou — {percentiles(resultats['ecritures'])}"
+        )
+        self.stdout.write(
+            f"   📖 {len(resultats['lectures'])} lecture(s) du tableau de bord, "
+            f"{resultats['erreurs_lecture']} erreur(s) de verrou — {percentiles(resultats['lectures'])}"
+        )
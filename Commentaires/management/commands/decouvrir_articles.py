@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Commentaires.async_fetcher import AsyncFetcher
+from Commentaires.decouverte import BitmapArticles, CrawlerDecouverte, numero_article
+from Commentaires.models import Article, URLStorage
+from Commentaires.source_locale import ouvrir_source
+
+
+class Command(BaseCommand):
+    help = "Découvre les articles via les rubriques, le flux RSS et le plan du site, et les met en file dans URLStorage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rubrique', type=int, action='append', default=[], dest='rubriques',
+                            help="Numéro de rubrique à parcourir, pagination comprise (répétable)")
+        parser.add_argument('--sans-rss', action='store_true', help="Ne pas lire le flux RSS")
+        parser.add_argument('--sans-plan', action='store_true', help="Ne pas lire le plan du site (sitemap.xml)")
+        parser.add_argument('--max-pages', type=int, default=50, help="Nombre maximal de pages de listes téléchargées")
+        parser.add_argument('--taille-lot', type=int, default=500, help="Taille des lots d'insertion")
+        parser.add_argument('--source', help="Source locale (répertoire de pages ou WARC) au lieu du réseau")
+        parser.add_argument('--simulation', action='store_true', help="Afficher les URLs découvertes sans les enregistrer")
+
+    def handle(self, *args, **options):
+        # Articles déjà connus, chargés une seule fois dans le bitmap
+        connus = BitmapArticles()
+        urls = URLStorage.objects.order_by().values_list('url', flat=True).union(Article.objects.order_by().values_list('url', flat=True))
+        for url in urls.iterator():
+            numero = numero_article(url)
+            if numero is not None:
+                connus.ajouter(numero)
+
+        fetcher = AsyncFetcher(
+            concurrence=getattr(settings, 'SCRAPER_CONCURRENCE', 4),
+            requetes_par_seconde=getattr(settings, 'SCRAPER_REQUETES_PAR_SECONDE', 0.5),
+            rafale=getattr(settings, 'SCRAPER_RAFALE', 1),
+            timeout=getattr(settings, 'SCRAPER_TIMEOUT', 30),
+            source=ouvrir_source(options['source']) if options['source'] else None,
+        )
+        crawler = CrawlerDecouverte(
+            fetcher,
+            connus=connus,
+            rubriques=options['rubriques'],
+            rss=not options['sans_rss'],
+            plan=not options['sans_plan'],
+            max_pages=options['max_pages'],
+        )
+
+        self.stdout.write(f"🔎 {len(connus)} article(s) déjà connu(s), découverte en cours...")
+        ajoutes = 0
+        lot = []
+        for url in crawler.iter_nouveaux():
+            if options['simulation']:
+                self.stdout.write(url)
+                continue
+            lot.append(url)
+            if len(lot) >= options['taille_lot']:
+                ajoutes += URLStorage.enfiler(lot, options['taille_lot'])
+                lot = []
+        if lot:
+            ajoutes += URLStorage.enfiler(lot, options['taille_lot'])
+
+        stats = crawler.statistiques
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['pages']} page(s) de listes ({stats['erreurs']} en erreur), {stats['liens']} lien(s) d'articles, "
+            f"{stats['nouveaux']} nouvel(s) article(s)" + ("" if options['simulation'] else f", {ajoutes} mis en file")
+        ))
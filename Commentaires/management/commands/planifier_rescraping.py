@@ -0,0 +1,70 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Commentaires.models import Article, ScrapingHistory, SuiviArticle, URLStorage
+from Commentaires.views import Home
+
+
+class Command(BaseCommand):
+    help = ("Choisit les articles à re-scraper selon leur débit de commentaires, dans la limite d'un budget "
+            "de requêtes : les fils actifs sont revisités souvent, les fils froids de plus en plus rarement")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget', type=int, default=50, help="Nombre maximal de pages re-scrapées par tour")
+        parser.add_argument('--executer', action='store_true', help="Lancer le scraping des articles choisis (sinon, simple mise en file)")
+        parser.add_argument('--boucle', type=int, default=0, metavar='SECONDES',
+                            help="Répéter la planification et le scraping toutes les N secondes (implique --executer)")
+        parser.add_argument('--simulation', action='store_true', help="Afficher le plan sans mettre en file ni scraper")
+
+    def handle(self, *args, **options):
+        while True:
+            self.planifier(options)
+            if not options['boucle'] or options['simulation']:
+                break
+            time.sleep(options['boucle'])
+
+    def planifier(self, options):
+        # Articles scrapés avant la mise en place du suivi : premier relevé à la date du scraping
+        for article in Article.objects.filter(suivi__isnull=True).iterator():
+            SuiviArticle.observer(article, article.total_interventions(), date=article.date_scraping)
+
+        maintenant = timezone.now()
+        budget = options['budget']
+        choisis = SuiviArticle.a_revisiter(budget, maintenant)
+
+        # Comparaison avec un re-scraping périodique aveugle (les moins récemment visités d'abord)
+        attendus = sum(suivi.manques_estimes(maintenant) for suivi in choisis)
+        aveugle = sum(suivi.manques_estimes(maintenant) for suivi in
+                      SuiviArticle.objects.order_by('derniere_visite').select_related('article')[:budget])
+
+        self.stdout.write(f"🗓️ {len(choisis)} article(s) à revisiter (budget {budget}) :")
+        for suivi in choisis[:10]:
+            self.stdout.write(
+                f"   {suivi.manques_estimes(maintenant):6.1f} attendue(s) — {suivi.taux:5.2f}/h, "
+                f"intervalle {suivi.intervalle} — {suivi.article.url}"
+            )
+        self.stdout.write(
+            f"📈 {attendus:.1f} nouvelle(s) intervention(s) attendue(s), contre {aveugle:.1f} "
+            f"pour le même budget en re-scraping périodique"
+        )
+
+        if options['simulation'] or not choisis:
+            return
+
+        urls = [suivi.article.url for suivi in choisis]
+        URLStorage.remettre_en_file(urls)
+
+        if not (options['executer'] or options['boucle']):
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(urls)} URL(s) mises en file"))
+            return
+
+        historique = ScrapingHistory.objects.create(urls_selectionnees=json.dumps(urls), statut=ScrapingHistory.EN_COURS)
+        Home().executer_scraping_background(urls, historique.id)
+        historique.refresh_from_db()
+        if historique.statut == ScrapingHistory.ERREUR:
+            self.stderr.write(f"❌ Scraping interrompu: {historique.erreur}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(urls)} article(s) re-scrapé(s)"))
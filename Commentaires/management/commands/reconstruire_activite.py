@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Commentaires.models import Article, ActiviteJournaliere
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats d'activité journalière à partir des commentaires existants"
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        ActiviteJournaliere.objects.all().delete()
+
+        articles = Article.objects.all()
+        for article in articles:
+            commentaires = article.commentaires.only('date_extraction', 'type', 'auteur')
+            ActiviteJournaliere.enregistrer_commentaires(article, commentaires)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {ActiviteJournaliere.objects.count()} ligne(s) d'activité reconstruite(s) pour {articles.count()} article(s)"
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Commentaires.models import Auteur, Commentaire
+
+
+class Command(BaseCommand):
+    help = "Relie les commentaires existants aux auteurs normalisés et recalcule leurs compteurs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Taille des lots de mise à jour")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Liaison commentaire -> auteur normalisé
+        auteurs = Auteur.resoudre(Commentaire.objects.values_list('auteur', flat=True).distinct())
+        commentaires = list(Commentaire.objects.only('id', 'auteur', 'profil_auteur'))
+        for commentaire in commentaires:
+            auteur = auteurs.get(Auteur.normaliser(commentaire.auteur))
+            commentaire.profil_auteur_id = auteur.pk if auteur else None
+        Commentaire.objects.bulk_update(commentaires, ['profil_auteur'], batch_size=batch_size)
+
+        # Compteurs recalculés en une seule agrégation
+        a_modifier = Auteur.recalculer(batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(commentaires)} commentaire(s) reliés à {len(a_modifier)} auteur(s)"
+        ))
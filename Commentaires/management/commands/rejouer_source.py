@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Commentaires.models import ScrapingHistory, URLStorage
+from Commentaires.source_locale import ouvrir_source
+from Commentaires.views import Home
+
+
+class Command(BaseCommand):
+    help = "Rejoue le scraping à partir de pages enregistrées (répertoire HTML, cache ou archive WARC), sans réseau"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Répertoire de pages HTML, répertoire de cache ou archive .warc/.warc.gz")
+        parser.add_argument('--url', action='append', dest='urls', help="URL à rejouer (répétable ; défaut : toutes les URLs de la source)")
+
+    def handle(self, *args, **options):
+        try:
+            source = ouvrir_source(options['source'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        urls = options['urls'] or list(source.urls())
+        if not urls:
+            raise CommandError("Aucune URL à rejouer (index.json absent ? utilisez --url)")
+
+        historique = ScrapingHistory.objects.create(urls_selectionnees=json.dumps(urls), statut=ScrapingHistory.EN_COURS)
+
+        self.stdout.write(f"🔁 Rejeu de {len(urls)} page(s) depuis {options['source']}")
+        Home().executer_scraping_background(urls, historique.id, source=source)
+
+        historique.refresh_from_db()
+        if historique.statut == ScrapingHistory.ERREUR:
+            raise CommandError(f"Rejeu interrompu: {historique.erreur}")
+
+        traitees = URLStorage.objects.filter(url__in=urls, statut=URLStorage.TERMINE).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rejeu terminé : {traitees} page(s) traitée(s), {len(urls) - traitees} en erreur"
+        ))
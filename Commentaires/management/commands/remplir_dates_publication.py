@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Commentaires.dates_fr import parse_date_article, parse_date_commentaire
+from Commentaires.models import Article, Commentaire
+
+
+class Command(BaseCommand):
+    help = "Convertit les dates de publication textuelles existantes en dates indexées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tout', action='store_true', help="Recalcule aussi les dates déjà renseignées")
+        parser.add_argument('--batch-size', type=int, default=500, help="Taille des lots de mise à jour")
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        articles_maj = 0
+        commentaires_maj = 0
+
+        for article in Article.objects.only('id', 'date_publication', 'date_publication_dt'):
+            if options['tout'] or article.date_publication_dt is None:
+                article.date_publication_dt = parse_date_article(article.date_publication)
+                article.save(update_fields=['date_publication_dt'])
+                articles_maj += 1
+
+            commentaires = article.commentaires.only('id', 'date_publication', 'date_publication_dt')
+            if not options['tout']:
+                commentaires = commentaires.filter(date_publication_dt__isnull=True)
+
+            a_modifier = []
+            for commentaire in commentaires:
+                commentaire.date_publication_dt = parse_date_commentaire(commentaire.date_publication, article.date_publication_dt)
+                a_modifier.append(commentaire)
+
+            # bulk_update n'appelle pas Commentaire.save() (pas de recalcul des statistiques)
+            Commentaire.objects.bulk_update(a_modifier, ['date_publication_dt'], batch_size=batch_size)
+            commentaires_maj += len(a_modifier)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Dates renseignées : {articles_maj} article(s), {commentaires_maj} commentaire(s)"
+        ))
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from Commentaires.analyse_parallele import AnalyseurParallele
+from Commentaires.models import URLStorage
+from Commentaires.views import Home
+
+
+class Command(BaseCommand):
+    help = ("Worker de scraping : réserve des URLs en attente dans la file (avec bail), les scrape et "
+            "enregistre le résultat. Plusieurs workers peuvent tourner en parallèle, sur un ou plusieurs hôtes")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help="Téléchargements simultanés dans ce worker (défaut : SCRAPER_CONCURRENCE)")
+        parser.add_argument('--lot', type=int, default=None, help="URLs réservées à la fois (défaut : 2 × concurrence)")
+        parser.add_argument('--bail', type=int, default=int(URLStorage.DUREE_BAIL.total_seconds()),
+                            help="Durée du bail en secondes, prolongée après chaque page traitée")
+        parser.add_argument('--attente', type=float, default=5.0, help="Pause quand la file est vide (secondes)")
+        parser.add_argument('--une-fois', action='store_true', help="S'arrêter dès que la file est vide")
+        parser.add_argument('--verbeux', action='store_true', help="Afficher les messages du scraper")
+
+    def handle(self, *args, **options):
+        from datetime import timedelta
+        from django.conf import settings
+
+        concurrence = options['concurrency'] or getattr(settings, 'SCRAPER_CONCURRENCE', 4)
+        lot = options['lot'] or max(concurrence * 2, 1)
+        duree = timedelta(seconds=options['bail'])
+        home = Home()
+        detenteur = home.identifiant_worker()
+        traitees = 0
+
+        # Un seul pool d'analyse pour toute la vie du worker (pas un par lot)
+        analyseur = AnalyseurParallele(
+            processus=getattr(settings, 'SCRAPER_PROCESSUS_ANALYSE', None),
+            parser=getattr(settings, 'SCRAPER_PARSER', 'auto'),
+        )
+
+        self.stdout.write(f"👷 Worker {detenteur} : {concurrence} téléchargement(s) simultané(s), lots de {lot}")
+        try:
+            with override_settings(SCRAPER_CONCURRENCE=concurrence), analyseur:
+                while True:
+                    reservees = URLStorage.reclamer(detenteur, lot, duree)
+                    if not reservees:
+                        if options['une_fois']:
+                            break
+                        time.sleep(options['attente'])
+                        continue
+
+                    sortie = contextlib.nullcontext() if options['verbeux'] else contextlib.redirect_stdout(io.StringIO())
+                    with sortie:
+                        resultats = home.executer_scraping_background([u.url for u in reservees], detenteur=detenteur,
+                                                                      analyseur=analyseur)
+                    traitees += len(resultats)
+                    erreurs = sum(resultat['statut'] == 'erreur' for resultat in resultats)
+                    self.stdout.write(f"📦 {len(resultats)} URL(s) traitée(s), {erreurs} en erreur")
+        except KeyboardInterrupt:
+            self.stdout.write("⏹️ Arrêt demandé")
+        finally:
+            rendues = URLStorage.liberer(detenteur)
+            if rendues:
+                self.stdout.write(f"↩️ {rendues} URL(s) rendue(s) à la file")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Worker arrêté : {traitees} URL(s) traitée(s)"))
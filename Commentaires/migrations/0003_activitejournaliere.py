@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2025-10-19 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def remplir_activite(apps, schema_editor):
+    """
+    Agrégats des commentaires déjà en base, même calcul que
+    ActiviteJournaliere.enregistrer_commentaires (jour local d'extraction)
+    """
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+    ActiviteJournaliere = apps.get_model('Commentaires', 'ActiviteJournaliere')
+
+    lignes = {}  # (portée, clé, jour) -> ligne
+    interventions = Commentaire.objects.values_list('article_id', 'article__categorie', 'type', 'date_extraction')
+    for article_id, categorie, type_intervention, date_extraction in interventions.iterator():
+        jour = timezone.localdate(date_extraction)
+        portees = [('global', '', None), ('article', str(article_id), article_id)]
+        if categorie:
+            portees.append(('categorie', categorie, None))
+        for portee, cle, article in portees:
+            ligne = lignes.get((portee, cle, jour))
+            if ligne is None:
+                ligne = lignes[(portee, cle, jour)] = ActiviteJournaliere(portee=portee, cle=cle, date=jour, article_id=article)
+            if type_intervention == 'reponse':
+                ligne.nombre_reponses += 1
+            else:
+                ligne.nombre_commentaires += 1
+
+    ActiviteJournaliere.objects.bulk_create(lignes.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0002_alter_commentaire_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActiviteJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text="Jour d'extraction des commentaires agrégés", verbose_name='Jour')),
+                ('portee', models.CharField(choices=[('global', 'Global'), ('categorie', 'Par catégorie'), ('article', 'Par article')], default='global', max_length=10, verbose_name='Portée')),
+                ('cle', models.CharField(blank=True, default='', help_text="Vide pour le global, nom de la catégorie ou pk de l'article", max_length=200, verbose_name='Clé')),
+                ('nombre_commentaires', models.PositiveIntegerField(default=0, verbose_name='Nombre de commentaires')),
+                ('nombre_reponses', models.PositiveIntegerField(default=0, verbose_name='Nombre de réponses')),
+                ('article', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activites', to='Commentaires.article', verbose_name='Article associé')),
+            ],
+            options={
+                'verbose_name': 'Activité journalière',
+                'verbose_name_plural': 'Activités journalières',
+                'ordering': ['date'],
+                'unique_together': {('portee', 'cle', 'date')},
+            },
+        ),
+        migrations.RunPython(remplir_activite, migrations.RunPython.noop),
+    ]
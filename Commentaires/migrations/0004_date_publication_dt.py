@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2025-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0003_activitejournaliere'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='commentaire',
+            name='Commentaire_date_pu_e02bd4_idx',
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='date_publication_dt',
+            field=models.DateTimeField(blank=True, help_text='Date de publication convertie depuis le texte français', null=True, verbose_name='Date de publication (analysée)'),
+        ),
+        migrations.AddField(
+            model_name='commentaire',
+            name='date_publication_dt',
+            field=models.DateTimeField(blank=True, help_text="Date de publication convertie, année déduite de l'article", null=True, verbose_name='Date de publication (analysée)'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['date_publication_dt'], name='Commentaire_date_pu_fe99f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['date_publication_dt'], name='Commentaire_date_pu_e093a5_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.6 on 2025-10-19 14:27
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def remplir_auteurs(apps, schema_editor):
+    """
+    Auteurs normalisés des commentaires déjà en base : même clé que Auteur.normaliser,
+    même graphie affichée que Auteur.resoudre, mêmes compteurs que reconstruire_auteurs
+    """
+    Auteur = apps.get_model('Commentaires', 'Auteur')
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+
+    def normaliser(nom):
+        return re.sub(r'\s+', ' ', (nom or '')).strip().casefold()[:200]
+
+    auteurs, articles = {}, {}
+    commentaires = list(Commentaire.objects.order_by('pk').only('id', 'auteur', 'type', 'article_id', 'date_extraction'))
+    for commentaire in commentaires:
+        cle = normaliser(commentaire.auteur)
+        if not cle:
+            continue
+        auteur = auteurs.get(cle)
+        if auteur is None:
+            auteur = auteurs[cle] = Auteur(nom=re.sub(r'\s+', ' ', commentaire.auteur).strip()[:200], nom_normalise=cle)
+        if commentaire.type == 'reponse':
+            auteur.nombre_reponses += 1
+        else:
+            auteur.nombre_commentaires += 1
+        auteur.nombre_interventions += 1
+        articles.setdefault(cle, set()).add(commentaire.article_id)
+        if auteur.derniere_activite is None or commentaire.date_extraction > auteur.derniere_activite:
+            auteur.derniere_activite = commentaire.date_extraction
+    for cle, auteur in auteurs.items():
+        auteur.nombre_articles = len(articles[cle])
+    Auteur.objects.bulk_create(auteurs.values(), batch_size=500)
+
+    # Liaison commentaire -> auteur normalisé
+    ids = dict(Auteur.objects.values_list('nom_normalise', 'id'))
+    for commentaire in commentaires:
+        commentaire.profil_auteur_id = ids.get(normaliser(commentaire.auteur))
+    Commentaire.objects.bulk_update(commentaires, ['profil_auteur'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0004_date_publication_dt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Auteur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(help_text='Première graphie rencontrée du pseudonyme', max_length=200, verbose_name='Nom affiché')),
+                ('nom_normalise', models.CharField(help_text='Pseudonyme en minuscules, espaces réduits', max_length=200, unique=True, verbose_name='Nom normalisé')),
+                ('nombre_commentaires', models.PositiveIntegerField(default=0, verbose_name='Nombre de commentaires')),
+                ('nombre_reponses', models.PositiveIntegerField(default=0, verbose_name='Nombre de réponses')),
+                ('nombre_interventions', models.PositiveIntegerField(default=0, help_text='Commentaires et réponses (tri des auteurs les plus actifs)', verbose_name="Nombre d'interventions")),
+                ('nombre_articles', models.PositiveIntegerField(default=0, verbose_name="Nombre d'articles commentés")),
+                ('derniere_activite', models.DateTimeField(blank=True, null=True, verbose_name='Dernière activité')),
+            ],
+            options={
+                'verbose_name': 'Auteur',
+                'verbose_name_plural': 'Auteurs',
+                'ordering': ['-nombre_interventions'],
+                'indexes': [models.Index(fields=['-nombre_interventions'], name='Commentaire_nombre__0f74a3_idx'), models.Index(fields=['derniere_activite'], name='Commentaire_dernier_811757_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='commentaire',
+            name='profil_auteur',
+            field=models.ForeignKey(blank=True, help_text='Auteur normalisé (casse et espaces ignorés)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commentaires', to='Commentaires.auteur', verbose_name="Profil de l'auteur"),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['profil_auteur', 'date_extraction'], name='Commentaire_profil__3215eb_idx'),
+        ),
+        migrations.RunPython(remplir_auteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2025-10-19 16:05
+
+import re
+
+from django.db import migrations, models
+from django.utils import timezone
+
+from Commentaires.hyperloglog import HyperLogLog
+
+
+def remplir_sketches(apps, schema_editor):
+    """
+    Sketches des auteurs des lignes d'activité existantes, même calcul que
+    ActiviteJournaliere.enregistrer_commentaires (auteur normalisé, jour local d'extraction)
+
+    Parcours des commentaires par article : les sketches d'un article sont écrits dès
+    que l'on passe au suivant, seuls ceux des portées globale et par catégorie restent en mémoire.
+    """
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+    ActiviteJournaliere = apps.get_model('Commentaires', 'ActiviteJournaliere')
+
+    def enregistrer(sketches):
+        for (portee, cle, jour), sketch in sketches.items():
+            ActiviteJournaliere.objects.filter(portee=portee, cle=cle, date=jour).update(sketch_auteurs=sketch.octets())
+        sketches.clear()
+
+    partages, par_article, article_courant = {}, {}, None
+    interventions = (
+        Commentaire.objects.order_by('article_id')
+        .values_list('article_id', 'article__categorie', 'auteur', 'date_extraction')
+    )
+    for article_id, categorie, auteur, date_extraction in interventions.iterator():
+        if article_id != article_courant:
+            enregistrer(par_article)
+            article_courant = article_id
+        auteur = re.sub(r'\s+', ' ', (auteur or '')).strip().casefold()[:200]
+        if not auteur:
+            continue
+        jour = timezone.localdate(date_extraction)
+        cles = [(partages, ('global', '', jour)), (par_article, ('article', str(article_id), jour))]
+        if categorie:
+            cles.append((partages, ('categorie', categorie, jour)))
+        for sketches, cle in cles:
+            sketches.setdefault(cle, HyperLogLog()).ajouter(auteur)
+    enregistrer(par_article)
+    enregistrer(partages)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0005_auteur'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitejournaliere',
+            name='sketch_auteurs',
+            field=models.BinaryField(blank=True, help_text='HyperLogLog des auteurs distincts du jour (voir hyperloglog.py)', null=True, verbose_name='Sketch des auteurs'),
+        ),
+        migrations.RunPython(remplir_sketches, migrations.RunPython.noop),
+    ]
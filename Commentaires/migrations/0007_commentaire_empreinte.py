@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2025-10-19 17:20
+
+import hashlib
+import re
+
+from django.db import migrations, models
+
+
+def calculer_empreintes(apps, schema_editor):
+    """Renseigne l'empreinte des interventions existantes (même calcul que Commentaire.calculer_empreinte)"""
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+
+    def normaliser(texte):
+        return re.sub(r'\s+', ' ', (texte or '')).strip().casefold()
+
+    a_modifier = []
+    for commentaire in Commentaire.objects.only('id', 'auteur', 'date_publication', 'contenu').iterator(chunk_size=2000):
+        hash_contenu = hashlib.sha256(normaliser(commentaire.contenu).encode('utf-8')).hexdigest()
+        cle = '\x1f'.join([normaliser(commentaire.auteur)[:200], (commentaire.date_publication or '').strip(), hash_contenu])
+        commentaire.empreinte = hashlib.sha1(cle.encode('utf-8')).hexdigest()
+        a_modifier.append(commentaire)
+        if len(a_modifier) >= 2000:
+            Commentaire.objects.bulk_update(a_modifier, ['empreinte'])
+            a_modifier = []
+    Commentaire.objects.bulk_update(a_modifier, ['empreinte'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0006_activitejournaliere_sketch_auteurs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commentaire',
+            name='empreinte',
+            field=models.CharField(blank=True, default='', help_text="Empreinte stable (auteur, date, contenu normalisé) pour l'ingestion incrémentale", max_length=40, verbose_name='Empreinte'),
+        ),
+        migrations.AddIndex(
+            model_name='commentaire',
+            index=models.Index(fields=['article', 'empreinte'], name='Commentaire_article_e8d6b2_idx'),
+        ),
+        migrations.RunPython(calculer_empreintes, migrations.RunPython.noop),
+    ]
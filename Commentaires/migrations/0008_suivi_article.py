@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2025-10-19 18:05
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0007_commentaire_empreinte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuiviArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taux', models.FloatField(default=0.0, help_text='Nouvelles interventions par heure (moyenne mobile exponentielle)', verbose_name='Débit estimé')),
+                ('nombre_interventions', models.PositiveIntegerField(default=0, verbose_name='Interventions au dernier relevé')),
+                ('derniere_visite', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dernière visite')),
+                ('intervalle', models.DurationField(default=datetime.timedelta(seconds=1800), verbose_name='Intervalle de visite')),
+                ('prochaine_visite', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Prochaine visite')),
+                ('visites', models.PositiveIntegerField(default=0, verbose_name='Nombre de visites')),
+                ('visites_sans_nouveau', models.PositiveIntegerField(default=0, verbose_name='Visites consécutives sans nouvelle intervention')),
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='suivi', to='Commentaires.article', verbose_name='Article')),
+            ],
+            options={
+                'verbose_name': "Suivi d'article",
+                'verbose_name_plural': "Suivis d'articles",
+                'ordering': ['prochaine_visite'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReleveArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date du relevé')),
+                ('nombre_interventions', models.PositiveIntegerField(default=0, help_text='Commentaires et réponses présents sur la page au moment du relevé', verbose_name="Nombre d'interventions")),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='releves', to='Commentaires.article', verbose_name='Article')),
+            ],
+            options={
+                'verbose_name': "Relevé d'article",
+                'verbose_name_plural': "Relevés d'articles",
+                'ordering': ['article', 'date'],
+                'indexes': [models.Index(fields=['article', 'date'], name='Commentaire_article_428056_idx')],
+            },
+        ),
+    ]
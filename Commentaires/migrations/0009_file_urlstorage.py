@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2025-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0008_suivi_article'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='urlstorage',
+            name='bail_detenteur',
+            field=models.CharField(blank=True, default='', help_text="Worker (hôte:pid:thread) qui traite l'URL", max_length=200, verbose_name='Détenteur du bail'),
+        ),
+        migrations.AddField(
+            model_name='urlstorage',
+            name='bail_expiration',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Expiration du bail'),
+        ),
+        migrations.AddField(
+            model_name='urlstorage',
+            name='derniere_erreur',
+            field=models.TextField(blank=True, default='', verbose_name='Dernière erreur'),
+        ),
+        migrations.AddField(
+            model_name='urlstorage',
+            name='disponible_a',
+            field=models.DateTimeField(blank=True, help_text='Délai avant nouvelle tentative après un échec', null=True, verbose_name='Disponible à partir de'),
+        ),
+        migrations.AddField(
+            model_name='urlstorage',
+            name='tentatives',
+            field=models.PositiveIntegerField(default=0, help_text="Nombre de fois où l'URL a été réclamée par un worker", verbose_name='Tentatives'),
+        ),
+        migrations.AddIndex(
+            model_name='urlstorage',
+            index=models.Index(fields=['statut', 'disponible_a'], name='Commentaire_statut_1e8ddd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='urlstorage',
+            index=models.Index(fields=['statut', 'bail_expiration'], name='Commentaire_statut_3215b1_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2025-10-19 19:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0009_file_urlstorage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrapeAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('detenteur', models.CharField(blank=True, default='', max_length=200, verbose_name='Worker')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de la tentative')),
+                ('statut', models.CharField(choices=[('succes', 'Succès'), ('inchange', 'Inchangé'), ('erreur', 'Erreur')], max_length=10, verbose_name='Résultat')),
+                ('statut_http', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Statut HTTP')),
+                ('octets', models.PositiveIntegerField(default=0, verbose_name='Octets téléchargés')),
+                ('requetes', models.PositiveSmallIntegerField(default=0, help_text='Requêtes envoyées, nouvelles tentatives comprises', verbose_name='Requêtes HTTP')),
+                ('duree_telechargement', models.FloatField(default=0.0, verbose_name='Durée du téléchargement')),
+                ('duree_analyse', models.FloatField(default=0.0, verbose_name="Durée de l'analyse HTML")),
+                ('duree_nettoyage', models.FloatField(default=0.0, help_text='Nettoyage et lemmatisation des contenus', verbose_name='Durée du nettoyage')),
+                ('duree_ecriture', models.FloatField(default=0.0, verbose_name="Durée de l'écriture en base")),
+                ('commentaires_trouves', models.PositiveIntegerField(default=0, help_text='Commentaires et réponses présents sur la page', verbose_name='Interventions trouvées')),
+                ('commentaires_inseres', models.PositiveIntegerField(default=0, verbose_name='Interventions insérées')),
+                ('erreur', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('article', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tentatives_scraping', to='Commentaires.article')),
+                ('historique', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tentatives', to='Commentaires.scrapinghistory', verbose_name='Lot de scraping')),
+            ],
+            options={
+                'verbose_name': 'Tentative de scraping',
+                'verbose_name_plural': 'Tentatives de scraping',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date'], name='Commentaire_date_96f94f_idx'), models.Index(fields=['url', 'date'], name='Commentaire_url_a1ff25_idx'), models.Index(fields=['statut', 'date'], name='Commentaire_statut_4dc79c_idx'), models.Index(fields=['statut_http', 'date'], name='Commentaire_statut__6d0e45_idx')],
+            },
+        ),
+    ]
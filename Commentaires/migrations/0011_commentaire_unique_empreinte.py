@@ -0,0 +1,141 @@
+# Generated by Django 5.2.6 on 2025-10-19 20:30
+
+import hashlib
+import re
+from datetime import datetime, time, timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from Commentaires.hyperloglog import HyperLogLog
+
+
+def dedoublonner(apps, schema_editor):
+    """
+    Fusionne les interventions en double (même article, même empreinte) avant la
+    contrainte d'unicité : la plus ancienne est gardée, les réponses des doublons
+    lui sont rattachées, puis les compteurs des articles touchés, leurs agrégats
+    journaliers et les compteurs de leurs auteurs sont recalculés
+    """
+    Article = apps.get_model('Commentaires', 'Article')
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+
+    def normaliser(texte):
+        return re.sub(r'\s+', ' ', (texte or '')).strip().casefold()
+
+    # Interventions créées sans empreinte (hors ingestion) : même calcul que Commentaire.calculer_empreinte
+    a_modifier = []
+    for commentaire in Commentaire.objects.filter(empreinte='').only('id', 'auteur', 'date_publication', 'contenu'):
+        hash_contenu = hashlib.sha256(normaliser(commentaire.contenu).encode('utf-8')).hexdigest()
+        cle = '\x1f'.join([normaliser(commentaire.auteur)[:200], (commentaire.date_publication or '').strip(), hash_contenu])
+        commentaire.empreinte = hashlib.sha1(cle.encode('utf-8')).hexdigest()
+        a_modifier.append(commentaire)
+    Commentaire.objects.bulk_update(a_modifier, ['empreinte'], batch_size=2000)
+
+    doublons = (
+        Commentaire.objects.values('article', 'empreinte')
+        .annotate(nombre=Count('id'), garde=Min('id'))
+        .filter(nombre__gt=1)
+    )
+    articles, supprimes = set(), []
+    for groupe in doublons.iterator():
+        autres = list(
+            Commentaire.objects.filter(article=groupe['article'], empreinte=groupe['empreinte'])
+            .exclude(id=groupe['garde']).values_list('id', 'profil_auteur', 'date_extraction')
+        )
+        ids = [pk for pk, _, _ in autres]
+        Commentaire.objects.filter(parent__in=ids).update(parent=groupe['garde'])
+        Commentaire.objects.filter(id__in=ids).delete()
+        supprimes += autres
+        articles.add(groupe['article'])
+
+    for article in Article.objects.filter(id__in=articles):
+        for principal in Commentaire.objects.filter(article=article, parent__isnull=True):
+            principal.nombre_reponses = Commentaire.objects.filter(parent=principal).count()
+            principal.save(update_fields=['nombre_reponses'])
+        article.nombre_commentaires = Commentaire.objects.filter(article=article, type='commentaire').count()
+        article.nombre_reponses = Commentaire.objects.filter(article=article, type='reponse').count()
+        article.save(update_fields=['nombre_commentaires', 'nombre_reponses'])
+
+    if not supprimes:
+        return
+    recalculer_activite(apps, articles, {timezone.localdate(date) for _, _, date in supprimes})
+    recalculer_auteurs(apps, {auteur for _, auteur, _ in supprimes if auteur is not None})
+    print(f"\n   🧹 {len(supprimes)} intervention(s) en double supprimée(s) dans {len(articles)} article(s)")
+
+
+def recalculer_activite(apps, articles, jours):
+    """
+    Recalcule les lignes d'activité des jours touchés (globale, catégories et articles
+    concernés), même calcul que ActiviteJournaliere.enregistrer_commentaires
+    """
+    Article = apps.get_model('Commentaires', 'Article')
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+    ActiviteJournaliere = apps.get_model('Commentaires', 'ActiviteJournaliere')
+
+    portees = {('global', ''): Q()}
+    for article in Article.objects.filter(id__in=articles):
+        portees[('article', str(article.pk))] = Q(article=article)
+        if article.categorie:
+            portees[('categorie', article.categorie)] = Q(article__categorie=article.categorie)
+
+    for jour in jours:
+        debut = timezone.make_aware(datetime.combine(jour, time.min))
+        du_jour = Commentaire.objects.filter(date_extraction__gte=debut, date_extraction__lt=debut + timedelta(days=1))
+        for (portee, cle), filtre in portees.items():
+            compteurs, sketch = {'commentaire': 0, 'reponse': 0}, HyperLogLog()
+            for type_intervention, auteur in du_jour.filter(filtre).values_list('type', 'auteur').iterator():
+                compteurs[type_intervention] = compteurs.get(type_intervention, 0) + 1
+                auteur = re.sub(r'\s+', ' ', auteur or '').strip().casefold()[:200]
+                if auteur:
+                    sketch.ajouter(auteur)
+            ActiviteJournaliere.objects.filter(portee=portee, cle=cle, date=jour).update(
+                nombre_commentaires=compteurs['commentaire'],
+                nombre_reponses=compteurs['reponse'],
+                sketch_auteurs=sketch.octets(),
+            )
+
+
+def recalculer_auteurs(apps, auteurs):
+    """Recalcule les compteurs des auteurs touchés, même agrégation que reconstruire_auteurs"""
+    Auteur = apps.get_model('Commentaires', 'Auteur')
+    Commentaire = apps.get_model('Commentaires', 'Commentaire')
+
+    stats = (
+        Commentaire.objects.filter(profil_auteur__in=auteurs)
+        .values('profil_auteur')
+        .annotate(
+            commentaires=Count('id', filter=Q(type='commentaire')),
+            reponses=Count('id', filter=Q(type='reponse')),
+            articles=Count('article', distinct=True),
+            derniere=Max('date_extraction'),
+        )
+    )
+    for ligne in stats:
+        Auteur.objects.filter(pk=ligne['profil_auteur']).update(
+            nombre_commentaires=ligne['commentaires'],
+            nombre_reponses=ligne['reponses'],
+            nombre_interventions=ligne['commentaires'] + ligne['reponses'],
+            nombre_articles=ligne['articles'],
+            derniere_activite=ligne['derniere'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0010_scrapeattempt'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedoublonner, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='commentaire',
+            name='Commentaire_article_e8d6b2_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='commentaire',
+            constraint=models.UniqueConstraint(fields=('article', 'empreinte'), name='commentaire_unique_empreinte'),
+        ),
+    ]
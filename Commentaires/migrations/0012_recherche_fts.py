@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2025-10-19 21:10
+
+from django.db import migrations
+
+# Index plein texte FTS5 à contenu externe : le texte reste dans Commentaires_commentaire,
+# l'index est tenu à jour par les déclencheurs (y compris bulk_create, bulk_update et les
+# suppressions en cascade). unicode61 + remove_diacritics 2 : « ecole » trouve « École ».
+CREATION = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS Commentaires_commentaire_fts USING fts5(
+        contenu, contenu_propre,
+        content='Commentaires_commentaire', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS Commentaires_commentaire_fts_ai AFTER INSERT ON Commentaires_commentaire BEGIN
+        INSERT INTO Commentaires_commentaire_fts(rowid, contenu, contenu_propre)
+        VALUES (new.id, new.contenu, new.contenu_propre);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS Commentaires_commentaire_fts_ad AFTER DELETE ON Commentaires_commentaire BEGIN
+        INSERT INTO Commentaires_commentaire_fts(Commentaires_commentaire_fts, rowid, contenu, contenu_propre)
+        VALUES ('delete', old.id, old.contenu, old.contenu_propre);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS Commentaires_commentaire_fts_au AFTER UPDATE OF contenu, contenu_propre ON Commentaires_commentaire BEGIN
+        INSERT INTO Commentaires_commentaire_fts(Commentaires_commentaire_fts, rowid, contenu, contenu_propre)
+        VALUES ('delete', old.id, old.contenu, old.contenu_propre);
+        INSERT INTO Commentaires_commentaire_fts(rowid, contenu, contenu_propre)
+        VALUES (new.id, new.contenu, new.contenu_propre);
+    END
+    """,
+    # Indexation des commentaires déjà présents
+    "INSERT INTO Commentaires_commentaire_fts(Commentaires_commentaire_fts) VALUES ('rebuild')",
+]
+
+SUPPRESSION = [
+    "DROP TRIGGER IF EXISTS Commentaires_commentaire_fts_ai",
+    "DROP TRIGGER IF EXISTS Commentaires_commentaire_fts_ad",
+    "DROP TRIGGER IF EXISTS Commentaires_commentaire_fts_au",
+    "DROP TABLE IF EXISTS Commentaires_commentaire_fts",
+]
+
+
+def executer(requetes):
+    def operation(apps, schema_editor):
+        # FTS5 est propre à SQLite : sur une autre base, la recherche renvoie une erreur explicite
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for requete in requetes:
+            schema_editor.execute(requete)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0011_commentaire_unique_empreinte'),
+    ]
+
+    operations = [
+        migrations.RunPython(executer(CREATION), executer(SUPPRESSION)),
+    ]
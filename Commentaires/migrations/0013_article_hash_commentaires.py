@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2025-10-19 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Commentaires', '0012_recherche_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='hash_commentaires',
+            field=models.CharField(blank=True, help_text='sha256 de la section des commentaires enregistrée, pour ignorer les fils inchangés', max_length=64, null=True, verbose_name='Empreinte des commentaires'),
+        ),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+import hashlib
+import heapq
+import math
 import re
+import threading
+from datetime import timedelta
 from django.utils import timezone
 from dateutil import parser as date_parser
 from django.core.validators import MinLengthValidator
@@ -16,11 +21,13 @@ class Article(models.Model):
     titre = models.TextField(verbose_name="Titre de l'article",help_text="Titre complet de l'article")
     url = models.URLField(max_length=500,verbose_name="URL de l'article",help_text="Lien vers l'article original")
     date_publication = models.CharField(max_length=100,verbose_name="Date de publication",help_text="Date de publication originale de l'article")
+    date_publication_dt = models.DateTimeField(blank=True,null=True,verbose_name="Date de publication (analysée)",help_text="Date de publication convertie depuis le texte français")
     categorie = models.CharField(max_length=200,blank=True,null=True,verbose_name="Catégorie",help_text="Catégorie ou rubrique de l'article")   
 
     
     # Métadonnées de scraping
     date_scraping = models.DateTimeField(default=timezone.now,verbose_name="Date du scraping",help_text="Date et heure du scraping de l'article")
+    hash_commentaires = models.CharField(max_length=64,blank=True,null=True,verbose_name="Empreinte des commentaires",help_text="sha256 de la section des commentaires enregistrée, pour ignorer les fils inchangés")
     
     # Champs calculés (pour optimisation)
     nombre_commentaires = models.PositiveIntegerField(default=0,verbose_name="Nombre de commentaires",help_text="Nombre total de commentaires pour cet article")
@@ -34,6 +41,7 @@ class Article(models.Model):
             models.Index(fields=['article_id']),
             models.Index(fields=['date_scraping']),
             models.Index(fields=['categorie']),
+            models.Index(fields=['date_publication_dt']),
         ]
 
     def __str__(self):
@@ -54,6 +62,134 @@ class Article(models.Model):
         self.nombre_reponses = stats['total_reponses'] or 0
         self.save()
 
+#----------------------------------------------------------------------------------------------------------------------------  
+class Auteur(models.Model):
+    """Auteur normalisé des commentaires, avec compteurs d'activité maintenus à l'ingestion"""
+
+    nom = models.CharField(max_length=200,verbose_name="Nom affiché",help_text="Première graphie rencontrée du pseudonyme")
+    nom_normalise = models.CharField(max_length=200,unique=True,verbose_name="Nom normalisé",help_text="Pseudonyme en minuscules, espaces réduits")
+
+    # Compteurs maintenus à l'ingestion
+    nombre_commentaires = models.PositiveIntegerField(default=0,verbose_name="Nombre de commentaires")
+    nombre_reponses = models.PositiveIntegerField(default=0,verbose_name="Nombre de réponses")
+    nombre_interventions = models.PositiveIntegerField(default=0,verbose_name="Nombre d'interventions",help_text="Commentaires et réponses (tri des auteurs les plus actifs)")
+    nombre_articles = models.PositiveIntegerField(default=0,verbose_name="Nombre d'articles commentés")
+    derniere_activite = models.DateTimeField(blank=True,null=True,verbose_name="Dernière activité")
+
+    class Meta:
+        verbose_name = "Auteur"
+        verbose_name_plural = "Auteurs"
+        ordering = ['-nombre_interventions']
+        indexes = [
+            models.Index(fields=['-nombre_interventions']),
+            models.Index(fields=['derniere_activite']),
+        ]
+
+    def __str__(self):
+        return f"{self.nom} ({self.nombre_interventions})"
+
+    @staticmethod
+    def normaliser(nom):
+        """Clé de regroupement : casse et espaces ignorés"""
+        return re.sub(r'\s+', ' ', (nom or '')).strip().casefold()[:200]
+
+    @classmethod
+    def resoudre(cls, noms):
+        """Retourne {nom normalisé: Auteur} en créant les auteurs inconnus (deux requêtes)"""
+        graphies = {}
+        for nom in noms:
+            cle = cls.normaliser(nom)
+            if cle:
+                graphies.setdefault(cle, re.sub(r'\s+', ' ', nom).strip()[:200])
+
+        auteurs = {auteur.nom_normalise: auteur for auteur in cls.objects.filter(nom_normalise__in=graphies)}
+        manquants = [cls(nom=graphies[cle], nom_normalise=cle) for cle in graphies if cle not in auteurs]
+        if manquants:
+            cls.objects.bulk_create(manquants, ignore_conflicts=True)
+            auteurs.update({auteur.nom_normalise: auteur for auteur in cls.objects.filter(nom_normalise__in=[a.nom_normalise for a in manquants])})
+        return auteurs
+
+    @classmethod
+    def enregistrer_commentaires(cls, article, commentaires):
+        """Met à jour les compteurs des auteurs à partir des interventions nouvellement ingérées"""
+        from django.db.models import F
+        from django.db.models.functions import Coalesce, Greatest
+
+        par_auteur = {}
+        for commentaire in commentaires:
+            if commentaire.profil_auteur_id is None:
+                continue
+            compteurs = par_auteur.setdefault(commentaire.profil_auteur_id, {'commentaires': 0, 'reponses': 0, 'derniere': commentaire.date_extraction, 'ids': []})
+            if commentaire.type == Commentaire.TYPE_REPONSE:
+                compteurs['reponses'] += 1
+            else:
+                compteurs['commentaires'] += 1
+            compteurs['derniere'] = max(compteurs['derniere'], commentaire.date_extraction)
+            compteurs['ids'].append(commentaire.pk)
+
+        if not par_auteur:
+            return
+
+        # Auteurs ayant déjà commenté cet article avant cette ingestion
+        nouveaux_ids = [pk for compteurs in par_auteur.values() for pk in compteurs['ids']]
+        deja_presents = set(
+            Commentaire.objects
+            .filter(article=article, profil_auteur__in=list(par_auteur))
+            .exclude(pk__in=nouveaux_ids)
+            .values_list('profil_auteur', flat=True)
+            .distinct()
+        )
+
+        for auteur_id, compteurs in par_auteur.items():
+            cls.objects.filter(pk=auteur_id).update(
+                nombre_commentaires=F('nombre_commentaires') + compteurs['commentaires'],
+                nombre_reponses=F('nombre_reponses') + compteurs['reponses'],
+                nombre_interventions=F('nombre_interventions') + compteurs['commentaires'] + compteurs['reponses'],
+                nombre_articles=F('nombre_articles') + (0 if auteur_id in deja_presents else 1),
+                derniere_activite=Greatest(Coalesce('derniere_activite', compteurs['derniere']), compteurs['derniere']),
+            )
+
+    @classmethod
+    def recalculer(cls, auteurs=None, batch_size=500):
+        """Recalcule les compteurs à partir des commentaires, pour les auteurs donnés (pks) ou pour tous"""
+        from django.db.models import Count, Max, Q
+
+        commentaires = Commentaire.objects.filter(profil_auteur__isnull=False)
+        a_recalculer = cls.objects.all()
+        if auteurs is not None:
+            commentaires = commentaires.filter(profil_auteur__in=auteurs)
+            a_recalculer = a_recalculer.filter(pk__in=auteurs)
+
+        # Compteurs recalculés en une seule agrégation
+        stats = (
+            commentaires
+            .values('profil_auteur')
+            .annotate(
+                commentaires=Count('id', filter=Q(type=Commentaire.TYPE_COMMENTAIRE)),
+                reponses=Count('id', filter=Q(type=Commentaire.TYPE_REPONSE)),
+                articles=Count('article', distinct=True),
+                derniere=Max('date_extraction'),
+            )
+        )
+        par_auteur = {ligne['profil_auteur']: ligne for ligne in stats}
+
+        a_modifier = []
+        for auteur in a_recalculer:
+            ligne = par_auteur.get(auteur.pk, {})
+            auteur.nombre_commentaires = ligne.get('commentaires', 0)
+            auteur.nombre_reponses = ligne.get('reponses', 0)
+            auteur.nombre_interventions = auteur.nombre_commentaires + auteur.nombre_reponses
+            auteur.nombre_articles = ligne.get('articles', 0)
+            auteur.derniere_activite = ligne.get('derniere')
+            a_modifier.append(auteur)
+        cls.objects.bulk_update(
+            a_modifier,
+            ['nombre_commentaires', 'nombre_reponses', 'nombre_interventions', 'nombre_articles', 'derniere_activite'],
+            batch_size=batch_size,
+        )
+        return a_modifier
+
+
 #----------------------------------------------------------------------------------------------------------------------------  
 class Commentaire(models.Model):
     """Modèle pour stocker les commentaires et réponses"""
@@ -76,7 +212,9 @@ class Commentaire(models.Model):
     
     # Contenu
     auteur = models.CharField(max_length=200,verbose_name="Auteur du commentaire",help_text="Nom ou pseudonyme de l'auteur")
+    profil_auteur = models.ForeignKey(Auteur,on_delete=models.SET_NULL,related_name='commentaires',blank=True,null=True,verbose_name="Profil de l'auteur",help_text="Auteur normalisé (casse et espaces ignorés)")
     date_publication = models.CharField(max_length=100,verbose_name="Date de publication",help_text="Date de publication originale du commentaire")
+    date_publication_dt = models.DateTimeField(blank=True,null=True,verbose_name="Date de publication (analysée)",help_text="Date de publication convertie, année déduite de l'article")
     contenu = models.TextField(verbose_name="Contenu du commentaire",help_text="Texte complet du commentaire",validators=[MinLengthValidator(5)])
     
     # Métadonnées techniques
@@ -90,6 +228,7 @@ class Commentaire(models.Model):
 
     # Métadonnées de scraping
     date_extraction = models.DateTimeField(default=timezone.now,verbose_name="Date d'extraction",help_text="Date et heure du scraping du commentaire")
+    empreinte = models.CharField(max_length=40,blank=True,default='',verbose_name="Empreinte",help_text="Empreinte stable (auteur, date, contenu normalisé) pour l'ingestion incrémentale")
 
     # Champs calculés
     nombre_reponses = models.PositiveIntegerField(default=0,verbose_name="Nombre de réponses",help_text="Nombre de réponses à ce commentaire")
@@ -102,13 +241,26 @@ class Commentaire(models.Model):
         indexes = [
             models.Index(fields=['article', 'type']),
             models.Index(fields=['auteur']),
-            models.Index(fields=['date_publication']),
+            models.Index(fields=['profil_auteur', 'date_extraction']),
+            models.Index(fields=['date_publication_dt']),
             models.Index(fields=['longueur_contenu']),
         ]
+        constraints = [
+            # Une intervention (même auteur, même date, même contenu) n'existe qu'une fois par article
+            models.UniqueConstraint(fields=['article', 'empreinte'], name='commentaire_unique_empreinte'),
+        ]
 
     def __str__(self):
         return f"{self.commentaire_id} - {self.auteur} - {self.contenu[:50]}..."
 
+    @staticmethod
+    def calculer_empreinte(auteur, date_publication, contenu):
+        """Empreinte d'une intervention : auteur normalisé, date brute et hash du contenu normalisé"""
+        contenu_normalise = re.sub(r'\s+', ' ', (contenu or '')).strip().casefold()
+        hash_contenu = hashlib.sha256(contenu_normalise.encode('utf-8')).hexdigest()
+        cle = '\x1f'.join([Auteur.normaliser(auteur), (date_publication or '').strip(), hash_contenu])
+        return hashlib.sha1(cle.encode('utf-8')).hexdigest()
+
     def est_commentaire_principal(self):
         """Vérifie si c'est un commentaire principal (sans parent)"""
         return self.type == self.TYPE_COMMENTAIRE and self.parent is None
@@ -118,6 +270,10 @@ class Commentaire(models.Model):
         return self.type == self.TYPE_REPONSE
 
     def save(self, *args, **kwargs):
+        # Empreinte requise par la contrainte d'unicité (interventions créées hors ingestion)
+        if not self.empreinte:
+            self.empreinte = self.calculer_empreinte(self.auteur, self.date_publication, self.contenu)
+
         # Sauvegarde initiale pour avoir un PK
         is_new = self.pk is None
         super().save(*args, **kwargs)
@@ -133,10 +289,287 @@ class Commentaire(models.Model):
         if self.article:
             self.article.update_statistiques()
 
+    # Recherche plein texte (table FTS5 de la migration 0012, tenue à jour par déclencheurs)
+    TABLE_RECHERCHE = 'Commentaires_commentaire_fts'
+    POIDS_RECHERCHE = (1.0, 0.5)  # BM25 : mot exact dans contenu, lemme dans contenu_propre
+    TAILLE_PAGE_MAX = 100
+
+    @staticmethod
+    def expression_recherche(requete, lemmes=None):
+        """
+        Traduit une requête utilisateur en expression FTS5 sûre (chaque terme est cité)
+
+        Les termes sont combinés en ET ; "expressions entre guillemets" et préfixes (mot*)
+        sont conservés. Un terme est aussi cherché sous son lemme (contenu_propre est lemmatisé).
+
+        Args:
+            requete: Texte saisi
+            lemmes: Dictionnaire {mot: lemme} optionnel
+        """
+        lemmes = lemmes or {}
+        clauses = []
+        for phrase, mot, prefixe in re.findall(r'"([^"]*)"|(\w+)(\*?)', (requete or '').lower()):
+            if phrase.strip():
+                clauses.append('"' + phrase.strip().replace('"', '""') + '"')
+                continue
+            if not mot:
+                continue
+            variantes = ['"' + mot + '"' + prefixe]
+            lemme = lemmes.get(mot, '').lower()
+            if lemme and lemme != mot and re.fullmatch(r'\w+', lemme):
+                variantes.append('"' + lemme + '"' + prefixe)
+            clauses.append(variantes[0] if len(variantes) == 1 else '(' + ' OR '.join(variantes) + ')')
+        return ' AND '.join(clauses)
+
+    @classmethod
+    def rechercher(cls, requete, article=None, categorie=None, page=1, taille=20, lemmes=None):
+        """
+        Recherche plein texte classée par BM25, avec extrait surligné et pagination
+
+        Args:
+            requete: Texte saisi (voir expression_recherche)
+            article: pk d'article pour restreindre la recherche
+            categorie: Catégorie d'article pour restreindre la recherche
+            page: Numéro de page (à partir de 1)
+            taille: Résultats par page (au plus TAILLE_PAGE_MAX)
+            lemmes: Dictionnaire {mot: lemme} de la requête
+
+        Returns:
+            Dictionnaire {expression, total, page, taille, pages, resultats}
+        """
+        import html
+        from django.db import NotSupportedError, connection
+
+        if connection.vendor != 'sqlite':
+            raise NotSupportedError("La recherche plein texte repose sur FTS5 (SQLite)")
+        expression = cls.expression_recherche(requete, lemmes)
+        if not expression:
+            raise ValueError("Requête de recherche vide")
+        page = max(1, int(page))
+        taille = min(max(1, int(taille)), cls.TAILLE_PAGE_MAX)
+
+        fts = cls.TABLE_RECHERCHE
+        jointures = f"JOIN {cls._meta.db_table} c ON c.id = {fts}.rowid"
+        conditions, parametres = [f"{fts} MATCH %s"], [expression]
+        if article is not None:
+            conditions.append("c.article_id = %s")
+            parametres.append(article)
+        if categorie:
+            jointures += f" JOIN {Article._meta.db_table} a ON a.id = c.article_id"
+            conditions.append("a.categorie = %s")
+            parametres.append(categorie)
+        filtre = f"FROM {fts} {jointures} WHERE {' AND '.join(conditions)}"
+        poids = ', '.join(str(p) for p in cls.POIDS_RECHERCHE)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) {filtre}", parametres)
+            total = cursor.fetchone()[0]
+            # Extrait pris dans le texte original ; marqueurs \x02/\x03 remplacés après échappement HTML
+            cursor.execute(
+                f"SELECT c.id, bm25({fts}, {poids}) AS score, "
+                f"snippet({fts}, 0, char(2), char(3), '…', 16) {filtre} "
+                f"ORDER BY score LIMIT %s OFFSET %s",
+                parametres + [taille, (page - 1) * taille],
+            )
+            lignes = cursor.fetchall()
+
+        commentaires = cls.objects.select_related('article').in_bulk([ligne[0] for ligne in lignes])
+        resultats = []
+        for pk, score, extrait in lignes:
+            commentaire = commentaires.get(pk)
+            if commentaire is None:
+                continue
+            resultats.append({
+                'id': commentaire.id,
+                'commentaire_id': commentaire.commentaire_id,
+                'type': commentaire.type,
+                'auteur': commentaire.auteur,
+                'date_publication': commentaire.date_publication,
+                'score': round(-score, 4),
+                'extrait': html.escape(extrait or '').replace('\x02', '<mark>').replace('\x03', '</mark>'),
+                'article': {
+                    'id': commentaire.article.id,
+                    'titre': commentaire.article.titre,
+                    'url': commentaire.article.url,
+                    'categorie': commentaire.article.categorie,
+                },
+            })
+
+        return {
+            'expression': expression,
+            'total': total,
+            'page': page,
+            'taille': taille,
+            'pages': (total + taille - 1) // taille,
+            'resultats': resultats,
+        }
+
+
+#----------------------------------------------------------------------------------------------------------------------------  
+class ActiviteJournaliere(models.Model):
+    """Agrégat quotidien de l'activité, alimenté à l'ingestion (global, par catégorie et par article)"""
+
+    PORTEE_GLOBALE = 'global'
+    PORTEE_CATEGORIE = 'categorie'
+    PORTEE_ARTICLE = 'article'
+    PORTEE_CHOICES = [
+        (PORTEE_GLOBALE, 'Global'),
+        (PORTEE_CATEGORIE, 'Par catégorie'),
+        (PORTEE_ARTICLE, 'Par article'),
+    ]
+
+    date = models.DateField(verbose_name="Jour",help_text="Jour d'extraction des commentaires agrégés")
+    portee = models.CharField(max_length=10,choices=PORTEE_CHOICES,default=PORTEE_GLOBALE,verbose_name="Portée")
+    cle = models.CharField(max_length=200,blank=True,default='',verbose_name="Clé",help_text="Vide pour le global, nom de la catégorie ou pk de l'article")
+    article = models.ForeignKey(Article,on_delete=models.CASCADE,related_name='activites',blank=True,null=True,verbose_name="Article associé")
+
+    nombre_commentaires = models.PositiveIntegerField(default=0,verbose_name="Nombre de commentaires")
+    nombre_reponses = models.PositiveIntegerField(default=0,verbose_name="Nombre de réponses")
+    sketch_auteurs = models.BinaryField(blank=True,null=True,verbose_name="Sketch des auteurs",help_text="HyperLogLog des auteurs distincts du jour (voir hyperloglog.py)")
+
+    class Meta:
+        verbose_name = "Activité journalière"
+        verbose_name_plural = "Activités journalières"
+        ordering = ['date']
+        unique_together = ['portee', 'cle', 'date']
+
+    def __str__(self):
+        return f"{self.date} - {self.portee} {self.cle} - {self.total_interventions()}"
+
+    def total_interventions(self):
+        return self.nombre_commentaires + self.nombre_reponses
+
+    @classmethod
+    def portees_pour(cls, article):
+        """Retourne les couples (portée, clé) mis à jour pour un article"""
+        portees = [(cls.PORTEE_GLOBALE, ''), (cls.PORTEE_ARTICLE, str(article.pk))]
+        if article.categorie:
+            portees.append((cls.PORTEE_CATEGORIE, article.categorie))
+        return portees
+
+    @classmethod
+    def incrementer(cls, article, jour, commentaires=0, reponses=0, auteurs=()):
+        """Ajoute des compteurs (et des auteurs au sketch) au jour donné pour toutes les portées de l'article"""
+        from django.db.models import F
+        from .hyperloglog import HyperLogLog
+
+        for portee, cle in cls.portees_pour(article):
+            ligne, created = cls.objects.get_or_create(
+                portee=portee,
+                cle=cle,
+                date=jour,
+                defaults={'article': article if portee == cls.PORTEE_ARTICLE else None},
+            )
+            cls.objects.filter(pk=ligne.pk).update(
+                nombre_commentaires=F('nombre_commentaires') + commentaires,
+                nombre_reponses=F('nombre_reponses') + reponses,
+            )
+
+            if auteurs:
+                sketch = HyperLogLog(ligne.sketch_auteurs)
+                for auteur in auteurs:
+                    sketch.ajouter(auteur)
+                cls.objects.filter(pk=ligne.pk).update(sketch_auteurs=sketch.octets())
+
+    @classmethod
+    def enregistrer_commentaires(cls, article, commentaires):
+        """Met à jour les agrégats à partir des commentaires nouvellement ingérés"""
+        par_jour = {}
+        for commentaire in commentaires:
+            jour = timezone.localdate(commentaire.date_extraction)
+            compteurs = par_jour.setdefault(jour, [0, 0, set()])
+            if commentaire.type == Commentaire.TYPE_REPONSE:
+                compteurs[1] += 1
+            else:
+                compteurs[0] += 1
+            auteur = Auteur.normaliser(commentaire.auteur)
+            if auteur:
+                compteurs[2].add(auteur)
+
+        for jour, (nb_commentaires, nb_reponses, auteurs) in par_jour.items():
+            cls.incrementer(article, jour, commentaires=nb_commentaires, reponses=nb_reponses, auteurs=auteurs)
+
+    @classmethod
+    def retirer(cls, retraits, categories=None, articles_supprimes=()):
+        """
+        Retire des interventions supprimées des compteurs journaliers, en une mise à jour par (portée, clé, jour)
+
+        retraits : {(pk de l'article, jour): [commentaires, réponses]} ; categories :
+        {pk de l'article: catégorie}. Les lignes des articles supprimés partent en
+        cascade et ne sont pas mises à jour. Le sketch des auteurs, non décrémentable,
+        est conservé.
+        """
+        from django.db.models import F
+        from django.db.models.functions import Greatest
+
+        categories = categories or {}
+        par_portee = {}
+        for (article_id, jour), (nb_commentaires, nb_reponses) in retraits.items():
+            portees = [(cls.PORTEE_GLOBALE, '')]
+            if article_id not in articles_supprimes:
+                portees.append((cls.PORTEE_ARTICLE, str(article_id)))
+            if categories.get(article_id):
+                portees.append((cls.PORTEE_CATEGORIE, categories[article_id]))
+            for portee, cle in portees:
+                compteurs = par_portee.setdefault((portee, cle, jour), [0, 0])
+                compteurs[0] += nb_commentaires
+                compteurs[1] += nb_reponses
+
+        for (portee, cle, jour), (nb_commentaires, nb_reponses) in par_portee.items():
+            cls.objects.filter(portee=portee, cle=cle, date=jour).update(
+                nombre_commentaires=Greatest(F('nombre_commentaires') - nb_commentaires, 0),
+                nombre_reponses=Greatest(F('nombre_reponses') - nb_reponses, 0),
+            )
+
+    @classmethod
+    def auteurs_distincts(cls, debut=None, fin=None, articles=None, categorie=None) -> int:
+        """
+        Estime le nombre d'auteurs distincts en fusionnant les sketches journaliers
+
+        articles : sélection d'articles (sketches par article), sinon la catégorie
+        ou le global. Erreur type relative ≈ 2.3 % (voir hyperloglog.ERREUR_RELATIVE).
+        """
+        from .hyperloglog import HyperLogLog
+
+        if articles is not None:
+            lignes = cls.objects.filter(portee=cls.PORTEE_ARTICLE, article__in=articles)
+        elif categorie:
+            lignes = cls.objects.filter(portee=cls.PORTEE_CATEGORIE, cle=categorie)
+        else:
+            lignes = cls.objects.filter(portee=cls.PORTEE_GLOBALE, cle='')
+        if debut is not None:
+            lignes = lignes.filter(date__gte=debut)
+        if fin is not None:
+            lignes = lignes.filter(date__lte=fin)
+
+        return HyperLogLog.union(lignes.values_list('sketch_auteurs', flat=True)).estimation()
+
+    @classmethod
+    def serie(cls, debut, fin, article=None, categorie=None):
+        """Retourne {jour: ligne} pour la portée demandée entre deux dates incluses"""
+        if article is not None:
+            portee, cle = cls.PORTEE_ARTICLE, str(article.pk)
+        elif categorie:
+            portee, cle = cls.PORTEE_CATEGORIE, categorie
+        else:
+            portee, cle = cls.PORTEE_GLOBALE, ''
+
+        lignes = cls.objects.filter(portee=portee, cle=cle, date__gte=debut, date__lte=fin).defer('sketch_auteurs')
+        return {ligne.date: ligne for ligne in lignes}
+
 
 #----------------------------------------------------------------------------------------------------------------------------  
 class URLStorage(models.Model):
-    """Stockage des URLs à scraper"""
+    """
+    File durable des URLs à scraper
+
+    Un worker (commande scrape_worker) réclame des URLs en attente en posant un
+    bail : tant qu'il n'a pas expiré, aucun autre worker ne les prend. Un bail
+    expiré (worker arrêté ou planté) est repris par le prochain worker. Les
+    échecs sont retentés avec un délai doublé à chaque tentative, jusqu'à
+    TENTATIVES_MAX ; une URL dont le bail expire encore après TENTATIVES_MAX
+    réservations (page qui fait planter le worker) passe en ERREUR.
+    """
     EN_ATTENTE = 'attente'
     EN_COURS = 'cours'
     TERMINE = 'termine'
@@ -155,9 +588,279 @@ class URLStorage(models.Model):
     date_ajout = models.DateTimeField(auto_now_add=True)
     date_maj = models.DateTimeField(auto_now=True)
 
+    # File de travail
+    tentatives = models.PositiveIntegerField(default=0, verbose_name="Tentatives", help_text="Nombre de fois où l'URL a été réclamée par un worker")
+    disponible_a = models.DateTimeField(null=True, blank=True, verbose_name="Disponible à partir de", help_text="Délai avant nouvelle tentative après un échec")
+    bail_detenteur = models.CharField(max_length=200, blank=True, default='', verbose_name="Détenteur du bail", help_text="Worker (hôte:pid:thread) qui traite l'URL")
+    bail_expiration = models.DateTimeField(null=True, blank=True, verbose_name="Expiration du bail")
+    derniere_erreur = models.TextField(blank=True, default='', verbose_name="Dernière erreur")
+
+    TENTATIVES_MAX = 5
+    DELAI_NOUVELLE_TENTATIVE = timedelta(minutes=1)   # doublé à chaque échec
+    DUREE_BAIL = timedelta(minutes=10)
+
     class Meta:
         unique_together = ['url']
         ordering = ['-date_ajout']
+        indexes = [
+            models.Index(fields=['statut', 'disponible_a']),
+            models.Index(fields=['statut', 'bail_expiration']),
+        ]
+
+    @classmethod
+    def enfiler(cls, urls, taille_lot=500):
+        """
+        Met des URLs en attente par insertions groupées ; les URLs déjà présentes sont ignorées
+
+        Returns:
+            int: Nombre d'URLs réellement ajoutées
+        """
+        avant = cls.objects.count()
+        cls.objects.bulk_create((cls(url=url, statut=cls.EN_ATTENTE) for url in urls), batch_size=taille_lot, ignore_conflicts=True)
+        return cls.objects.count() - avant
+
+    @classmethod
+    def remettre_en_file(cls, urls):
+        """Met en attente des URLs, nouvelles ou déjà connues (sauf celles en cours de traitement)"""
+        urls = list(urls)
+        cls.enfiler(urls)
+        cls.objects.filter(url__in=urls).exclude(statut=cls.EN_COURS).update(
+            statut=cls.EN_ATTENTE, tentatives=0, disponible_a=None, derniere_erreur='', date_maj=timezone.now(),
+        )
+
+    @classmethod
+    def baux_expires(cls, maintenant=None):
+        """URLs en cours dont le bail a expiré (worker arrêté ou planté)"""
+        from django.db.models import Q
+
+        maintenant = maintenant or timezone.now()
+        return cls.objects.filter(Q(statut=cls.EN_COURS) & (Q(bail_expiration__isnull=True) | Q(bail_expiration__lte=maintenant)))
+
+    @classmethod
+    def reclamables(cls, maintenant=None):
+        """URLs en attente (hors délai de nouvelle tentative) ou dont le bail a expiré avant TENTATIVES_MAX"""
+        from django.db.models import Q
+
+        maintenant = maintenant or timezone.now()
+        return cls.objects.filter(
+            Q(statut=cls.EN_ATTENTE) & (Q(disponible_a__isnull=True) | Q(disponible_a__lte=maintenant))
+            | Q(statut=cls.EN_COURS, tentatives__lt=cls.TENTATIVES_MAX) & (Q(bail_expiration__isnull=True) | Q(bail_expiration__lte=maintenant))
+        )
+
+    @classmethod
+    def abandonner_baux_expires(cls, maintenant=None):
+        """Passe en ERREUR les URLs dont le bail a expiré après TENTATIVES_MAX réservations ; renvoie leur nombre"""
+        maintenant = maintenant or timezone.now()
+        return cls.baux_expires(maintenant).filter(tentatives__gte=cls.TENTATIVES_MAX).update(
+            statut=cls.ERREUR,
+            bail_detenteur='',
+            bail_expiration=None,
+            disponible_a=None,
+            derniere_erreur=f"Bail expiré après {cls.TENTATIVES_MAX} tentatives",
+            date_maj=maintenant,
+        )
+
+    @classmethod
+    def reclamer(cls, detenteur, nombre=10, duree=None, urls=None):
+        """
+        Réserve atomiquement jusqu'à `nombre` URLs pour un worker
+
+        La mise à jour conditionnelle revérifie que chaque URL est toujours
+        réclamable : deux workers concurrents ne peuvent pas obtenir la même.
+
+        Args:
+            detenteur (str): Identifiant du worker
+            nombre (int): Nombre maximal d'URLs réservées
+            duree (timedelta): Durée du bail, DUREE_BAIL par défaut
+            urls (list): Restreindre la réservation à ces URLs
+
+        Returns:
+            list[URLStorage]: URLs réservées
+        """
+        maintenant = timezone.now()
+        expiration = maintenant + (duree or cls.DUREE_BAIL)
+        cls.abandonner_baux_expires(maintenant)
+        candidates = cls.reclamables(maintenant)
+        if urls is not None:
+            candidates = candidates.filter(url__in=urls)
+        ids = list(candidates.order_by('disponible_a', 'date_ajout').values_list('id', flat=True)[:nombre])
+        if not ids:
+            return []
+
+        cls.reclamables(maintenant).filter(id__in=ids).update(
+            statut=cls.EN_COURS,
+            bail_detenteur=detenteur,
+            bail_expiration=expiration,
+            tentatives=models.F('tentatives') + 1,
+            date_maj=maintenant,
+        )
+        return list(cls.objects.filter(id__in=ids, bail_detenteur=detenteur, bail_expiration=expiration))
+
+    @classmethod
+    def prolonger(cls, detenteur, duree=None):
+        """Prolonge les baux encore détenus par le worker ; renvoie leur nombre"""
+        return cls.objects.filter(statut=cls.EN_COURS, bail_detenteur=detenteur).update(
+            bail_expiration=timezone.now() + (duree or cls.DUREE_BAIL),
+        )
+
+    @classmethod
+    def liberer(cls, detenteur):
+        """Rend immédiatement à la file les URLs réservées par un worker qui s'arrête"""
+        return cls.objects.filter(statut=cls.EN_COURS, bail_detenteur=detenteur).update(
+            statut=cls.EN_ATTENTE, bail_detenteur='', bail_expiration=None, tentatives=models.F('tentatives') - 1,
+        )
+
+    def terminer(self, detenteur, article=None):
+        """Marque l'URL traitée si le worker détient toujours son bail ; renvoie False sinon"""
+        champs = {'statut': self.TERMINE, 'bail_detenteur': '', 'bail_expiration': None,
+                  'disponible_a': None, 'derniere_erreur': '', 'date_maj': timezone.now()}
+        if article is not None:
+            champs['article'] = article
+        return bool(type(self).objects.filter(pk=self.pk, bail_detenteur=detenteur).update(**champs))
+
+    def echouer(self, detenteur, erreur, definitif=False):
+        """
+        Enregistre un échec : nouvelle tentative différée (délai doublé à chaque
+        tentative, avec une part aléatoire), ou statut ERREUR après TENTATIVES_MAX
+        ou si l'échec est définitif (page inexistante)
+        """
+        import random
+
+        tentatives = type(self).objects.filter(pk=self.pk).values_list('tentatives', flat=True).first() or 0
+        champs = {'bail_detenteur': '', 'bail_expiration': None, 'derniere_erreur': str(erreur), 'date_maj': timezone.now()}
+        if definitif or tentatives >= self.TENTATIVES_MAX:
+            champs.update(statut=self.ERREUR, disponible_a=None)
+        else:
+            delai = self.DELAI_NOUVELLE_TENTATIVE * (2 ** max(tentatives - 1, 0)) * random.uniform(0.8, 1.2)
+            champs.update(statut=self.EN_ATTENTE, disponible_a=timezone.now() + delai)
+        return bool(type(self).objects.filter(pk=self.pk, bail_detenteur=detenteur).update(**champs))
+
+#----------------------------------------------------------------------------------------------------------------------------  
+class ReleveArticle(models.Model):
+    """Nombre d'interventions d'un article relevé à chaque scraping"""
+
+    article = models.ForeignKey(Article,on_delete=models.CASCADE,related_name='releves',verbose_name="Article")
+    date = models.DateTimeField(default=timezone.now,verbose_name="Date du relevé")
+    nombre_interventions = models.PositiveIntegerField(default=0,verbose_name="Nombre d'interventions",help_text="Commentaires et réponses présents sur la page au moment du relevé")
+
+    class Meta:
+        verbose_name = "Relevé d'article"
+        verbose_name_plural = "Relevés d'articles"
+        ordering = ['article', 'date']
+        indexes = [
+            models.Index(fields=['article', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.article.article_id} - {self.date:%Y-%m-%d %H:%M} - {self.nombre_interventions}"
+
+
+class SuiviArticle(models.Model):
+    """
+    Planification des re-scrapings d'un article
+
+    Le débit de commentaires (interventions par heure) est une moyenne mobile
+    exponentielle des relevés successifs. Un article actif est revisité quand
+    environ CIBLE_PAR_VISITE nouvelles interventions sont attendues ; un article
+    sans nouveauté voit son intervalle doubler à chaque visite (jusqu'à INTERVALLE_MAX).
+    """
+
+    INTERVALLE_MIN = timedelta(minutes=30)
+    INTERVALLE_MAX = timedelta(days=7)
+    DEMI_VIE_TAUX = 24        # heures : au-delà, une ancienne observation pèse moins de la moitié
+    CIBLE_PAR_VISITE = 5      # nouvelles interventions attendues entre deux visites d'un article actif
+
+    article = models.OneToOneField(Article,on_delete=models.CASCADE,related_name='suivi',verbose_name="Article")
+    taux = models.FloatField(default=0.0,verbose_name="Débit estimé",help_text="Nouvelles interventions par heure (moyenne mobile exponentielle)")
+    nombre_interventions = models.PositiveIntegerField(default=0,verbose_name="Interventions au dernier relevé")
+    derniere_visite = models.DateTimeField(default=timezone.now,verbose_name="Dernière visite")
+    intervalle = models.DurationField(default=INTERVALLE_MIN,verbose_name="Intervalle de visite")
+    prochaine_visite = models.DateTimeField(default=timezone.now,db_index=True,verbose_name="Prochaine visite")
+    visites = models.PositiveIntegerField(default=0,verbose_name="Nombre de visites")
+    visites_sans_nouveau = models.PositiveIntegerField(default=0,verbose_name="Visites consécutives sans nouvelle intervention")
+
+    class Meta:
+        verbose_name = "Suivi d'article"
+        verbose_name_plural = "Suivis d'articles"
+        ordering = ['prochaine_visite']
+
+    def __str__(self):
+        return f"{self.article.article_id} - {self.taux:.2f}/h - prochaine visite {self.prochaine_visite:%Y-%m-%d %H:%M}"
+
+    def manques_estimes(self, maintenant=None) -> float:
+        """
+        Nouvelles interventions attendues depuis la dernière visite
+
+        L'intérêt pour un fil s'éteint : le débit est supposé décroître avec la
+        demi-vie DEMI_VIE_TAUX, d'où un total borné par taux × demi-vie / ln 2.
+        """
+        heures = max(((maintenant or timezone.now()) - self.derniere_visite).total_seconds() / 3600, 0.0)
+        return self.taux * self.DEMI_VIE_TAUX / math.log(2) * (1 - 0.5 ** (heures / self.DEMI_VIE_TAUX))
+
+    @classmethod
+    def observer(cls, article, nombre_interventions, date=None):
+        """
+        Enregistre un relevé et replanifie la prochaine visite de l'article
+
+        Args:
+            article (Article): Article scrapé
+            nombre_interventions (int): Commentaires et réponses présents sur la page
+            date (datetime): Date du relevé, par défaut maintenant
+
+        Returns:
+            SuiviArticle: Suivi mis à jour
+        """
+        date = date or timezone.now()
+        ReleveArticle.objects.create(article=article, date=date, nombre_interventions=nombre_interventions)
+
+        suivi = cls.objects.filter(article=article).first()
+        if suivi is None:
+            # Premier relevé : débit moyen depuis la publication, si elle est connue
+            from .dates_fr import parse_date_article
+
+            suivi = cls(article=article)
+            publication = article.date_publication_dt or parse_date_article(article.date_publication or '')
+            nouveaux = nombre_interventions if publication else 0
+            if nouveaux:
+                heures = max((date - publication).total_seconds() / 3600, 1.0)
+                suivi.taux = nouveaux / heures
+        else:
+            heures = max((date - suivi.derniere_visite).total_seconds() / 3600, 1 / 60)
+            nouveaux = max(nombre_interventions - suivi.nombre_interventions, 0)
+            poids = 1 - 0.5 ** (heures / cls.DEMI_VIE_TAUX)
+            suivi.taux += poids * (nouveaux / heures - suivi.taux)
+
+        if nouveaux and suivi.taux > 0:
+            # Article actif : revenir quand CIBLE_PAR_VISITE interventions sont attendues
+            suivi.intervalle = min(max(timedelta(hours=cls.CIBLE_PAR_VISITE / suivi.taux), cls.INTERVALLE_MIN), cls.INTERVALLE_MAX)
+            suivi.visites_sans_nouveau = 0
+        else:
+            # Article froid : recul exponentiel
+            suivi.intervalle = min(suivi.intervalle * 2, cls.INTERVALLE_MAX)
+            suivi.visites_sans_nouveau += 1
+
+        suivi.nombre_interventions = nombre_interventions
+        suivi.derniere_visite = date
+        suivi.prochaine_visite = date + suivi.intervalle
+        suivi.visites += 1
+        suivi.save()
+        return suivi
+
+    @classmethod
+    def a_revisiter(cls, budget, maintenant=None):
+        """
+        Choisit les articles à re-scraper dans la limite du budget de requêtes
+
+        Parmi les articles dont la visite est échue, garde ceux dont on attend
+        le plus de nouvelles interventions (à égalité, les plus en retard).
+        """
+        maintenant = maintenant or timezone.now()
+        echus = cls.objects.filter(prochaine_visite__lte=maintenant).select_related('article')
+        return heapq.nlargest(
+            budget,
+            echus.iterator(chunk_size=2000),
+            key=lambda suivi: (suivi.manques_estimes(maintenant), maintenant - suivi.prochaine_visite),
+        )
 
 class ScrapingHistory(models.Model):
     """Historique des opérations de scraping"""
@@ -181,7 +884,207 @@ class ScrapingHistory(models.Model):
     class Meta:
         ordering = ['-date_lancement']
 
-            
-            
-            
-        
\ No newline at end of file
+    def actualiser(self):
+        """Recalcule la progression à partir de l'état des URLs dans la file ; clôt le lot quand toutes sont traitées"""
+        import json
+
+        urls = json.loads(self.urls_selectionnees or '[]')
+        statuts = URLStorage.objects.filter(url__in=urls).values_list('statut', flat=True)
+        traitees = sum(statut in (URLStorage.TERMINE, URLStorage.ERREUR) for statut in statuts)
+        self.progression = int(traitees / len(urls) * 100) if urls else 100
+        champs = ['progression']
+        if traitees >= len(urls) and self.statut == self.EN_COURS:
+            self.statut = self.TERMINE
+            self.date_fin = timezone.now()
+            champs += ['statut', 'date_fin']
+        self.save(update_fields=champs)
+
+    @classmethod
+    def en_cours_pour(cls, urls):
+        """Lots en cours qui contiennent l'une de ces URLs"""
+        import json
+
+        urls = set(urls)
+        return [historique for historique in cls.objects.filter(statut=cls.EN_COURS)
+                if urls.intersection(json.loads(historique.urls_selectionnees or '[]'))]
+
+    @classmethod
+    def actualiser_pour(cls, urls):
+        """Actualise les lots en cours qui contiennent l'une de ces URLs ; renvoie ces lots"""
+        lots = cls.en_cours_pour(urls)
+        for historique in lots:
+            historique.actualiser()
+        return lots
+
+
+class ScrapeAttempt(models.Model):
+    """Une tentative de scraping d'une URL : statut, volumes et durée de chaque étape"""
+    SUCCES = 'succes'
+    INCHANGE = 'inchange'
+    ERREUR = 'erreur'
+
+    STATUT_CHOICES = [
+        (SUCCES, 'Succès'),
+        (INCHANGE, 'Inchangé'),
+        (ERREUR, 'Erreur'),
+    ]
+
+    historique = models.ForeignKey(ScrapingHistory, on_delete=models.SET_NULL, null=True, blank=True, related_name='tentatives', verbose_name="Lot de scraping")
+    url = models.URLField(max_length=500)
+    article = models.ForeignKey(Article, on_delete=models.SET_NULL, null=True, blank=True, related_name='tentatives_scraping')
+    detenteur = models.CharField(max_length=200, blank=True, default='', verbose_name="Worker")
+    date = models.DateTimeField(default=timezone.now, verbose_name="Date de la tentative")
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, verbose_name="Résultat")
+
+    # Téléchargement
+    statut_http = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Statut HTTP")
+    octets = models.PositiveIntegerField(default=0, verbose_name="Octets téléchargés")
+    requetes = models.PositiveSmallIntegerField(default=0, verbose_name="Requêtes HTTP", help_text="Requêtes envoyées, nouvelles tentatives comprises")
+
+    # Durées des étapes (secondes)
+    duree_telechargement = models.FloatField(default=0.0, verbose_name="Durée du téléchargement")
+    duree_analyse = models.FloatField(default=0.0, verbose_name="Durée de l'analyse HTML")
+    duree_nettoyage = models.FloatField(default=0.0, verbose_name="Durée du nettoyage", help_text="Nettoyage et lemmatisation des contenus")
+    duree_ecriture = models.FloatField(default=0.0, verbose_name="Durée de l'écriture en base")
+
+    # Volumes
+    commentaires_trouves = models.PositiveIntegerField(default=0, verbose_name="Interventions trouvées", help_text="Commentaires et réponses présents sur la page")
+    commentaires_inseres = models.PositiveIntegerField(default=0, verbose_name="Interventions insérées")
+
+    erreur = models.TextField(blank=True, default='', verbose_name="Erreur")
+
+    class Meta:
+        verbose_name = "Tentative de scraping"
+        verbose_name_plural = "Tentatives de scraping"
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['url', 'date']),
+            models.Index(fields=['statut', 'date']),
+            models.Index(fields=['statut_http', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.url} - {self.statut} - {self.duree_totale():.2f}s"
+
+    def duree_totale(self):
+        return self.duree_telechargement + self.duree_analyse + self.duree_nettoyage + self.duree_ecriture
+
+    ETAPES = ('duree_telechargement', 'duree_analyse', 'duree_nettoyage', 'duree_ecriture')
+
+    @classmethod
+    def resume(cls, tentatives=None):
+        """
+        Durées par étape et pages problématiques d'un ensemble de tentatives
+
+        Returns:
+            dict: {'tentatives', 'erreurs', 'etapes': {étape: {'moyenne', 'total'}},
+                   'urls_en_erreur': [(url, nombre d'erreurs), ...]}
+        """
+        from django.db.models import Avg, Count, Q, Sum
+
+        tentatives = cls.objects.all() if tentatives is None else tentatives
+        agregats = tentatives.aggregate(
+            nombre=Count('id'),
+            erreurs=Count('id', filter=Q(statut=cls.ERREUR)),
+            **{f'moyenne_{etape}': Avg(etape) for etape in cls.ETAPES},
+            **{f'total_{etape}': Sum(etape) for etape in cls.ETAPES},
+        )
+        urls_en_erreur = (tentatives.filter(statut=cls.ERREUR).values('url').annotate(nombre=Count('id'))
+                          .order_by('-nombre')[:10])
+        return {
+            'tentatives': agregats['nombre'],
+            'erreurs': agregats['erreurs'],
+            'etapes': {
+                etape: {'moyenne': agregats[f'moyenne_{etape}'] or 0.0, 'total': agregats[f'total_{etape}'] or 0.0}
+                for etape in cls.ETAPES
+            },
+            'urls_en_erreur': [(ligne['url'], ligne['nombre']) for ligne in urls_en_erreur],
+        }
+
+
+#----------------------------------------------------------------------------------------------------------------------------  
+class SuppressionsCommentaires:
+    """
+    Interventions supprimées dans une même transaction, retirées des agrégats à sa validation
+
+    Les récepteurs (pre_delete d'Article, post_delete de Commentaire, suppressions
+    directes ou en cascade) alimentent le lot ; à la validation, les compteurs
+    journaliers sont décrémentés par (portée, clé, jour) et les auteurs concernés
+    recalculés en une seule agrégation, au lieu de quelques requêtes par ligne.
+    Un lot annulé (rollback) est abandonné avec son callback.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, using, savepoints):
+        self.using = using
+        self.savepoints = savepoints
+        self.retraits = {}            # (pk de l'article, jour) -> [commentaires, réponses]
+        self.categories = {}          # pk de l'article -> catégorie
+        self.articles_supprimes = set()
+        self.auteurs = set()
+
+    @classmethod
+    def courant(cls, using):
+        """Lot de la transaction (et du point de sauvegarde) en cours, enregistré auprès de on_commit"""
+        connexion = transaction.get_connection(using)
+        lots = cls._local.__dict__.setdefault('lots', {})
+        lot = lots.get(using)
+        en_attente = lot is not None and any(fonction == lot.appliquer for _, fonction, _ in connexion.run_on_commit)
+        if en_attente and lot.savepoints == list(connexion.savepoint_ids):
+            return lot
+
+        lot = lots[using] = cls(using, list(connexion.savepoint_ids))
+        if connexion.in_atomic_block:
+            transaction.on_commit(lot.appliquer, using=using)
+        return lot
+
+    @staticmethod
+    def _valider(lot):
+        # Hors transaction (autocommit), on_commit exécuterait le lot avant qu'il soit rempli
+        if not transaction.get_connection(lot.using).in_atomic_block:
+            lot.appliquer()
+
+    @classmethod
+    def noter_article(cls, article, using):
+        lot = cls.courant(using)
+        lot.categories[article.pk] = article.categorie
+        lot.articles_supprimes.add(article.pk)
+        cls._valider(lot)
+
+    @classmethod
+    def noter_commentaire(cls, commentaire, using):
+        lot = cls.courant(using)
+        compteurs = lot.retraits.setdefault((commentaire.article_id, timezone.localdate(commentaire.date_extraction)), [0, 0])
+        compteurs[1 if commentaire.type == Commentaire.TYPE_REPONSE else 0] += 1
+        if commentaire.profil_auteur_id is not None:
+            lot.auteurs.add(commentaire.profil_auteur_id)
+        cls._valider(lot)
+
+    def appliquer(self):
+        lots = self._local.__dict__.get('lots', {})
+        if lots.get(self.using) is self:
+            del lots[self.using]
+
+        # Catégories des articles conservés : une seule requête pour tout le lot
+        manquants = {article_id for article_id, _ in self.retraits} - self.categories.keys()
+        if manquants:
+            self.categories.update(Article.objects.using(self.using).filter(pk__in=manquants).values_list('pk', 'categorie'))
+        ActiviteJournaliere.retirer(self.retraits, self.categories, self.articles_supprimes)
+        if self.auteurs:
+            Auteur.recalculer(sorted(self.auteurs))
+        self.retraits, self.auteurs = {}, set()
+
+
+def article_supprime(sender, instance, using, **kwargs):
+    """Récepteur de pre_delete : note la catégorie de l'article avant la suppression de ses interventions"""
+    SuppressionsCommentaires.noter_article(instance, using)
+
+
+def commentaire_supprime(sender, instance, using, **kwargs):
+    """
+    Récepteur de post_delete (suppression directe ou en cascade) : l'intervention est
+    retirée des agrégats journaliers et des compteurs de son auteur à la validation
+    """
+    SuppressionsCommentaires.noter_commentaire(instance, using)
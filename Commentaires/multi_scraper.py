@@ -8,21 +8,49 @@ Description: Ce script scrape les commentaires d'articles de LeFaso.net et les s
 
 import pandas as pd
 from lefaso_scraper import LefasoCommentScraper
+from async_fetcher import AsyncFetcher
+from analyse_parallele import AnalyseurParallele
+from html_cache import HTMLCache
+from source_locale import ouvrir_source
 from datetime import datetime
 
-def scraper_multiple_urls(urls):
+def scraper_multiple_urls(urls, concurrence=4, requetes_par_seconde=0.5, timeout=30, cache_dir=None, parser='auto', processus=None, source=None):
     """
     Scrape plusieurs URLs et combine les résultats
+
+    Les pages sont téléchargées en parallèle (concurrence et débit par hôte
+    réglables) puis analysées dès leur arrivée par un pool de `processus`
+    processus (None : un par cœur, 0 : dans le processus courant). Avec
+    cache_dir, les pages sont revalidées par requête conditionnelle et les
+    fils inchangés sont ignorés.
+    parser choisit le moteur d'analyse HTML (voir LefasoCommentScraper.PARSERS).
+    source (chemin d'un répertoire de pages ou d'une archive WARC) rejoue des
+    pages enregistrées sans accès réseau.
     """
-    scraper = LefasoCommentScraper()
+    cache = HTMLCache(cache_dir) if cache_dir else None
+    source = ouvrir_source(source) if source else None
+    scraper = LefasoCommentScraper(cache=cache, parser=parser, source=source)
+    fetcher = AsyncFetcher(
+        concurrence=concurrence,
+        requetes_par_seconde=requetes_par_seconde,
+        timeout=timeout,
+        headers=scraper.session.headers,
+        cache=cache,
+        source=source,
+    )
     all_data = []
     
-    for i, url in enumerate(urls, 1):
-        print(f"\n🔍 Processing URL {i}/{len(urls)}: {url}")
-        
-        data = scraper.scrape_article_comments(url)
-        if data and data.get('commentaires'):
-            all_data.append(data)
+    with AnalyseurParallele(processus=processus, parser=parser, cache_dir=cache_dir) as analyseur:
+        for i, (page, data) in enumerate(analyseur.iter_analyses(fetcher.iter_resultats(urls)), 1):
+            print(f"\n🔍 Processing URL {i}/{len(urls)}: {page['url']}")
+            
+            if data.get('erreur'):
+                print(f"❌ Erreur lors de la récupération ou de l'analyse de la page: {data['erreur']}")
+                continue
+            
+            if data.get('commentaires'):
+                all_data.append(data)
+                scraper.marquer_traite(data)
     
     # Combiner tous les DataFrames
     combined_df = pd.DataFrame()
@@ -0,0 +1,242 @@
+"""
+Serveur HTTP local imitant LeFaso.net
+Description: Sert des pages d'articles SPIP synthétiques (ou enregistrées) pour régler
+la concurrence et les limites de débit du scraping sans solliciter lefaso.net.
+La latence, le taux d'erreurs 500 et le taux de réponses 429 sont paramétrables.
+
+Les pages synthétiques sont déterministes : l'article N a toujours le même contenu
+(et le même ETag) pour une configuration donnée.
+
+Utilisation:
+    python serveur_local.py --port 8000 --commentaires 40 --profondeur 2 --latence 0.05 --taux-429 0.05
+    puis http://127.0.0.1:8000/spip.php?article1
+"""
+
+import argparse
+import functools
+import hashlib
+import html
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_ARTICLE = re.compile(r'^/spip\.php\?article(\d+)$')
+
+MOIS = ('janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
+        'septembre', 'octobre', 'novembre', 'décembre')
+MOTS = ('le', 'peuple', 'gouvernement', 'Faso', 'courage', 'école', 'route', 'santé', 'jeunesse',
+        'sécurité', 'merci', 'pour', 'cette', 'information', 'il', 'faut', 'agir', 'vite', 'ensemble',
+        'nous', 'sommes', 'fiers', 'de', 'notre', 'pays', 'vraiment', 'dommage', 'bravo', 'aux', 'autorités')
+AUTEURS = tuple(f"{prenom} {nom}" for prenom in ('Awa', 'Issa', 'Mariam', 'Ousmane', 'Salif', 'Aminata', 'Boureima', 'Fatim')
+                for nom in ('Ouédraogo', 'Sawadogo', 'Traoré', 'Kaboré', 'Compaoré', 'Zongo', 'Ilboudo', 'Sanou'))
+
+
+@functools.lru_cache(maxsize=1024)
+def generer_article(numero: int, commentaires: int = 20, profondeur: int = 2, reponses: int = 2) -> bytes:
+    """
+    Page d'article SPIP synthétique, avec un fil ul#navforum
+
+    Args:
+        numero (int): Numéro de l'article (graine du contenu)
+        commentaires (int): Nombre de commentaires principaux
+        profondeur (int): Profondeur maximale des réponses (0 : aucune réponse)
+        reponses (int): Nombre maximal de réponses par commentaire et par niveau
+    """
+    rng = random.Random(numero)
+    mois = rng.randrange(12)
+
+    def phrase():
+        texte = ' '.join(rng.choice(MOTS) for _ in range(rng.randint(8, 30)))
+        return html.escape(texte[0].upper() + texte[1:] + rng.choice(('.', ' !', ' ?')))
+
+    def element(niveau):
+        chapo = f"par {html.escape(rng.choice(AUTEURS))}, {rng.randint(1, 28)} {MOIS[mois]} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}"
+        sous_fil = ''
+        if niveau < profondeur:
+            enfants = [element(niveau + 1) for _ in range(rng.randint(0, reponses))]
+            if enfants:
+                sous_fil = '<ul>' + ''.join(enfants) + '</ul>'
+        classe = ' class="forum-fil"' if niveau == 0 else ''
+        return (f'<li{classe}><div class="forum-message"><div class="forum-chapo">{chapo}</div>'
+                f'<div class="forum-texte"><div class="ugccmt-commenttext"><p>{phrase()}</p></div></div>'
+                f'<p class="repondre"><a href="#">Répondre à ce message</a></p></div>{sous_fil}</li>\n')
+
+    fil = ''.join(element(0) for _ in range(commentaires))
+    texte = ''.join(f'<p>{phrase()}</p>\n' for _ in range(15))
+    page = f'''<!DOCTYPE html>
+<html dir="ltr" lang="fr">
+<head><meta charset="utf-8" /><title>Article {numero} - LeFaso.net</title></head>
+<body class="page_article">
+<header id="entete"><h1 class="entry-title"><a href="/">LeFaso.net</a></h1></header>
+<div id="hierarchie"><a href="/">Accueil</a>&gt;<a href="/spip.php?rubrique2">Actualités</a>&gt;<a href="/spip.php?rubrique5">Société</a></div>
+<article>
+<h1 class="entry-title">Article synthétique numéro {numero}</h1>
+<p class="info-publi">Publié le lundi {rng.randint(1, 28)} {MOIS[mois]} 2025 à {rng.randint(6, 22)}h{rng.randint(0, 59):02d}min</p>
+<div class="texte">
+{texte}</div>
+</article>
+<div id="forum">
+<h2>Vos réactions ({commentaires})</h2>
+<ul id="navforum" class="forum">
+{fil}</ul>
+</div>
+<footer id="pied"><p>&copy; LeFaso.net</p></footer>
+</body>
+</html>
+'''
+    return page.encode('utf-8')
+
+
+class ServeurLefaso:
+    """
+    Serveur de pages d'articles dans un thread, avec pannes injectables
+
+    Utilisation:
+        with ServeurLefaso(commentaires=30, latence=0.02, taux_429=0.05) as serveur:
+            urls = [serveur.url_article(n) for n in range(1, 101)]
+    """
+
+    def __init__(self, port: int = 0, commentaires: int = 20, profondeur: int = 2, reponses: int = 2,
+                 latence: float = 0.0, taux_erreurs: float = 0.0, taux_429: float = 0.0,
+                 retry_after: Optional[int] = None, source=None, graine: Optional[int] = None):
+        """
+        Args:
+            port (int): Port d'écoute (0 : port libre choisi par le système)
+            commentaires (int): Commentaires principaux par article synthétique
+            profondeur (int): Profondeur maximale des réponses
+            reponses (int): Réponses maximales par commentaire et par niveau
+            latence (float): Latence moyenne ajoutée à chaque réponse (secondes, ± 50 %)
+            taux_erreurs (float): Proportion de réponses 500
+            taux_429 (float): Proportion de réponses 429
+            retry_after (int): Valeur de l'en-tête Retry-After des réponses 429, optionnelle
+            source: Source locale (voir source_locale) servie à la place des pages synthétiques
+            graine (int): Graine du tirage des pannes (reproductibilité)
+        """
+        self.port = port
+        self.commentaires = commentaires
+        self.profondeur = profondeur
+        self.reponses = reponses
+        self.latence = latence
+        self.taux_erreurs = taux_erreurs
+        self.taux_429 = taux_429
+        self.retry_after = retry_after
+        self.source = source
+        self.rng = random.Random(graine)
+        self.verrou = threading.Lock()
+        self.statistiques: Dict[str, int] = {'requetes': 0, '200': 0, '304': 0, '404': 0, '429': 0, '500': 0, 'octets': 0}
+        self.serveur = None
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.serveur.server_address[1]}"
+
+    def url_article(self, numero: int) -> str:
+        return f"{self.base_url}/spip.php?article{numero}"
+
+    def page(self, numero: int) -> Optional[bytes]:
+        if self.source is not None:
+            return self.source.lire(f"https://lefaso.net/spip.php?article{numero}")
+        return generer_article(numero, self.commentaires, self.profondeur, self.reponses)
+
+    def tirer_panne(self) -> Optional[int]:
+        """Statut de panne à renvoyer (429 ou 500), ou None"""
+        with self.verrou:
+            tirage = self.rng.random()
+        if tirage < self.taux_429:
+            return 429
+        if tirage < self.taux_429 + self.taux_erreurs:
+            return 500
+        return None
+
+    def compter(self, statut: int, octets: int = 0):
+        with self.verrou:
+            self.statistiques['requetes'] += 1
+            self.statistiques[str(statut)] = self.statistiques.get(str(statut), 0) + 1
+            self.statistiques['octets'] += octets
+
+    def demarrer(self) -> 'ServeurLefaso':
+        serveur_lefaso = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass  # pas de journal par requête
+
+            def repondre(self, statut, corps=b'', en_tetes=None):
+                self.send_response(statut)
+                for nom, valeur in (en_tetes or {}).items():
+                    self.send_header(nom, valeur)
+                self.send_header('Content-Length', str(len(corps)))
+                self.end_headers()
+                self.wfile.write(corps)
+                serveur_lefaso.compter(statut, len(corps))
+
+            def do_GET(self):
+                if serveur_lefaso.latence:
+                    time.sleep(serveur_lefaso.latence * random.uniform(0.5, 1.5))
+
+                correspondance = _ARTICLE.match(self.path)
+                contenu = serveur_lefaso.page(int(correspondance.group(1))) if correspondance else None
+                if contenu is None:
+                    return self.repondre(404, b'Not Found')
+
+                panne = serveur_lefaso.tirer_panne()
+                if panne == 429:
+                    en_tetes = {'Retry-After': str(serveur_lefaso.retry_after)} if serveur_lefaso.retry_after is not None else {}
+                    return self.repondre(429, b'Too Many Requests', en_tetes)
+                if panne:
+                    return self.repondre(panne, b'Internal Server Error')
+
+                etag = '"' + hashlib.sha1(contenu).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    return self.repondre(304, en_tetes={'ETag': etag})
+                self.repondre(200, contenu, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag})
+
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.serveur.daemon_threads = True
+        self.thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def arreter(self):
+        if self.serveur is not None:
+            self.serveur.shutdown()
+            self.serveur.server_close()
+            self.serveur = None
+
+    def __enter__(self) -> 'ServeurLefaso':
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local imitant LeFaso.net")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--commentaires', type=int, default=20)
+    parser.add_argument('--profondeur', type=int, default=2)
+    parser.add_argument('--reponses', type=int, default=2)
+    parser.add_argument('--latence', type=float, default=0.0)
+    parser.add_argument('--taux-erreurs', type=float, default=0.0)
+    parser.add_argument('--taux-429', type=float, default=0.0)
+    parser.add_argument('--source', help="Répertoire de pages ou archive WARC à servir")
+    args = parser.parse_args()
+
+    source = None
+    if args.source:
+        from source_locale import ouvrir_source
+        source = ouvrir_source(args.source)
+
+    serveur = ServeurLefaso(args.port, args.commentaires, args.profondeur, args.reponses,
+                            args.latence, args.taux_erreurs, args.taux_429, source=source).demarrer()
+    print(f"🌐 Serveur local sur {serveur.base_url}/spip.php?article1 (Ctrl+C pour arrêter)")
+    try:
+        serveur.thread.join()
+    except KeyboardInterrupt:
+        serveur.arreter()
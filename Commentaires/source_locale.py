@@ -0,0 +1,242 @@
+"""
+Sources locales de pages LeFaso.net pour le rejeu hors ligne
+Description: Remplacent le réseau par des réponses enregistrées, pour des scrapings
+reproductibles, des benchmarks et des tests de non-régression des sélecteurs.
+
+Sources acceptées (voir ouvrir_source):
+    - un répertoire de pages HTML : index.json {url: fichier} s'il existe, sinon
+      article<id>.html (ou .html.gz) pour spip.php?article<id> ;
+    - un répertoire de cache HTMLCache (sous-dossiers objets/ et urls/) ;
+    - une archive WARC (.warc ou .warc.gz) : enregistrements « response ».
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    from .html_cache import HTMLCache
+except ImportError:
+    # Exécution en script depuis le dossier Commentaires
+    from html_cache import HTMLCache
+
+_ARTICLE_ID = re.compile(r'article(\d+)')
+
+
+def nom_fichier(url: str) -> str:
+    """Nom du fichier d'une page dans un répertoire de pages HTML"""
+    correspondance = _ARTICLE_ID.search(url)
+    if correspondance:
+        return f"article{correspondance.group(1)}.html"
+    return hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html'
+
+
+class RepertoireHTML:
+    """Pages HTML enregistrées dans un répertoire"""
+
+    def __init__(self, repertoire: str):
+        self.repertoire = repertoire
+        self.index = {}
+        chemin_index = os.path.join(repertoire, 'index.json')
+        if os.path.exists(chemin_index):
+            with open(chemin_index, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+    def urls(self) -> Iterator[str]:
+        """URLs connues de l'index (les pages nommées d'après l'URL n'en ont pas besoin)"""
+        return iter(self.index)
+
+    def lire(self, url: str) -> Optional[bytes]:
+        chemin = os.path.join(self.repertoire, self.index.get(url) or nom_fichier(url))
+        for candidat, ouvrir in ((chemin, open), (chemin + '.gz', gzip.open)):
+            if os.path.exists(candidat):
+                with ouvrir(candidat, 'rb') as f:
+                    return f.read()
+        return None
+
+    def enregistrer(self, url: str, contenu: bytes):
+        """Ajoute une page (et l'URL à l'index), pour constituer un jeu de pages"""
+        os.makedirs(self.repertoire, exist_ok=True)
+        fichier = self.index.get(url) or nom_fichier(url)
+        with open(os.path.join(self.repertoire, fichier), 'wb') as f:
+            f.write(contenu)
+        self.index[url] = fichier
+        with open(os.path.join(self.repertoire, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+
+
+class CacheHTML:
+    """Pages d'un cache HTMLCache existant (rejeu des derniers téléchargements)"""
+
+    def __init__(self, repertoire: str):
+        self.cache = HTMLCache(repertoire)
+
+    def urls(self) -> Iterator[str]:
+        dossier = os.path.join(self.cache.repertoire, 'urls')
+        for nom in sorted(os.listdir(dossier)):
+            with open(os.path.join(dossier, nom), 'r', encoding='utf-8') as f:
+                yield json.load(f)['url']
+
+    def lire(self, url: str) -> Optional[bytes]:
+        return self.cache.lire(url)
+
+
+class ArchiveWARC:
+    """
+    Réponses HTTP d'une archive WARC (compressée par enregistrement ou non)
+
+    L'archive est parcourue une fois à l'ouverture pour indexer, pour chaque
+    réponse, la position du membre gzip qui la contient (position dans le fichier
+    compressé) et celle de son corps dans ce membre. lire() ne décompresse ensuite
+    que ce membre : un seul enregistrement dans une archive .warc.gz standard
+    (un membre par enregistrement), toute l'archive si elle n'a qu'un membre.
+    """
+
+    TAILLE_LECTURE = 1 << 16
+
+    def __init__(self, chemin: str):
+        self.chemin = chemin
+        self.compresse = chemin.endswith('.gz')
+        # url -> (position du membre gzip ou None, position du bloc, longueur du bloc)
+        self.index: Dict[str, Tuple[Optional[int], int, int]] = {}
+        if self.compresse:
+            with open(self.chemin, 'rb') as f:
+                for membre, donnees in self._membres(f):
+                    self._indexer(io.BytesIO(donnees), membre)
+        else:
+            with open(self.chemin, 'rb') as f:
+                self._indexer(f, None)
+
+    def _indexer(self, f, membre: Optional[int]):
+        for en_tetes, debut, longueur in self._enregistrements(f):
+            if en_tetes.get('warc-type') == 'response' and 'warc-target-uri' in en_tetes:
+                self.index[en_tetes['warc-target-uri'].strip('<>')] = (membre, debut, longueur)
+
+    @classmethod
+    def _lire_membre(cls, f, position: int) -> Tuple[bytes, int]:
+        """Décompresse le membre gzip qui commence à `position` ; rend (contenu, position du membre suivant)"""
+        f.seek(position)
+        decompresseur = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        morceaux, lus = [], 0
+        while not decompresseur.eof:
+            donnees = f.read(cls.TAILLE_LECTURE)
+            if not donnees:
+                raise EOFError(f"Membre gzip tronqué à la position {position}")
+            lus += len(donnees)
+            morceaux.append(decompresseur.decompress(donnees))
+        return b''.join(morceaux), position + lus - len(decompresseur.unused_data)
+
+    @classmethod
+    def _membres(cls, f) -> Iterator[Tuple[int, bytes]]:
+        """Rend (position compressée, contenu décompressé) de chaque membre gzip du fichier"""
+        taille = os.fstat(f.fileno()).st_size
+        position = 0
+        while position < taille:
+            donnees, suivant = cls._lire_membre(f, position)
+            yield position, donnees
+            position = suivant
+
+    @staticmethod
+    def _enregistrements(f) -> Iterator[Tuple[Dict[str, str], int, int]]:
+        """Rend (en-têtes WARC, position du bloc, longueur du bloc) pour chaque enregistrement"""
+        while True:
+            ligne = f.readline()
+            if not ligne:
+                return
+            if not ligne.startswith(b'WARC/'):
+                continue  # lignes vides entre deux enregistrements
+
+            en_tetes = {}
+            for ligne in iter(f.readline, b''):
+                if ligne in (b'\r\n', b'\n'):
+                    break
+                nom, _, valeur = ligne.decode('utf-8', 'replace').partition(':')
+                en_tetes[nom.strip().lower()] = valeur.strip()
+
+            longueur = int(en_tetes.get('content-length', 0))
+            debut = f.tell()
+            yield en_tetes, debut, longueur
+            f.seek(debut + longueur)
+
+    def urls(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def lire(self, url: str) -> Optional[bytes]:
+        if url not in self.index:
+            return None
+        membre, debut, longueur = self.index[url]
+        with open(self.chemin, 'rb') as f:
+            if membre is None:
+                f.seek(debut)
+                bloc = f.read(longueur)
+            else:
+                bloc = self._lire_membre(f, membre)[0][debut:debut + longueur]
+        return self.corps_http(bloc)
+
+    @staticmethod
+    def corps_http(bloc: bytes) -> Optional[bytes]:
+        """Corps d'une réponse HTTP brute (déchunkée et décompressée), None si statut d'erreur"""
+        tete, _, corps = bloc.partition(b'\r\n\r\n')
+        lignes = tete.decode('iso-8859-1').split('\r\n')
+        statut = int(lignes[0].split()[1]) if len(lignes[0].split()) > 1 else 200
+        if statut >= 400:
+            return None
+
+        en_tetes = {}
+        for ligne in lignes[1:]:
+            nom, _, valeur = ligne.partition(':')
+            en_tetes[nom.strip().lower()] = valeur.strip().lower()
+
+        if 'chunked' in en_tetes.get('transfer-encoding', ''):
+            flux, corps = io.BytesIO(corps), b''
+            for ligne in iter(flux.readline, b''):
+                taille = int(ligne.split(b';')[0].strip() or b'0', 16)
+                if taille == 0:
+                    break
+                corps += flux.read(taille)
+                flux.readline()
+
+        encodage = en_tetes.get('content-encoding', '')
+        if encodage == 'gzip':
+            corps = gzip.decompress(corps)
+        elif encodage == 'deflate':
+            corps = zlib.decompress(corps)
+        return corps
+
+    @staticmethod
+    def ecrire(chemin: str, pages: Dict[str, bytes]):
+        """
+        Écrit des pages dans une archive WARC (jeux de pages pour tests et benchmarks)
+
+        En .warc.gz, chaque enregistrement est un membre gzip distinct, comme dans
+        les archives des robots d'archivage : il peut être lu sans décompresser les autres.
+        """
+        compresse = chemin.endswith('.gz')
+        with open(chemin, 'wb') as f:
+            for url, contenu in pages.items():
+                bloc = (b'HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n'
+                        + f'Content-Length: {len(contenu)}\r\n\r\n'.encode('ascii') + contenu)
+                enregistrement = (
+                    b'WARC/1.0\r\nWARC-Type: response\r\n'
+                    + f'WARC-Target-URI: {url}\r\n'.encode('utf-8')
+                    + b'Content-Type: application/http; msgtype=response\r\n'
+                    + f'Content-Length: {len(bloc)}\r\n\r\n'.encode('ascii')
+                    + bloc + b'\r\n\r\n'
+                )
+                f.write(gzip.compress(enregistrement) if compresse else enregistrement)
+
+
+def ouvrir_source(chemin: str):
+    """Ouvre une source locale d'après son chemin (répertoire de pages, cache HTMLCache ou WARC)"""
+    if os.path.isdir(chemin):
+        if os.path.isdir(os.path.join(chemin, 'objets')) and os.path.isdir(os.path.join(chemin, 'urls')):
+            return CacheHTML(chemin)
+        return RepertoireHTML(chemin)
+    if chemin.endswith(('.warc', '.warc.gz')):
+        return ArchiveWARC(chemin)
+    raise ValueError(f"Source locale non reconnue: {chemin} (répertoire ou archive .warc/.warc.gz attendu)")
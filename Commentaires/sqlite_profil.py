@@ -0,0 +1,52 @@
+"""
+Profil de connexion SQLite
+Description: PRAGMA appliqués à chaque nouvelle connexion (signal connection_created),
+pour que le scraping en arrière-plan écrive pendant que le tableau de bord lit.
+
+Le profil est choisi par settings.SQLITE_PROFIL : nom d'un profil de PROFILS, ou
+dictionnaire {pragma: valeur}. En mode WAL, les lecteurs ne sont jamais bloqués par
+l'écrivain (et inversement) ; le mode est enregistré dans le fichier de la base et
+crée à côté d'elle les fichiers DB.sqlite3-wal et DB.sqlite3-shm.
+"""
+
+from typing import Dict, Optional, Union
+
+PROFILS: Dict[str, Dict[str, Union[str, int]]] = {
+    # Réglages par défaut de SQLite (journal de rollback, écrivain exclusif)
+    'aucun': {},
+    # Écritures concurrentes et lectures du tableau de bord
+    'concurrent': {
+        'journal_mode': 'WAL',        # lecteurs et écrivain ne se bloquent plus
+        'synchronous': 'NORMAL',      # en WAL : pas de fsync à chaque commit, base toujours cohérente
+        'busy_timeout': 30000,        # ms d'attente d'un verrou avant "database is locked"
+        'cache_size': -65536,         # cache de pages par connexion, en Kio (64 Mo)
+        'mmap_size': 268435456,       # lecture des pages par mmap (256 Mo)
+        'temp_store': 'MEMORY',       # tris et index temporaires en mémoire
+    },
+}
+
+
+def pragmas(profil: Optional[Union[str, Dict]] = None) -> Dict[str, Union[str, int]]:
+    """
+    PRAGMA d'un profil
+
+    Args:
+        profil: Nom d'un profil de PROFILS ou dictionnaire explicite ; par défaut settings.SQLITE_PROFIL
+    """
+    if profil is None:
+        from django.conf import settings
+        profil = getattr(settings, 'SQLITE_PROFIL', 'aucun')
+    if isinstance(profil, dict):
+        return profil
+    if profil not in PROFILS:
+        raise ValueError(f"Profil SQLite inconnu: {profil!r} (choix: {', '.join(PROFILS)})")
+    return PROFILS[profil]
+
+
+def appliquer_profil(sender, connection, **kwargs):
+    """Récepteur de connection_created : applique le profil aux connexions SQLite"""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for nom, valeur in pragmas().items():
+            cursor.execute(f"PRAGMA {nom} = {valeur}")
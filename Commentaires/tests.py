@@ -1,3 +1,1004 @@
-from django.test import TestCase
+import contextlib
+import email.utils
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Article, Commentaire, Auteur, ActiviteJournaliere, ScrapeAttempt, ScrapingHistory, SuiviArticle, URLStorage
+from . import views
+from .views import AnalyticsView, Home
+from .hyperloglog import HyperLogLog, ERREUR_RELATIVE
+from .html_cache import HTMLCache, hash_commentaires
+from .lefaso_scraper import LefasoCommentScraper
+from .analyse_parallele import AnalyseurParallele
+from .async_fetcher import AsyncFetcher, TokenBucket
+from .dates_fr import parse_date_article, parse_date_commentaire
+from .source_locale import ArchiveWARC, RepertoireHTML, ouvrir_source
+from .serveur_local import ServeurLefaso
+from .decouverte import BitmapArticles, URL_PLAN, URL_RSS, url_article, url_rubrique
+
+TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata')
+
+
+def creer_commentaire(article, numero, **kwargs):
+    contenu = kwargs.pop('contenu', f"Commentaire numéro {numero} sur cet article")
+    donnees = {
+        'article': article,
+        'commentaire_id': f"C{numero:03d}",
+        'auteur': f"Auteur{numero}",
+        'date_publication': "22 avril 11:40",
+        'contenu': contenu,
+        'type': Commentaire.TYPE_COMMENTAIRE,
+        'longueur_contenu': len(contenu),
+        'mots_contenu': len(contenu.split()),
+        'contenu_propre': contenu.lower(),
+        'longueur_contenu_propre': len(contenu),
+        'mots_contenu_propre': len(contenu.split()),
+    }
+    donnees.update(kwargs)
+    return Commentaire.objects.create(**donnees)
+
+
+def donnees_scrapees(url="https://lefaso.net/spip.php?article137593"):
+    """Structure renvoyée par LefasoCommentScraper.scrape_article_comments"""
+    return {
+        'titre': "Article de test",
+        'url': url,
+        'date_publication': "mardi 22 avril 2025 à 21h35min",
+        'categorie': "Accueil>Actualités>Société",
+        'commentaires': [
+            {
+                'id_commentaire': 1,
+                'auteur': "Indjaba",
+                'date_publication': "22 avril 23:40",
+                'contenu': "C'est dommage que l'on soit encore dans ce contexte",
+                'longueur_contenu': 51,
+                'mots_contenu': 10,
+                'reponses': [
+                    {
+                        'id_commentaire': 1,
+                        'auteur': "  indjaba ",
+                        'date_publication': "23 avril 08:15",
+                        'contenu': "Je réponds à mon propre commentaire",
+                        'longueur_contenu': 35,
+                        'mots_contenu': 6,
+                    },
+                ],
+            },
+            {
+                'id_commentaire': 2,
+                'auteur': "SOME",
+                'date_publication': "2 mai 10:00",
+                'contenu': "Tout le peuple doit rester uni face à cela",
+                'longueur_contenu': 42,
+                'mots_contenu': 9,
+                'reponses': [],
+            },
+        ],
+        'statistiques': {'total_commentaires': 2, 'total_reponses': 1},
+    }
+
+
+class DatesFrancaisesTests(TestCase):
+
+    def test_dates_articles_et_commentaires(self):
+        article = parse_date_article("mardi 22 avril 2025 à 21h35min")
+        self.assertEqual((article.year, article.month, article.day, article.hour, article.minute), (2025, 4, 22, 21, 35))
+        self.assertTrue(timezone.is_aware(article))
+        self.assertEqual(parse_date_article("samedi 1er février 2025 à 9h05").month, 2)
+
+        # Année déduite de l'article, passage à l'année suivante après décembre
+        self.assertEqual(parse_date_commentaire("22 avril 23:40", article).year, 2025)
+        decembre = parse_date_article("mardi 30 décembre 2025 à 18h00")
+        janvier = parse_date_commentaire("3 janvier 08:15", decembre)
+        self.assertEqual((janvier.year, janvier.month, janvier.hour), (2026, 1, 8))
+        self.assertEqual(parse_date_commentaire("31 décembre 10:00", decembre).year, 2025)
+        self.assertEqual(parse_date_commentaire("5 mars 2024 à 10h00", decembre).year, 2024)
+
+        # Entrées invalides
+        for texte in ["", None, "hier soir", "22 brumaire 2025 à 10h00", "31 février 2025 à 10h00"]:
+            self.assertIsNone(parse_date_article(texte))
+        self.assertIsNone(parse_date_article("22 avril 21h35"))
+        self.assertIsNone(parse_date_commentaire("22 avril 23:40"))
+        self.assertIsNone(parse_date_commentaire("29 février 10:00", parse_date_article("lundi 1er janvier 2025 à 10h00")))
+
+    def test_remplir_dates_publication(self):
+        article = Article.objects.create(article_id="1", titre="Titre", url="https://lefaso.net/spip.php?article1",
+                                         date_publication="mardi 30 décembre 2025 à 18h00")
+        commentaire = creer_commentaire(article, 1, date_publication="3 janvier 08:15")
+        invalide = creer_commentaire(article, 2, date_publication="date inconnue")
+
+        sortie = io.StringIO()
+        call_command('remplir_dates_publication', stdout=sortie)
+        article.refresh_from_db()
+        commentaire.refresh_from_db()
+        invalide.refresh_from_db()
+        self.assertEqual((article.date_publication_dt.year, commentaire.date_publication_dt.year), (2025, 2026))
+        self.assertIsNone(invalide.date_publication_dt)
+        self.assertIn("1 article(s), 2 commentaire(s)", sortie.getvalue())
+
+        # Sans --tout, seules les dates manquantes sont recalculées
+        sortie = io.StringIO()
+        call_command('remplir_dates_publication', stdout=sortie)
+        self.assertIn("0 article(s), 1 commentaire(s)", sortie.getvalue())
+        Article.objects.filter(pk=article.pk).update(date_publication="mercredi 1er janvier 2025 à 10h00")
+        call_command('remplir_dates_publication', '--tout', stdout=io.StringIO())
+        commentaire.refresh_from_db()
+        self.assertEqual(commentaire.date_publication_dt.year, 2025)
+
+
+class IngestionTests(TestCase):
+
+    def test_sauvegarde_met_a_jour_auteurs_et_activite(self):
+        article = Home().sauvegarder_dans_base(donnees_scrapees())
+
+        self.assertEqual(article.commentaires.count(), 3)
+        self.assertEqual(article.date_publication_dt.year, 2025)
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C002").date_publication_dt.month, 5)
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C001R01").parent.commentaire_id, "C001")
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C001").nombre_reponses, 1)
+        self.assertEqual((article.nombre_commentaires, article.nombre_reponses), (2, 1))
+
+        indjaba = Auteur.objects.get(nom_normalise="indjaba")
+        self.assertEqual((indjaba.nombre_commentaires, indjaba.nombre_reponses, indjaba.nombre_articles), (1, 1, 1))
+        self.assertIsNotNone(indjaba.derniere_activite)
+        self.assertEqual(Auteur.objects.count(), 2)
+
+        globale = ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_GLOBALE)
+        self.assertEqual((globale.nombre_commentaires, globale.nombre_reponses), (2, 1))
+        self.assertTrue(ActiviteJournaliere.objects.filter(portee=ActiviteJournaliere.PORTEE_ARTICLE, article=article).exists())
+
+    def test_rescrape_idempotent(self):
+        donnees = donnees_scrapees()
+        # Réponse postée deux fois (même auteur, même minute, même texte)
+        donnees['commentaires'][0]['reponses'].append(dict(donnees['commentaires'][0]['reponses'][0], id_commentaire=2))
+        article = Home().sauvegarder_dans_base(donnees)
+        Home().sauvegarder_dans_base(donnees_scrapees())
+        self.assertEqual(article.commentaires.count(), 3)
+
+        # Insertion concurrente d'une intervention déjà présente : mise à jour de sa position, pas de doublon
+        existant = Commentaire.objects.get(commentaire_id="C002")
+        copie = Commentaire(**{f.attname: getattr(existant, f.attname) for f in Commentaire._meta.concrete_fields if not f.primary_key})
+        copie.commentaire_id = "C003"
+        self.assertEqual(Home().inserer_par_lots(article, [copie]), [])
+        self.assertEqual(copie.pk, existant.pk)
+        self.assertEqual(list(article.commentaires.filter(empreinte=existant.empreinte).values_list('commentaire_id', flat=True)), ["C003"])
+
+    def test_ingestion_concurrente_comptee_une_fois(self):
+        home = Home()
+        inserer = home.inserer_par_lots
+        concurrent = []
+
+        def inserer_apres_un_autre_worker(article, interventions):
+            # Un autre worker ingère le même fil entre la préparation et l'écriture
+            if not concurrent:
+                concurrent.append(Home().sauvegarder_dans_base(donnees_scrapees()))
+            return inserer(article, interventions)
+
+        mesures = {}
+        with mock.patch.object(home, 'inserer_par_lots', side_effect=inserer_apres_un_autre_worker):
+            article = home.sauvegarder_dans_base(donnees_scrapees(), mesures)
+
+        self.assertEqual(mesures['inseres'], 0)
+        self.assertEqual(article.commentaires.count(), 3)
+        indjaba = Auteur.objects.get(nom_normalise="indjaba")
+        self.assertEqual((indjaba.nombre_commentaires, indjaba.nombre_reponses, indjaba.nombre_articles), (1, 1, 1))
+        globale = ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_GLOBALE)
+        self.assertEqual((globale.nombre_commentaires, globale.nombre_reponses), (2, 1))
+
+    def test_nouveau_scrape_n_ingere_que_les_changements(self):
+        Home().sauvegarder_dans_base(donnees_scrapees())
+
+        donnees = donnees_scrapees()
+        donnees['commentaires'][1]['contenu'] = "Tout le peuple doit rester uni face à cela, vraiment"
+        donnees['commentaires'][1]['reponses'].append({
+            'id_commentaire': 1,
+            'auteur': "Wend Panga",
+            'date_publication': "3 mai 09:00",
+            'contenu': "Nouvelle réponse arrivée depuis le premier passage",
+            'longueur_contenu': 50,
+            'mots_contenu': 7,
+        })
+        with mock.patch.object(views, 'nlp', wraps=views.nlp) as nlp:
+            article = Home().sauvegarder_dans_base(donnees)
+
+        # Seuls le commentaire modifié et la nouvelle réponse sont nettoyés
+        self.assertEqual(nlp.call_count, 2)
+        self.assertEqual(article.commentaires.count(), 4)
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C002").contenu, "Tout le peuple doit rester uni face à cela, vraiment")
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C002R01").parent.commentaire_id, "C002")
+        globale = ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_GLOBALE)
+        self.assertEqual((globale.nombre_commentaires, globale.nombre_reponses), (2, 2))
+
+
+class IngestionHorsTransactionTests(TransactionTestCase):
+
+    def test_nettoyage_hors_transaction(self):
+        from django.db import connection
+
+        nlp_origine = views.nlp
+        dans_transaction = []
+
+        def nlp(texte):
+            dans_transaction.append(connection.in_atomic_block)
+            return nlp_origine(texte)
+
+        # Le nettoyage spaCy ne doit jamais tenir le verrou d'écriture
+        with mock.patch.object(views, 'nlp', side_effect=nlp):
+            article = Home().sauvegarder_dans_base(donnees_scrapees())
+
+        self.assertEqual(dans_transaction, [False, False, False])
+        self.assertEqual(article.commentaires.count(), 3)
+        self.assertEqual(Commentaire.objects.get(commentaire_id="C001R01").parent.commentaire_id, "C001")
+
+
+class AuteursTests(TestCase):
+
+    def test_suppression_met_a_jour_les_compteurs(self):
+        article = Home().sauvegarder_dans_base(donnees_scrapees())
+        with self.captureOnCommitCallbacks(execute=True):
+            Commentaire.objects.get(commentaire_id="C001R01").delete()
+
+        indjaba = Auteur.objects.get(nom_normalise="indjaba")
+        self.assertEqual((indjaba.nombre_commentaires, indjaba.nombre_reponses, indjaba.nombre_interventions), (1, 0, 1))
+        globale = ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_GLOBALE)
+        self.assertEqual((globale.nombre_commentaires, globale.nombre_reponses), (2, 0))
+
+        # Suppression en cascade de l'article
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertEqual(list(Auteur.objects.values_list('nombre_interventions', 'nombre_articles')), [(0, 0), (0, 0)])
+        globale.refresh_from_db()
+        self.assertEqual((globale.nombre_commentaires, globale.nombre_reponses), (0, 0))
+        categorie = ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_CATEGORIE)
+        self.assertEqual(categorie.total_interventions(), 0)
+
+    def test_suppression_en_nombre_constant_de_requetes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def requetes_pour_supprimer(numero, commentaires):
+            donnees = donnees_scrapees(f"https://lefaso.net/spip.php?article{numero}")
+            donnees['commentaires'] = [
+                dict(donnees['commentaires'][1], id_commentaire=indice, auteur=f"Auteur{indice}", contenu=f"Commentaire {indice}")
+                for indice in range(1, commentaires + 1)
+            ]
+            donnees['statistiques'] = {'total_commentaires': commentaires, 'total_reponses': 0}
+            article = Home().sauvegarder_dans_base(donnees)
+            with CaptureQueriesContext(connection) as requetes, self.captureOnCommitCallbacks(execute=True):
+                article.delete()
+            return len(requetes)
+
+        self.assertEqual(requetes_pour_supprimer(1, 3), requetes_pour_supprimer(2, 30))
+        self.assertEqual(Auteur.objects.filter(nombre_interventions__gt=0).count(), 0)
+        self.assertEqual(ActiviteJournaliere.objects.get(portee=ActiviteJournaliere.PORTEE_GLOBALE).total_interventions(), 0)
+
+    def test_migration_remplit_les_auteurs(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        article = Article.objects.create(article_id="1", titre="Titre", url="https://lefaso.net/spip.php?article1")
+        autre = Article.objects.create(article_id="2", titre="Titre", url="https://lefaso.net/spip.php?article2")
+        creer_commentaire(article, 1, auteur="Wend  Panga")
+        creer_commentaire(article, 2, auteur="wend panga", type=Commentaire.TYPE_REPONSE)
+        creer_commentaire(autre, 3, auteur=" WEND PANGA ")
+        creer_commentaire(autre, 4, auteur="Some")
+
+        import_module('Commentaires.migrations.0005_auteur').remplir_auteurs(apps, None)
+
+        wend = Auteur.objects.get(nom_normalise="wend panga")
+        self.assertEqual(wend.nom, "Wend Panga")
+        self.assertEqual((wend.nombre_commentaires, wend.nombre_reponses, wend.nombre_articles), (2, 1, 2))
+        self.assertEqual(wend.commentaires.count(), 3)
+        attendus = list(Auteur.objects.order_by('pk').values_list('nombre_interventions', 'nombre_articles', 'derniere_activite'))
+        Auteur.recalculer()
+        self.assertEqual(list(Auteur.objects.order_by('pk').values_list('nombre_interventions', 'nombre_articles', 'derniere_activite')), attendus)
+
+
+class HyperLogLogTests(TestCase):
+
+    def test_union_respecte_la_borne_d_erreur(self):
+        premier, second = HyperLogLog(), HyperLogLog()
+        for i in range(30000):
+            premier.ajouter(f"auteur{i}")
+        for i in range(20000, 50000):
+            second.ajouter(f"auteur{i}")
+
+        union = HyperLogLog.union([premier.octets(), None, second.octets()])
+
+        self.assertLess(abs(union.estimation() - 50000) / 50000, 3 * ERREUR_RELATIVE)
+        self.assertEqual(HyperLogLog().estimation(), 0)
+
+
+class CompteurSentiment:
+    """Faux pipeline de sentiment qui compte ses appels"""
+
+    def __init__(self):
+        self.appels = 0
+
+    def __call__(self, text):
+        self.appels += 1
+        return [{'label': 'POSITIVE', 'score': 0.9}]
+
+
+class AnalyticsViewTests(TestCase):
+
+    def setUp(self):
+        for i in range(3):
+            article = Article.objects.create(
+                article_id=f"article{i}",
+                titre=f"Article {i}",
+                url=f"https://lefaso.net/spip.php?article{i}",
+                date_publication="mardi 22 avril 2025 à 21h35min",
+                categorie="Accueil>Actualités>Politique",
+            )
+            for j in range(1, 5):
+                creer_commentaire(article, j)
+
+        with mock.patch.object(AnalyticsView, 'initialize_sentiment_analyzer'):
+            self.view = AnalyticsView()
+        self.view.sentiment_analyzer = CompteurSentiment()
+
+    def test_chronologie_identique_au_regroupement_par_commentaire(self):
+        from importlib import import_module
+        from django.apps import apps
+        from django.db.models.functions import TruncDate
+
+        # Interventions réparties sur plusieurs jours, agrégats remplis par la migration
+        maintenant = timezone.now()
+        for i, commentaire in enumerate(Commentaire.objects.order_by('pk')):
+            Commentaire.objects.filter(pk=commentaire.pk).update(date_extraction=maintenant - timedelta(days=i % 5, hours=i))
+        Commentaire.objects.filter(pk=Commentaire.objects.order_by('pk')[1].pk).update(type=Commentaire.TYPE_REPONSE)
+        import_module('Commentaires.migrations.0003_activitejournaliere').remplir_activite(apps, None)
+
+        # Ancien calcul : regroupement de tous les commentaires par jour d'extraction
+        debut = timezone.localdate() - timedelta(days=30)
+        anciens = {
+            ligne['jour']: ligne['nombre']
+            for ligne in Commentaire.objects.annotate(jour=TruncDate('date_extraction'))
+            .filter(jour__gte=debut).values('jour').annotate(nombre=Count('id'))
+        }
+        chronologie = self.view.get_activity_timeline(days=30)
+        self.assertEqual(sum(chronologie['data']), Commentaire.objects.count())
+        self.assertEqual(
+            {label: nombre for label, nombre in zip(chronologie['labels'], chronologie['data']) if nombre},
+            {jour.strftime('%Y-%m-%d'): nombre for jour, nombre in anciens.items()},
+        )
+        article = Article.objects.get(article_id="article0")
+        self.assertEqual(sum(self.view.get_activity_timeline(days=30, article=article)['data']), 4)
+
+    def test_migration_remplit_les_sketches(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        article = Article.objects.get(article_id="article0")
+        creer_commentaire(article, 9, auteur="Auteur1 ")
+        creer_commentaire(article, 10, auteur="Nouvel auteur")
+        import_module('Commentaires.migrations.0003_activitejournaliere').remplir_activite(apps, None)
+        self.assertEqual(ActiviteJournaliere.auteurs_distincts(), 0)
+
+        import_module('Commentaires.migrations.0006_activitejournaliere_sketch_auteurs').remplir_sketches(apps, None)
+        self.assertEqual(ActiviteJournaliere.auteurs_distincts(), 5)
+        self.assertEqual(ActiviteJournaliere.auteurs_distincts(categorie=article.categorie), 5)
+        self.assertEqual(ActiviteJournaliere.auteurs_distincts(articles=[article]), 5)
+        self.assertEqual(ActiviteJournaliere.auteurs_distincts(articles=Article.objects.exclude(pk=article.pk)), 4)
+
+    def test_dashboard_analyse_chaque_commentaire_une_seule_fois(self):
+        request = RequestFactory().get('/analytics/')
+
+        with mock.patch.object(AnalyticsView, 'calculate_engagement_rate', autospec=True, return_value=50.0) as engagement:
+            response = self.view.get(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.view.sentiment_analyzer.appels, Commentaire.objects.count())
+        self.assertEqual(engagement.call_count, Article.objects.count())
+
+    def test_mode_approximatif_n_analyse_que_l_echantillon(self):
+        estimations = list(self.view.iter_sentiments_approximatifs(Article.objects.all(), taille_echantillon=6, taille_lot=3, graine=1))
+
+        self.assertEqual(self.view.sentiment_analyzer.appels, 6)
+        self.assertEqual([e['echantillon'] for e in estimations], [3, 6])
+        self.assertEqual(estimations[-1]['population'], 12)
+        self.assertEqual(estimations[-1]['positif'], 100.0)
+        self.assertFalse(estimations[-1]['exact'])
+
+        exacte = self.view.analyze_article_sentiments_global(Article.objects.all(), approximatif=True, taille_echantillon=100)
+        self.assertTrue(exacte['exact'])
+        self.assertEqual(exacte['intervalles']['positif'], [100.0, 100.0])
+
+    def test_api_approximative_refuse_les_parametres_invalides(self):
+        url = reverse('Commentaires:sentiment_approximatif')
+        for parametres in [{'confiance': 1}, {'confiance': 0}, {'confiance': -0.5}, {'confiance': 'nan'},
+                           {'confiance': 'x'}, {'echantillon': -5}]:
+            self.assertEqual(self.client.get(url, parametres).status_code, 400, parametres)
+
+
+def sans_horodatage(donnees):
+    """Retire les champs datés de l'extraction pour comparer deux analyses"""
+    if isinstance(donnees, dict):
+        return {cle: sans_horodatage(valeur) for cle, valeur in donnees.items()
+                if cle not in ('date_scraping', 'timestamp_extraction')}
+    if isinstance(donnees, list):
+        return [sans_horodatage(valeur) for valeur in donnees]
+    return donnees
+
+
+class ParserTests(TestCase):
+
+    def analyser(self, parser, contenu):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sans_horodatage(LefasoCommentScraper(parser=parser).scrape_article_from_html("https://lefaso.net/spip.php?article137593", contenu))
+
+    def test_moteurs_rapides_identiques_a_html_parser(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        reference = self.analyser('html.parser', contenu)
+
+        self.assertEqual(reference['titre'], "Burkina : Le gouvernement annonce des mesures pour la rentrée scolaire")
+        self.assertEqual(reference['statistiques']['total_interventions'], 7)
+
+        for parser in ('lxml', 'selectolax'):
+            with self.subTest(parser=parser):
+                try:
+                    LefasoCommentScraper.resolve_parser(parser)
+                except ImportError:
+                    self.skipTest(f"{parser} non installé")
+                self.assertEqual(self.analyser(parser, contenu), reference)
+                # Page sans ul#navforum : retour à l'arbre complet
+                sans_forum = contenu.replace(b'id="navforum"', b'id="ancien-forum"')
+                self.assertEqual(self.analyser(parser, sans_forum), self.analyser('html.parser', sans_forum))
+
+    def test_fil_parcouru_une_seule_fois(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        # Réponses balisées comme des fils : elles ne doivent pas devenir des commentaires principaux
+        contenu = contenu.replace(b'      <li>\n', b'      <li class="forum-fil">\n')
+        donnees = self.analyser('html.parser', contenu)
+
+        self.assertEqual(donnees['statistiques']['total_commentaires'], 3)
+        reponses = [(r['auteur'], r['profondeur'], r['parent_id']) for r in donnees['commentaires'][0]['reponses']]
+        self.assertEqual(reponses, [("Wend Panga", 1, None), ("Indjaba", 2, 1), ("Le Sage", 1, None)])
+
+    def test_iter_comments_rend_un_flux_a_plat(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        scraper = LefasoCommentScraper(parser='html.parser')
+
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch.object(scraper, 'fetch_content', return_value=contenu):
+            flux = scraper.iter_comments("https://lefaso.net/spip.php?article137593")
+            premier = next(flux)
+            records = [premier] + list(flux)
+            dataframe = scraper.create_dataframe({'url': "https://lefaso.net/spip.php?article137593"}, iter(records))
+
+        self.assertEqual((premier['type'], premier['auteur'], premier['profondeur']), ('commentaire', "Indjaba", 0))
+        self.assertEqual([r['type'] for r in records].count('reponse'), 4)
+        self.assertEqual(len(dataframe), 7)
+        self.assertEqual(dataframe.loc[dataframe['type'] == 'commentaire', 'nombre_reponses'].tolist(), [3, 0, 1])
+
+    def test_analyse_dans_un_pool_de_processus(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        pages = [
+            {'url': "https://lefaso.net/spip.php?article1", 'contenu': contenu, 'erreur': None},
+            {'url': "https://lefaso.net/spip.php?article2", 'contenu': None, 'erreur': "HTTP 503"},
+        ]
+
+        with AnalyseurParallele(processus=1, parser='html.parser') as analyseur:
+            resultats = {page['url']: data for page, data in analyseur.iter_analyses(pages)}
+
+        self.assertEqual(resultats["https://lefaso.net/spip.php?article1"]['statistiques']['total_interventions'], 7)
+        self.assertEqual(resultats["https://lefaso.net/spip.php?article2"]['erreur'], "HTTP 503")
+
+
+@override_settings(SCRAPER_CACHE_DIR=None, SCRAPER_PROCESSUS_ANALYSE=0)
+class RejeuTests(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            self.contenu = f.read()
+        self.urls = ["https://lefaso.net/spip.php?article1", "https://lefaso.net/spip.php?article2"]
+        self.dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dossier.cleanup)
+
+    def test_sources_locales(self):
+        repertoire = RepertoireHTML(os.path.join(self.dossier.name, 'pages'))
+        repertoire.enregistrer(self.urls[0], self.contenu)
+        chemin_warc = os.path.join(self.dossier.name, 'pages.warc.gz')
+        ArchiveWARC.ecrire(chemin_warc, {url: self.contenu for url in self.urls})
+
+        for source in (ouvrir_source(repertoire.repertoire), ouvrir_source(chemin_warc)):
+            with self.subTest(source=type(source).__name__):
+                self.assertEqual(source.lire(self.urls[0]), self.contenu)
+                self.assertIsNone(source.lire("https://lefaso.net/spip.php?article3"))
+        self.assertEqual(list(ouvrir_source(chemin_warc).urls()), self.urls)
+
+    def test_warc_gz_un_membre_par_enregistrement(self):
+        chemin_warc = os.path.join(self.dossier.name, 'pages.warc.gz')
+        ArchiveWARC.ecrire(chemin_warc, {url: self.contenu for url in self.urls})
+        archive = ArchiveWARC(chemin_warc)
+
+        # Chaque réponse est indexée par la position compressée de son propre membre
+        membres = [archive.index[url][0] for url in self.urls]
+        self.assertEqual(membres[0], 0)
+        self.assertGreater(membres[1], 0)
+        with open(chemin_warc, 'rb') as f:
+            f.seek(membres[1])
+            self.assertTrue(zlib.decompressobj(zlib.MAX_WBITS | 16).decompress(f.read()).startswith(b'WARC/1.0'))
+        self.assertEqual(archive.lire(self.urls[1]), self.contenu)
+
+        # Archive d'un seul membre (gzip de tout le fichier) : toujours lisible
+        chemin_brut = os.path.join(self.dossier.name, 'pages.warc')
+        ArchiveWARC.ecrire(chemin_brut, {url: self.contenu for url in self.urls})
+        with open(chemin_brut, 'rb') as f, gzip.open(chemin_warc, 'wb') as archive_gz:
+            archive_gz.write(f.read())
+        archive = ArchiveWARC(chemin_warc)
+        self.assertEqual({membre for membre, _, _ in archive.index.values()}, {0})
+        self.assertEqual(archive.lire(self.urls[1]), self.contenu)
+
+    def test_rejeu_warc_sans_reseau(self):
+        chemin_warc = os.path.join(self.dossier.name, 'pages.warc')
+        ArchiveWARC.ecrire(chemin_warc, {url: self.contenu for url in self.urls})
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command('rejouer_source', chemin_warc)
+
+        self.assertEqual(Article.objects.count(), 2)
+        self.assertEqual(Commentaire.objects.count(), 14)
+        self.assertFalse(URLStorage.objects.exclude(statut=URLStorage.TERMINE).exists())
+
+        # Une tentative par URL, rattachée au lot, avec le détail des étapes
+        tentatives = ScrapeAttempt.objects.filter(historique__isnull=False, statut=ScrapeAttempt.SUCCES)
+        self.assertEqual(sorted(tentatives.values_list('url', flat=True)), self.urls)
+        tentative = tentatives.first()
+        self.assertEqual((tentative.statut_http, tentative.commentaires_trouves, tentative.commentaires_inseres), (200, 7, 7))
+        self.assertGreater(tentative.octets, 0)
+        self.assertGreater(tentative.duree_analyse, 0)
+        self.assertEqual(ScrapeAttempt.resume()['tentatives'], 2)
+
+        # Flux d'avancement du lot (terminé : les événements sont rejoués puis le flux se ferme)
+        historique = ScrapingHistory.objects.get()
+        reponse = self.client.get(reverse('Commentaires:scraping_evenements', args=[historique.id]))
+        self.assertEqual(reponse['Content-Type'], 'text/event-stream')
+        flux = b''.join(reponse.streaming_content).decode('utf-8')
+        self.assertEqual(flux.count('event: enregistre'), 2)
+        self.assertIn('"traitees": 2, "total": 2', flux)
+        self.assertTrue(flux.rstrip().endswith('"erreur": null}'))
+        self.assertIn('event: fin', flux)
+
+
+class CacheHTMLTests(TestCase):
+
+    def setUp(self):
+        self.dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dossier.cleanup)
+        self.cache = HTMLCache(os.path.join(self.dossier.name, 'cache'))
+
+    def test_requetes_conditionnelles_et_deduplication(self):
+        fetcher = AsyncFetcher(requetes_par_seconde=50, tentatives=0, cache=self.cache)
+        with ServeurLefaso(commentaires=2, profondeur=0) as serveur:
+            url = serveur.url_article(1)
+            premier, = fetcher.iter_resultats([url])
+            self.assertIn('If-None-Match', self.cache.en_tetes_conditionnels(url))
+            second, = fetcher.iter_resultats([url])
+
+        # Seconde requête revalidée : 304 sans corps, contenu repris du cache
+        self.assertEqual((premier['statut'], second['statut']), (200, 304))
+        self.assertEqual(second['contenu'], premier['contenu'])
+        self.assertEqual((serveur.statistiques['200'], serveur.statistiques['304']), (1, 1))
+
+        # Même contenu sous une autre URL : un seul objet sur disque, validateurs propres à l'URL
+        autre = "https://lefaso.net/spip.php?article2"
+        self.cache.enregistrer(autre, premier['contenu'], last_modified="Tue, 22 Apr 2025 21:35:00 GMT")
+        self.assertEqual(self.cache.en_tetes_conditionnels(autre), {'If-Modified-Since': "Tue, 22 Apr 2025 21:35:00 GMT"})
+        objets = [nom for _, _, noms in os.walk(os.path.join(self.cache.repertoire, 'objets')) for nom in noms]
+        self.assertEqual(len(objets), 1)
+
+    @override_settings(SCRAPER_PROCESSUS_ANALYSE=0)
+    def test_fil_inchange_ignore_seulement_s_il_est_en_base(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        url = "https://lefaso.net/spip.php?article1"
+        source = RepertoireHTML(os.path.join(self.dossier.name, 'pages'))
+        source.enregistrer(url, contenu)
+        # Empreinte notée dans le cache, mais base vide (restaurée, transaction annulée...)
+        self.cache.marquer_analyse(url, hash_commentaires(contenu))
+
+        def scraper():
+            with override_settings(SCRAPER_CACHE_DIR=self.cache.repertoire), contextlib.redirect_stdout(io.StringIO()):
+                resultat, = Home().executer_scraping_background([url], source=source)
+            return resultat['statut']
+
+        self.assertEqual(scraper(), 'succes')
+        self.assertEqual(Article.objects.get().hash_commentaires, hash_commentaires(contenu))
+        self.assertEqual(Commentaire.objects.count(), 7)
+
+        self.assertEqual(scraper(), 'inchange')
+        self.assertEqual(ScrapeAttempt.objects.filter(statut=ScrapeAttempt.INCHANGE).count(), 1)
+
+        # Article supprimé : le fil est de nouveau analysé et enregistré
+        Article.objects.all().delete()
+        self.assertEqual(scraper(), 'succes')
+        self.assertEqual(Commentaire.objects.count(), 7)
+
+
+class ServeurLocalTests(TestCase):
+
+    def test_pages_synthetiques_et_pannes(self):
+        scraper = LefasoCommentScraper(max_retries=0)
+        with ServeurLefaso(commentaires=5, profondeur=0) as serveur, contextlib.redirect_stdout(io.StringIO()):
+            donnees = scraper.scrape_article_comments(serveur.url_article(7))
+            serveur.taux_429 = 1.0
+            self.assertIsNone(scraper.fetch_content(serveur.url_article(8)))
+
+        self.assertEqual(donnees['titre'], "Article synthétique numéro 7")
+        self.assertEqual(donnees['statistiques']['total_commentaires'], 5)
+        self.assertEqual((serveur.statistiques['200'], serveur.statistiques['429']), (1, 1))
+
+    def test_nouvelles_tentatives_sur_erreurs_500(self):
+        scraper = LefasoCommentScraper(max_retries=6, backoff_factor=0.001)
+        with ServeurLefaso(commentaires=2, profondeur=0, taux_erreurs=0.5, graine=4) as serveur, \
+                contextlib.redirect_stdout(io.StringIO()):
+            tentatives = []
+            for numero in range(1, 9):
+                self.assertIsNotNone(scraper.fetch_content(serveur.url_article(numero)))
+                self.assertEqual(scraper.derniere_requete['statut'], 200)
+                tentatives.append(scraper.derniere_requete['tentatives'])
+
+            # Toutes les requêtes envoyées (erreurs comprises) sont comptées dans les tentatives
+            self.assertGreater(serveur.statistiques['500'], 0)
+            self.assertEqual(sum(tentatives), serveur.statistiques['requetes'])
+            self.assertEqual(scraper.statistiques_requetes['erreurs'], 0)
+
+            # Nouvelles tentatives épuisées : None, erreur comptée
+            serveur.taux_erreurs = 1.0
+            self.assertIsNone(LefasoCommentScraper(max_retries=2, backoff_factor=0.001).fetch_content(serveur.url_article(1)))
+            self.assertEqual(serveur.statistiques['requetes'], sum(tentatives) + 3)
+
+
+class AsyncFetcherTests(TestCase):
+
+    def test_seau_a_jetons(self):
+        import asyncio
+
+        async def scenario():
+            seau = TokenBucket(20, capacite=1)
+            debut = time.monotonic()
+            for _ in range(5):
+                await seau.acquerir()
+            duree = time.monotonic() - debut
+            seau.ralentir(0.3)
+            debut = time.monotonic()
+            await seau.acquerir()
+            return seau, duree, time.monotonic() - debut
+
+        seau, duree, pause = asyncio.run(scenario())
+        self.assertGreaterEqual(duree, 0.19)  # 4 jetons à 20/s
+        self.assertGreaterEqual(pause, 0.29)
+        self.assertEqual(seau.debit, 10)
+        # Le seau sert d'une boucle asyncio à l'autre (un lot par boucle)
+        asyncio.run(seau.acquerir())
+        for _ in range(20):
+            seau.retablir()
+        self.assertEqual(seau.debit, 20)
+        for _ in range(10):
+            seau.ralentir()
+        self.assertEqual(seau.debit, seau.debit_min)
+
+        self.assertEqual(AsyncFetcher.delai_retry_after("7"), 7.0)
+        self.assertAlmostEqual(AsyncFetcher.delai_retry_after(email.utils.formatdate(time.time() + 30, usegmt=True)), 30, delta=2)
+        self.assertEqual(AsyncFetcher.delai_retry_after(email.utils.formatdate(time.time() - 30, usegmt=True)), 0.0)
+        self.assertIsNone(AsyncFetcher.delai_retry_after("bientôt"))
+
+    def test_debit_par_hote_et_erreurs(self):
+        fetcher = AsyncFetcher(concurrence=4, requetes_par_seconde=10, rafale=1, tentatives=0)
+        with ServeurLefaso(commentaires=2, profondeur=0) as serveur:
+            urls = [serveur.url_article(numero) for numero in range(1, 6)] + [serveur.base_url + "/inconnue"]
+            debut = time.monotonic()
+            resultats = {resultat['url']: resultat for resultat in fetcher.iter_resultats(urls)}
+            duree = time.monotonic() - debut
+
+        self.assertGreaterEqual(duree, 0.49)  # 6 requêtes à 10/s sur le même hôte
+        self.assertTrue(all(resultats[url]['statut'] == 200 and resultats[url]['contenu'] for url in urls[:-1]))
+        self.assertEqual((resultats[urls[-1]]['statut'], resultats[urls[-1]]['erreur']), (404, "HTTP 404"))
+
+    def test_429_respecte_retry_after_et_ralentit_l_hote(self):
+        fetcher = AsyncFetcher(concurrence=2, requetes_par_seconde=50, tentatives=2, backoff_factor=0.01)
+        # Graine 1 : premier tirage en 429, second réussi
+        with ServeurLefaso(commentaires=2, profondeur=0, taux_429=0.5, retry_after=1, graine=1) as serveur:
+            url = serveur.url_article(1)
+            debut = time.monotonic()
+            resultat, = fetcher.iter_resultats([url])
+            duree = time.monotonic() - debut
+
+        self.assertEqual((resultat['statut'], resultat['tentatives'], resultat['erreur']), (200, 2, None))
+        self.assertGreaterEqual(duree, 1.0)
+        self.assertEqual(serveur.statistiques['429'], 1)
+        self.assertLess(fetcher.seau_pour(url).debit, 50)
+
+        # Lot suivant, nouveau fetcher : le ralentissement de l'hôte est conservé
+        suivant = AsyncFetcher(concurrence=2, requetes_par_seconde=50, tentatives=2, backoff_factor=0.01)
+        self.assertIs(suivant.seau_pour(url), fetcher.seau_pour(url))
+        self.assertLess(suivant.seau_pour(url).debit, 50)
+
+
+class DecouverteTests(TestCase):
+
+    def test_bitmap(self):
+        bitmap = BitmapArticles([3, 137593])
+        self.assertIn(137593, bitmap)
+        self.assertNotIn(137592, bitmap)
+        self.assertFalse(bitmap.ajouter(3))
+        self.assertTrue(bitmap.ajouter(200000))
+        self.assertEqual(len(bitmap), 3)
+
+    def test_decouverte_met_en_file_les_nouveaux_articles(self):
+        URLStorage.objects.create(url=url_article(101))
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        pages = RepertoireHTML(dossier.name)
+        pages.enregistrer(URL_PLAN, b'<urlset><url><loc>https://lefaso.net/spip.php?article101</loc></url>'
+                                    b'<url><loc>https://lefaso.net/spip.php?article102</loc></url></urlset>')
+        pages.enregistrer(URL_RSS, b'<rss><item><link>https://lefaso.net/spip.php?article103</link></item></rss>')
+        pages.enregistrer(url_rubrique(2), b'<a href="spip.php?article104">a</a><a href="spip.php?article102">b</a>'
+                                           b'<a href="spip.php?rubrique2&amp;debut_articles=10">2</a><a href="spip.php?rubrique9">x</a>')
+        pages.enregistrer(url_rubrique(2, 'debut_articles=10'), b'<a href="spip.php?article105">c</a>')
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command('decouvrir_articles', '--rubrique', '2', '--source', dossier.name, stdout=io.StringIO())
+
+        self.assertEqual(
+            sorted(URLStorage.objects.values_list('url', flat=True)),
+            [url_article(numero) for numero in range(101, 106)],
+        )
+
+
+class PlanificationTests(TestCase):
+
+    def creer_article(self, numero, publication):
+        return Article.objects.create(article_id=str(numero), titre=f"Article {numero}", url=url_article(numero),
+                                      date_publication="", date_publication_dt=publication)
+
+    def test_recul_exponentiel_et_budget(self):
+        debut = timezone.now() - timedelta(days=3)
+        actif = self.creer_article(1, debut - timedelta(hours=10))
+        froid = self.creer_article(2, debut - timedelta(hours=10))
+
+        # Article actif : 20 interventions en 10 h, puis 10 de plus en 2 h
+        SuiviArticle.observer(actif, 20, date=debut)
+        suivi = SuiviArticle.observer(actif, 30, date=debut + timedelta(hours=2))
+        self.assertGreater(suivi.taux, 2.0)
+        self.assertLess(suivi.intervalle, timedelta(hours=3))
+
+        # Article froid : l'intervalle double à chaque visite sans nouveauté
+        SuiviArticle.observer(froid, 20, date=debut)
+        intervalles = [SuiviArticle.observer(froid, 20, date=debut + timedelta(hours=heure)).intervalle for heure in (10, 20)]
+        self.assertEqual(intervalles[1], intervalles[0] * 2)
+        self.assertEqual(froid.releves.count(), 3)
+
+        choisis = SuiviArticle.a_revisiter(1)
+        self.assertEqual([suivi.article for suivi in choisis], [actif])
+        self.assertEqual(len(SuiviArticle.a_revisiter(10)), 2)
+
+
+class FileScrapingTests(TestCase):
+
+    def test_baux_et_nouvelles_tentatives(self):
+        URLStorage.enfiler([url_article(numero) for numero in range(1, 6)])
+
+        premier = URLStorage.reclamer('worker-1', 3)
+        second = URLStorage.reclamer('worker-2', 10)
+        self.assertEqual(len(premier), 3)
+        self.assertEqual(len(second), 2)
+        self.assertFalse({u.pk for u in premier} & {u.pk for u in second})
+        self.assertEqual(URLStorage.reclamer('worker-3', 10), [])
+
+        # Bail expiré : l'URL est reprise par un autre worker, l'ancien détenteur ne peut plus la clore
+        URLStorage.objects.filter(pk=premier[0].pk).update(bail_expiration=timezone.now() - timedelta(seconds=1))
+        repris = URLStorage.reclamer('worker-3', 10)
+        self.assertEqual([u.pk for u in repris], [premier[0].pk])
+        self.assertFalse(premier[0].terminer('worker-1'))
+        self.assertTrue(repris[0].terminer('worker-3'))
+
+        # Échec : nouvelle tentative différée, puis ERREUR au-delà de TENTATIVES_MAX
+        echec = premier[1]
+        self.assertTrue(echec.echouer('worker-1', "HTTP 500"))
+        echec.refresh_from_db()
+        self.assertEqual(echec.statut, URLStorage.EN_ATTENTE)
+        self.assertGreater(echec.disponible_a, timezone.now())
+        URLStorage.objects.filter(pk=echec.pk).update(tentatives=URLStorage.TENTATIVES_MAX, disponible_a=None)
+        echec = URLStorage.reclamer('worker-1', 10, urls=[echec.url])[0]
+        echec.echouer('worker-1', "HTTP 500")
+        echec.refresh_from_db()
+        self.assertEqual(echec.statut, URLStorage.ERREUR)
+
+    def test_bail_expire_a_repetition(self):
+        # Page qui fait planter le worker : le bail expire sans terminer ni echouer
+        url = url_article(1)
+        URLStorage.enfiler([url])
+        for numero in range(URLStorage.TENTATIVES_MAX):
+            reservee, = URLStorage.reclamer(f'worker-{numero}', 10)
+            URLStorage.objects.filter(pk=reservee.pk).update(bail_expiration=timezone.now() - timedelta(seconds=1))
+
+        self.assertFalse(URLStorage.reclamables().exists())
+        self.assertEqual(URLStorage.reclamer('worker-suivant', 10), [])
+        url_storage = URLStorage.objects.get(url=url)
+        self.assertEqual((url_storage.statut, url_storage.tentatives), (URLStorage.ERREUR, URLStorage.TENTATIVES_MAX))
+        self.assertIn("Bail expiré", url_storage.derniere_erreur)
+
+    def test_worker_garde_un_seul_pool_d_analyse(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        source = RepertoireHTML(dossier.name)
+        urls = [url_article(numero) for numero in range(1, 4)]
+        for url in urls:
+            source.enregistrer(url, contenu)
+        URLStorage.enfiler(urls)
+
+        entrer = AnalyseurParallele.__enter__
+        with override_settings(SCRAPER_SOURCE=dossier.name, SCRAPER_CACHE_DIR=None, SCRAPER_PROCESSUS_ANALYSE=0), \
+                mock.patch.object(AnalyseurParallele, '__enter__', autospec=True, side_effect=entrer) as demarrages:
+            call_command('scrape_worker', '--une-fois', '--lot', '1', stdout=io.StringIO())
+
+        self.assertEqual(demarrages.call_count, 1)
+        self.assertEqual(URLStorage.objects.filter(statut=URLStorage.TERMINE).count(), 3)
+
+    def test_la_requete_web_ne_fait_que_mettre_en_file(self):
+        url = url_article(7)
+        URLStorage.objects.create(url=url, statut=URLStorage.ERREUR)
+        requete = RequestFactory().post('/', {'action': 'scraper_urls', 'urls_selectionnees': [url]})
+        requete.session = {}
+        requete._messages = mock.MagicMock()
+
+        with mock.patch.object(views.threading, 'Thread') as thread:
+            Home().post(requete)
+
+        thread.assert_not_called()
+        self.assertEqual(URLStorage.objects.get(url=url).statut, URLStorage.EN_ATTENTE)
+        historique = ScrapingHistory.objects.get()
+        self.assertEqual(historique.statut, ScrapingHistory.EN_COURS)
+
+        URLStorage.objects.filter(url=url).update(statut=URLStorage.TERMINE)
+        ScrapingHistory.actualiser_pour([url])
+        historique.refresh_from_db()
+        self.assertEqual((historique.statut, historique.progression), (ScrapingHistory.TERMINE, 100))
+
+    @override_settings(SCRAPER_CACHE_DIR=None, SCRAPER_PROCESSUS_ANALYSE=0)
+    def test_tentative_enregistree_avant_cloture_du_lot(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        source = RepertoireHTML(dossier.name)
+        url = url_article(1)
+        source.enregistrer(url, contenu)
+        historique = ScrapingHistory.objects.create(urls_selectionnees=json.dumps([url]), statut=ScrapingHistory.EN_COURS)
+
+        actualiser = ScrapingHistory.actualiser
+
+        def verifier(lot):
+            # Le flux d'événements s'arrête à la clôture : la tentative doit déjà être visible
+            self.assertTrue(lot.tentatives.filter(url=url).exists())
+            actualiser(lot)
+
+        with mock.patch.object(ScrapingHistory, 'actualiser', autospec=True, side_effect=verifier) as appels, \
+                contextlib.redirect_stdout(io.StringIO()):
+            Home().executer_scraping_background([url], source=source)
+
+        self.assertEqual(appels.call_count, 1)
+        historique.refresh_from_db()
+        self.assertEqual(historique.statut, ScrapingHistory.TERMINE)
+
+    @override_settings(SCRAPER_CACHE_DIR=None, SCRAPER_PROCESSUS_ANALYSE=0)
+    def test_lot_reste_en_cours_tant_qu_un_autre_worker_tient_une_url(self):
+        with open(os.path.join(TESTDATA, 'article_spip.html'), 'rb') as f:
+            contenu = f.read()
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        source = RepertoireHTML(dossier.name)
+        urls = [url_article(1), url_article(2)]
+        for url in urls:
+            source.enregistrer(url, contenu)
+        URLStorage.enfiler(urls)
+        tenue, = URLStorage.reclamer('worker-2', 1, urls=[urls[1]])
+        historique = ScrapingHistory.objects.create(urls_selectionnees=json.dumps(urls), statut=ScrapingHistory.EN_COURS)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultats = Home().executer_scraping_background(urls, historique.id, source=source)
+
+        self.assertEqual([resultat['url'] for resultat in resultats], urls[:1])
+        historique.refresh_from_db()
+        self.assertEqual((historique.statut, historique.progression), (ScrapingHistory.EN_COURS, 50))
+
+        # Le second worker termine : le lot est clos
+        tenue.terminer('worker-2')
+        ScrapingHistory.actualiser_pour([tenue.url])
+        historique.refresh_from_db()
+        self.assertEqual((historique.statut, historique.progression), (ScrapingHistory.TERMINE, 100))
+
+    def test_flux_d_un_lot_abandonne_se_ferme(self):
+        traitee, absente = url_article(1), url_article(2)
+        URLStorage.objects.create(url=traitee, statut=URLStorage.TERMINE)
+        lots = {
+            'traite': ScrapingHistory.objects.create(urls_selectionnees=json.dumps([traitee]), statut=ScrapingHistory.EN_COURS),
+            'absent': ScrapingHistory.objects.create(urls_selectionnees=json.dumps([absente]), statut=ScrapingHistory.EN_COURS),
+        }
+
+        with mock.patch.object(views.APIScrapingEvenements, 'INTERVALLE', 0):
+            for nom, historique in lots.items():
+                with self.subTest(lot=nom):
+                    reponse = self.client.get(reverse('Commentaires:scraping_evenements', args=[historique.id]))
+                    flux = b''.join(reponse.streaming_content).decode('utf-8')
+                    self.assertIn('event: fin', flux)
+                    self.assertEqual(flux.count(': attente'), 1)
+
+        # Lot dont toutes les URLs sont traitées : clos ; lot sans URL dans la file : signalé
+        lots['traite'].refresh_from_db()
+        self.assertEqual(lots['traite'].statut, ScrapingHistory.TERMINE)
+        self.assertIn("Aucune URL du lot en attente ni en cours", flux)
+
+
+class ProfilSQLiteTests(TestCase):
+
+    def test_profil_applique_a_la_connexion(self):
+        from django.db import connection
+        from .sqlite_profil import pragmas
+
+        self.assertEqual(pragmas('concurrent')['journal_mode'], 'WAL')
+        self.assertEqual(pragmas({'cache_size': -1000}), {'cache_size': -1000})
+        with self.assertRaises(ValueError):
+            pragmas('inconnu')
+
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], pragmas('concurrent')['busy_timeout'])
+
+
+class RechercheTests(TestCase):
+
+    def test_index_synchronise_et_api_classee(self):
+        article = Home().sauvegarder_dans_base(donnees_scrapees())
+        autre = Article.objects.create(article_id="2", titre="Autre", url="https://lefaso.net/spip.php?article2", categorie="Sport")
+        creer_commentaire(autre, 1, contenu="Le peuple, le peuple, toujours le peuple au stade")
+
+        # Classement BM25 : le commentaire qui répète le terme passe en tête
+        resultats = Commentaire.rechercher("peuple")
+        self.assertEqual(resultats['total'], 2)
+        self.assertEqual(resultats['resultats'][0]['article']['id'], autre.id)
+        self.assertIn("<mark>peuple</mark>", resultats['resultats'][1]['extrait'])
+        self.assertEqual(Commentaire.rechercher("peuple", categorie="Sport")['total'], 1)
+        self.assertEqual(Commentaire.rechercher("peuple", article=article.id)['total'], 1)
+        page = Commentaire.rechercher("peuple", page=2, taille=1)
+        self.assertEqual((page['pages'], len(page['resultats'])), (2, 1))
+
+        # Accents ignorés, préfixes, lemmes (contenu_propre) et échappement de la syntaxe FTS5
+        self.assertEqual(Commentaire.rechercher("reponds")['total'], 1)
+        self.assertEqual(Commentaire.rechercher("domm*")['total'], 1)
+        self.assertEqual(Commentaire.rechercher("répondre", lemmes={'répondre': 'répondre'})['total'], 1)
+        self.assertEqual(Commentaire.rechercher('peuple OR "uni')['total'], 0)
+
+        # Mise à jour et suppression répercutées par les déclencheurs
+        commentaire = Commentaire.objects.get(article=article, commentaire_id="C002")
+        Commentaire.objects.filter(pk=commentaire.pk).update(contenu="Texte remplacé", contenu_propre="texte remplacer")
+        self.assertEqual(Commentaire.rechercher("peuple")['total'], 1)
+        self.assertEqual(Commentaire.rechercher("remplace")['total'], 1)
+        autre.delete()
+        self.assertEqual(Commentaire.rechercher("peuple")['total'], 0)
+
+        reponse = self.client.get(reverse('Commentaires:recherche'), {'q': "Dommage", 'categorie': article.categorie})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual([r['commentaire_id'] for r in reponse.json()['resultats']], ["C001"])
+        self.assertEqual(self.client.get(reverse('Commentaires:recherche'), {'q': "  "}).status_code, 400)
@@ -5,9 +5,14 @@ app_name = "Commentaires"
 urlpatterns = [
     path('', Home.as_view(), name='home'),
     path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('api/scraping/statut/', APIScrapingStatus.as_view(), name='scraping_statut'),
+    path('api/scraping/<int:historique_id>/evenements/', APIScrapingEvenements.as_view(), name='scraping_evenements'),
     path('api/articles/<int:article_id>/', ArticleDetailAPI.as_view(), name='article_detail_api'),
     path('api/articles/<int:article_id>/analyze/', AnalyzeArticleAPI.as_view(), name='analyze_article'),
     path('api/articles/<int:article_id>/export/', ExportArticleAPI.as_view(), name='export_article'),
+    path('api/auteurs/<int:auteur_id>/', AuteurDetailAPI.as_view(), name='auteur_detail_api'),
+    path('api/sentiments/approximatif/', SentimentApproximatifAPI.as_view(), name='sentiment_approximatif'),
+    path('api/search/', RechercheAPI.as_view(), name='recherche'),
     path('api/wordcloud/', WordCloudAPI.as_view(), name='wordcloud_global'),
     path('api/wordcloud/<int:article_id>/', WordCloudAPI.as_view(), name='wordcloud_article'),
 ]
\ No newline at end of file
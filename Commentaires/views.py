@@ -1,20 +1,31 @@
 from django.shortcuts import render, redirect
 from django.views import View
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.db import transaction
+from django.conf import settings
 import pandas as pd
+import contextlib
 import json
+import os
+import socket
 import threading
 import time
-from django.db import IntegrityError, DataError
+from django.db import IntegrityError, DataError, NotSupportedError
 from django.core.exceptions import ValidationError
 import hashlib
+import random
 
 from .models import *
 from .lefaso_scraper import LefasoCommentScraper
+from .async_fetcher import AsyncFetcher
+from .analyse_parallele import AnalyseurParallele
+from .html_cache import HTMLCache
+from .source_locale import ouvrir_source
+from .dates_fr import parse_date_article, parse_date_commentaire
+from .echantillonnage import plan_stratifie, EstimateurStratifie
 
 import re
 import emoji
@@ -119,107 +130,198 @@ class Home(View):
         return redirect('Commentaires:home')
 
     def lancer_scraping(self, request):
-        """Lance le scraping des URLs sélectionnées"""
+        """Met en file les URLs sélectionnées ; les workers (manage.py scrape_worker) s'en chargent"""
         urls_selectionnees = request.POST.getlist('urls_selectionnees')
         if not urls_selectionnees:
             messages.error(request, "Veuillez sélectionner au moins une URL à scraper")
             return redirect('Commentaires:home')
         
-        # Créer un historique de scraping
+        # Créer un historique de scraping, suivi par les workers
         historique = ScrapingHistory.objects.create(
             urls_selectionnees=json.dumps(urls_selectionnees),
             statut=ScrapingHistory.EN_COURS
         )
+        URLStorage.remettre_en_file(urls_selectionnees)
         
-        # Lancer le scraping en arrière-plan (thread)
-        thread = threading.Thread(
-            target=self.executer_scraping_background,
-            args=(urls_selectionnees, historique.id)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        messages.info(request, f"Scraping lancé pour {len(urls_selectionnees)} URL(s). Cette opération peut prendre quelques minutes.")
+        messages.info(request, f"{len(urls_selectionnees)} URL(s) mise(s) en file (lot n°{historique.id}). Elles seront traitées par les workers de scraping.")
         return redirect('Commentaires:home')
 
-    def executer_scraping_background(self, urls, historique_id):
-        """Exécute le scraping en arrière-plan"""
-        historique = ScrapingHistory.objects.get(id=historique_id)
+    @staticmethod
+    def identifiant_worker():
+        """Identifiant de détenteur de bail : hôte, processus et thread"""
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+    def executer_scraping_background(self, urls, historique_id=None, source=None, detenteur=None, analyseur=None):
+        """
+        Exécute le scraping d'un lot d'URLs (téléchargements concurrents, analyse au fil de l'eau)
+        
+        detenteur : worker qui a déjà réservé les URLs dans la file (scrape_worker) ;
+        sans détenteur, les URLs sont mises en file puis réservées ici.
+        source : source locale (répertoire de pages, cache ou WARC) à rejouer à la
+        place du réseau ; par défaut SCRAPER_SOURCE.
+        analyseur : AnalyseurParallele déjà démarré, réutilisé d'un lot à l'autre
+        (scrape_worker) ; sans analyseur, un pool est créé pour ce lot.
+        """
+        historique = ScrapingHistory.objects.get(id=historique_id) if historique_id else None
+        
+        if detenteur is None:
+            detenteur = self.identifiant_worker()
+            URLStorage.remettre_en_file(urls)
+            urls = [url_storage.url for url_storage in URLStorage.reclamer(detenteur, len(urls), urls=urls)]
+        reservees = {url_storage.url: url_storage for url_storage in URLStorage.objects.filter(url__in=urls)}
+        
+        if source is None and getattr(settings, 'SCRAPER_SOURCE', None):
+            source = ouvrir_source(settings.SCRAPER_SOURCE)
+        cache_dir = getattr(settings, 'SCRAPER_CACHE_DIR', None)
+        cache = HTMLCache(cache_dir) if cache_dir else None
+        scraper = LefasoCommentScraper(cache=cache, parser=getattr(settings, 'SCRAPER_PARSER', 'auto'), source=source)
+        if analyseur is not None:
+            pool = contextlib.nullcontext(analyseur)
+        else:
+            pool = AnalyseurParallele(
+                processus=getattr(settings, 'SCRAPER_PROCESSUS_ANALYSE', None),
+                parser=getattr(settings, 'SCRAPER_PARSER', 'auto'),
+            )
+        fetcher = AsyncFetcher(
+            concurrence=getattr(settings, 'SCRAPER_CONCURRENCE', 4),
+            requetes_par_seconde=getattr(settings, 'SCRAPER_REQUETES_PAR_SECONDE', 0.5),
+            rafale=getattr(settings, 'SCRAPER_RAFALE', 1),
+            timeout=getattr(settings, 'SCRAPER_TIMEOUT', 30),
+            headers=scraper.session.headers,
+            cache=cache,
+            source=source,
+        )
+        # Fils inchangés : comparés à l'empreinte enregistrée en base (et non au cache
+        # disque, qui peut survivre à une base restaurée ou à une transaction annulée)
+        hashs_connus = dict(
+            Article.objects.filter(url__in=urls, hash_commentaires__isnull=False).values_list('url', 'hash_commentaires')
+        )
+        
+        def pages():
+            for page in fetcher.iter_resultats(urls):
+                page['hash_commentaires_connu'] = hashs_connus.get(page['url'])
+                yield page
         
-        scraper = LefasoCommentScraper()
         resultats = []
         
         try:
-            for i, url in enumerate(urls, 1):
-                try:
-                    # Mettre à jour le statut de l'URL
-                    url_storage = URLStorage.objects.get(url=url)
-                    url_storage.statut = URLStorage.EN_COURS
-                    url_storage.save()
-                    
-                    # Exécuter le scraping
-                    data = scraper.scrape_article_comments(url)
-
-                    if data and not data.get('erreur'):
-                        # Enregistrer dans la base
-                        article_sauvegarde = self.sauvegarder_dans_base(data)
-                        resultat = {
-                            'url': url,
-                            'statut': 'succes',
-                            'article_id': article_sauvegarde.article_id,
-                            'commentaires': len(data.get('commentaires', [])),
-                            'reponses': data['statistiques'].get('total_reponses', 0)
-                        }
+            # Téléchargement dans un thread, analyse dans le pool de processus ;
+            # les résultats arrivent dans l'ordre où leur analyse se termine
+            with pool as analyseur:
+                for page, data in analyseur.iter_analyses(pages()):
+                    url = page['url']
+                    url_storage = reservees[url]
+                    tentative = ScrapeAttempt(
+                        url=url,
+                        detenteur=detenteur,
+                        statut_http=page.get('statut'),
+                        octets=page.get('octets') or 0,
+                        requetes=page.get('tentatives') or 0,
+                        duree_telechargement=page.get('duree') or 0.0,
+                        duree_analyse=page.get('duree_analyse') or 0.0,
+                    )
+                    try:
+                        if data and data.get('inchange'):
+                            # Commentaires identiques à la dernière analyse : ni parsing ni écriture
+                            resultat = {
+                                'url': url,
+                                'statut': 'inchange',
+                            }
+                            url_storage.terminer(detenteur)
+                            article = url_storage.article or Article.objects.filter(url=url).first()
+                            if article is not None:
+                                SuiviArticle.observer(article, article.total_interventions())
+                                tentative.commentaires_trouves = article.total_interventions()
+                            tentative.article = article
+                            tentative.statut = ScrapeAttempt.INCHANGE
                         
-                        url_storage.statut = URLStorage.TERMINE
-                        url_storage.article = article_sauvegarde
-                        url_storage.save()
+                        elif data and not data.get('erreur'):
+                            # Enregistrer dans la base
+                            mesures = {}
+                            debut = time.perf_counter()
+                            article_sauvegarde = self.sauvegarder_dans_base(data, mesures)
+                            tentative.duree_nettoyage = mesures['duree_nettoyage']
+                            tentative.duree_ecriture = time.perf_counter() - debut - mesures['duree_nettoyage']
+                            tentative.commentaires_trouves = mesures['trouves']
+                            tentative.commentaires_inseres = mesures['inseres']
+                            tentative.article = article_sauvegarde
+                            tentative.statut = ScrapeAttempt.SUCCES
+                            resultat = {
+                                'url': url,
+                                'statut': 'succes',
+                                'article_id': article_sauvegarde.article_id,
+                                'commentaires': len(data.get('commentaires', [])),
+                                'reponses': data['statistiques'].get('total_reponses', 0)
+                            }
+                            url_storage.terminer(detenteur, article_sauvegarde)
+                            SuiviArticle.observer(article_sauvegarde, article_sauvegarde.total_interventions())
                         
-                    else:
+                        else:
+                            resultat = {
+                                'url': url,
+                                'statut': 'erreur',
+                                'erreur': data.get('erreur', 'Erreur inconnue')
+                            }
+                            url_storage.echouer(detenteur, resultat['erreur'], definitif=page.get('statut') in (404, 410))
+                            tentative.statut = ScrapeAttempt.ERREUR
+                            tentative.erreur = resultat['erreur']
+                    
+                        resultats.append(resultat)
+                    
+                    except Exception as e:
                         resultat = {
                             'url': url,
                             'statut': 'erreur',
-                            'erreur': data.get('erreur', 'Erreur inconnue')
+                            'erreur': str(e)
                         }
-                        url_storage.statut = URLStorage.ERREUR
-                        url_storage.save()
-                    
-                    resultats.append(resultat)
-                    
-                    # Mettre à jour la progression
-                    historique.progression = int((i / len(urls)) * 100)
-                    historique.save()
-                    
-                    # Pause pour éviter de surcharger le serveur
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    resultat = {
-                        'url': url,
-                        'statut': 'erreur',
-                        'erreur': str(e)
-                    }
-                    resultats.append(resultat)
-                    
-                    url_storage = URLStorage.objects.get(url=url)
-                    url_storage.statut = URLStorage.ERREUR
-                    url_storage.save()
+                        resultats.append(resultat)
+                        url_storage.echouer(detenteur, e)
+                        tentative.statut = ScrapeAttempt.ERREUR
+                        tentative.erreur = str(e)
+                
+                    # Prolonger les baux restants, garder la trace de la tentative puis mettre
+                    # à jour la progression des lots : la tentative est enregistrée avant que
+                    # le lot puisse être clos (le flux d'événements s'arrête à la clôture)
+                    URLStorage.prolonger(detenteur)
+                    lots = ScrapingHistory.en_cours_pour([url])
+                    tentative.historique = historique or (lots[0] if lots else None)
+                    tentative.save()
+                    for lot in lots:
+                        lot.actualiser()
             
-            # Finaliser l'historique
-            historique.statut = ScrapingHistory.TERMINE
-            historique.resultats = json.dumps(resultats)
-            historique.date_fin = timezone.now()
-            historique.save()
+            # Actualiser l'historique : il n'est clos que si toutes ses URLs sont traitées
+            # (pas celles réservées par un autre worker ni celles en attente d'une nouvelle tentative)
+            if historique is not None:
+                historique.refresh_from_db()
+                if historique.statut == ScrapingHistory.EN_COURS:
+                    historique.actualiser()
             
         except Exception as e:
+            # Les URLs non traitées retournent dans la file
+            URLStorage.liberer(detenteur)
+            if historique is None:
+                raise
             historique.statut = ScrapingHistory.ERREUR
             historique.erreur = str(e)
             historique.save()
+        
+        return resultats
 
     
-    @transaction.atomic
-    def sauvegarder_dans_base(self, data):
-        """Sauvegarde les données scrapées dans la base de données"""
+    def sauvegarder_dans_base(self, data, mesures=None):
+        """
+        Sauvegarde les données scrapées dans la base de données
+
+        La préparation (empreintes, comparaison avec la base, nettoyage spaCy) se fait
+        hors transaction ; seule l'écriture groupée tient le verrou d'écriture SQLite
+        (transactions IMMEDIATE), le temps de quelques requêtes.
+
+        mesures : dictionnaire optionnel complété avec 'duree_nettoyage' (secondes
+        passées dans clean_comment), 'trouves' et 'inseres' (interventions).
+        """
+        if mesures is None:
+            mesures = {}
+        mesures.update(duree_nettoyage=0.0, trouves=0, inseres=0)
         
         def clean_comment(text: str) -> str:
             """
@@ -264,70 +366,220 @@ class Home(View):
         article_info = data
         commentaires_data = data.get("commentaires", [])
         stats = data.get("statistiques", {})
-        # Créer ou mettre à jour l'article
-        article, created = Article.objects.update_or_create(
-            article_id=self.extract_article_id(article_info.get("url", "")),
-            defaults={
-                "titre": article_info.get("titre", ""),
-                "url": article_info.get("url", ""),
-                "date_publication": article_info.get("date_publication"),
-                "categorie": article_info.get("categorie", ""),
-                "date_scraping": timezone.now(),
-                "nombre_commentaires": stats.get("total_commentaires", 0),
-                "nombre_reponses": stats.get("total_reponses", 0),
-            }
-        )
+        article_id = self.extract_article_id(article_info.get("url", ""))
+        date_article = parse_date_article(article_info.get("date_publication", ""))
 
-        # Sauvegarder les commentaires principaux
+        # Empreintes déjà en base pour cet article, en une seule requête (lecture, hors transaction)
+        existants = {}     # empreinte -> id (unique par article)
+        par_identite = {}  # (auteur normalisé, date) -> [(id, empreinte)], pour repérer les modifications
+        for pk, empreinte, auteur, date in (
+            Commentaire.objects.filter(article__article_id=article_id)
+            .order_by().values_list('id', 'empreinte', 'auteur', 'date_publication')
+        ):
+            existants[empreinte] = pk
+            par_identite.setdefault((Auteur.normaliser(auteur), (date or '').strip()), []).append((pk, empreinte))
+        
+        # Empreintes du scrape courant
+        frais = set()
         for comment_data in commentaires_data:
+            for donnees in [comment_data] + comment_data.get("reponses", []):
+                donnees['empreinte'] = Commentaire.calculer_empreinte(donnees.get("auteur", "Anonyme"), donnees.get("date_publication"), donnees.get("contenu", ""))
+                frais.add(donnees['empreinte'])
+                mesures['trouves'] += 1
+        
+        # Interventions à insérer et à corriger, écrites par lots à la fin : pas de
+        # Commentaire.save() (et de recalcul des statistiques de l'article) par ligne
+        maintenant = timezone.now()
+        a_modifier = []
+        a_creer = {}  # empreinte -> intervention à créer (une intervention postée deux fois n'est créée qu'une fois)
+        compteurs = {'nouveaux': 0, 'modifies': 0, 'inchanges': 0}
+        
+        def preparer(donnees, type_intervention, commentaire_id):
+            """Renvoie l'id de l'intervention si elle existe déjà (en préparant sa correction si elle a été modifiée), sinon l'intervention à créer"""
+            empreinte = donnees['empreinte']
+            if empreinte in existants:
+                compteurs['inchanges'] += 1
+                return existants[empreinte]
+            if empreinte in a_creer:
+                compteurs['inchanges'] += 1
+                return a_creer[empreinte]
             
-            contenu_brut = comment_data.get("contenu", "")
+            contenu_brut = donnees.get("contenu", "")
+            debut = time.perf_counter()
             contenu_propre = clean_comment(contenu_brut)
+            mesures['duree_nettoyage'] += time.perf_counter() - debut
+            
+            # Même auteur et même date, mais contenu absent du scrape : commentaire modifié
+            identite = (Auteur.normaliser(donnees.get("auteur", "Anonyme")), (donnees.get("date_publication") or '').strip())
+            for i, (pk, ancienne) in enumerate(par_identite.get(identite, [])):
+                if ancienne not in frais and existants.get(ancienne) == pk:
+                    par_identite[identite].pop(i)
+                    del existants[ancienne]
+                    a_modifier.append(Commentaire(
+                        pk=pk,
+                        contenu=contenu_brut,
+                        longueur_contenu=donnees.get("longueur_contenu", 0),
+                        mots_contenu=donnees.get("mots_contenu", 0),
+                        contenu_propre=contenu_propre,
+                        longueur_contenu_propre=len(contenu_propre),
+                        mots_contenu_propre=len(contenu_propre.split()),
+                        empreinte=empreinte,
+                    ))
+                    compteurs['modifies'] += 1
+                    return pk
+            
+            compteurs['nouveaux'] += 1
+            a_creer[empreinte] = Commentaire(
+                commentaire_id=commentaire_id,
+                auteur=donnees.get("auteur", "Anonyme"),
+                date_publication=donnees.get("date_publication"),
+                date_publication_dt=parse_date_commentaire(donnees.get("date_publication", ""), date_article),
+                contenu=contenu_brut,
+                type=type_intervention,
+                longueur_contenu=donnees.get("longueur_contenu", 0),
+                mots_contenu=donnees.get("mots_contenu", 0),
+                contenu_propre=contenu_propre,
+                longueur_contenu_propre=len(contenu_propre),
+                mots_contenu_propre=len(contenu_propre.split()),
+                date_extraction=maintenant,
+                empreinte=empreinte,
+            )
+            return a_creer[empreinte]
+        
+        # Commentaires principaux
+        principaux = []
+        for comment_data in commentaires_data:
             try:
-                commentaire = Commentaire.objects.create(
-                    article=article,
-                    commentaire_id=f"C{comment_data.get('id_commentaire', 0):03d}",
-                    auteur=comment_data.get("auteur", "Anonyme"),
-                    date_publication=comment_data.get("date_publication"),
-                    contenu=comment_data.get("contenu", ""),
-                    type=Commentaire.TYPE_COMMENTAIRE,
-                    longueur_contenu=comment_data.get("longueur_contenu", 0),
-                    mots_contenu=comment_data.get("mots_contenu", 0),
-                    contenu_propre=contenu_propre,
-                    longueur_contenu_propre=len(contenu_propre),
-                    mots_contenu_propre=len(contenu_propre.split()),
-                    date_extraction=timezone.now(),
-                )
-                print("✅ Commentaire créé :", commentaire)
+                principaux.append((preparer(comment_data, Commentaire.TYPE_COMMENTAIRE, f"C{comment_data.get('id_commentaire', 0):03d}"), comment_data))
             except Exception as e:
-                print("❌ Erreur lors de la création du commentaire :", e)
-                # import traceback
-                # traceback.print_exc()
-            # Sauvegarder les réponses associées
+                print("❌ Erreur lors de la préparation du commentaire :", e)
+        nombre_principaux = len(a_creer)
+        
+        # Réponses : celles dont le commentaire principal est à créer y sont rattachées après son insertion
+        parents = {}  # empreinte de la réponse à créer -> commentaire principal (id ou intervention à créer)
+        for principal, comment_data in principaux:
             for reponse_data in comment_data.get("reponses", []):
-                
-                contenu_brut = reponse_data.get("contenu", "")
-                contenu_propre = clean_comment(contenu_brut)
-                
-                Commentaire.objects.create(
-                    article=article,
-                    parent=commentaire,
-                    commentaire_id=f"C{comment_data.get('id_commentaire', 0):03d}R{reponse_data.get('id_commentaire', 0):02d}",
-                    auteur=reponse_data.get("auteur", "Anonyme"),
-                    date_publication=reponse_data.get("date_publication"),
-                    contenu=reponse_data.get("contenu", ""),
-                    type=Commentaire.TYPE_REPONSE,
-                    longueur_contenu=reponse_data.get("longueur_contenu", 0),
-                    mots_contenu=reponse_data.get("mots_contenu", 0),
-                    contenu_propre=contenu_propre,
-                    longueur_contenu_propre=len(contenu_propre),
-                    mots_contenu_propre=len(contenu_propre.split()),
-                    date_extraction=timezone.now(),
+                reponse = preparer(
+                    reponse_data,
+                    Commentaire.TYPE_REPONSE,
+                    f"C{comment_data.get('id_commentaire', 0):03d}R{reponse_data.get('id_commentaire', 0):02d}",
+                )
+                if isinstance(reponse, Commentaire) and reponse.type == Commentaire.TYPE_REPONSE:
+                    parents.setdefault(reponse.empreinte, principal)
+        
+        # Écriture : transaction courte, sans nettoyage ni analyse
+        with transaction.atomic():
+            # Créer ou mettre à jour l'article
+            article, created = Article.objects.update_or_create(
+                article_id=article_id,
+                defaults={
+                    "titre": article_info.get("titre", ""),
+                    "url": article_info.get("url", ""),
+                    "date_publication": article_info.get("date_publication"),
+                    "date_publication_dt": date_article,
+                    "categorie": article_info.get("categorie", ""),
+                    "date_scraping": timezone.now(),
+                    "nombre_commentaires": stats.get("total_commentaires", 0),
+                    "nombre_reponses": stats.get("total_reponses", 0),
+                    "hash_commentaires": data.get("hash_commentaires"),
+                }
+            )
+
+            # Résoudre les auteurs normalisés en une fois pour tout le fil
+            auteurs = Auteur.resoudre([intervention.auteur for intervention in a_creer.values()])
+            for intervention in a_creer.values():
+                intervention.article = article
+                intervention.profil_auteur = auteurs.get(Auteur.normaliser(intervention.auteur))
+            
+            # Commentaires principaux insérés par lots pour obtenir leurs ids, puis les réponses
+            nouveaux_principaux = self.inserer_par_lots(article, list(a_creer.values())[:nombre_principaux])
+            for empreinte, principal in parents.items():
+                a_creer[empreinte].parent_id = principal.pk if isinstance(principal, Commentaire) else principal
+            nouvelles_reponses = self.inserer_par_lots(article, list(a_creer.values())[nombre_principaux:])
+            interventions_creees = nouveaux_principaux + nouvelles_reponses
+            
+            if a_modifier:
+                Commentaire.objects.bulk_update(
+                    a_modifier,
+                    ['contenu', 'longueur_contenu', 'mots_contenu', 'contenu_propre', 'longueur_contenu_propre', 'mots_contenu_propre', 'empreinte'],
+                    batch_size=self.TAILLE_LOT_INSERTION,
                 )
+            
+            # Champs calculés, une seule fois pour tout le fil (une intervention écrite
+            # entre-temps par un autre worker a pu changer de parent)
+            if a_creer:
+                self.recalculer_nombre_reponses(article)
+                article.update_statistiques()
+
+            # Mise à jour incrémentale des agrégats journaliers et des compteurs auteurs
+            ActiviteJournaliere.enregistrer_commentaires(article, interventions_creees)
+            Auteur.enregistrer_commentaires(article, interventions_creees)
+        
+        # Interventions écrites entre-temps par un autre worker : déjà comptées par lui
+        concurrentes = len(a_creer) - len(interventions_creees)
+        compteurs['nouveaux'] -= concurrentes
+        compteurs['inchanges'] += concurrentes
+        mesures['inseres'] = compteurs['nouveaux']
+        print(f"♻️ {compteurs['nouveaux']} nouvelle(s) intervention(s), {compteurs['modifies']} modifiée(s), {compteurs['inchanges']} inchangée(s)")
 
         return article
 
 
+    TAILLE_LOT_INSERTION = 500
+
+    def inserer_par_lots(self, article, interventions):
+        """
+        Insère des interventions avec bulk_create (sans Commentaire.save()), renseigne
+        leurs ids et renvoie celles réellement créées
+
+        Insertion idempotente sur la clé (article, empreinte) : une intervention déjà
+        présente (écrite entre-temps par un autre worker) n'est pas dupliquée, seules
+        sa position dans le fil et son parent sont mis à jour ; elle n'est pas renvoyée,
+        pour ne pas être comptée deux fois dans les agrégats.
+        """
+        if not interventions:
+            return []
+        # Dans la transaction d'écriture (IMMEDIATE) : aucun autre worker ne peut insérer d'ici le bulk_create
+        empreintes = [intervention.empreinte for intervention in interventions]
+        deja_presentes = set()
+        for i in range(0, len(empreintes), self.TAILLE_LOT_INSERTION):
+            deja_presentes.update(
+                article.commentaires.filter(empreinte__in=empreintes[i:i + self.TAILLE_LOT_INSERTION])
+                .values_list('empreinte', flat=True)
+            )
+        
+        Commentaire.objects.bulk_create(
+            interventions,
+            batch_size=self.TAILLE_LOT_INSERTION,
+            update_conflicts=True,
+            unique_fields=['article', 'empreinte'],
+            update_fields=['commentaire_id', 'parent', 'type'],
+        )
+        
+        if interventions[0].pk is None:
+            # Base sans INSERT ... RETURNING : retrouver les ids par identifiant et empreinte
+            ids = {
+                (commentaire_id, empreinte): pk
+                for pk, commentaire_id, empreinte in article.commentaires
+                .filter(commentaire_id__in=[i.commentaire_id for i in interventions])
+                .values_list('id', 'commentaire_id', 'empreinte')
+            }
+            for intervention in interventions:
+                intervention.pk = ids.get((intervention.commentaire_id, intervention.empreinte))
+        return [intervention for intervention in interventions if intervention.empreinte not in deja_presentes]
+
+    @staticmethod
+    def recalculer_nombre_reponses(article):
+        """Nombre de réponses de chaque commentaire principal de l'article, en une requête"""
+        from django.db.models import OuterRef, Subquery
+        from django.db.models.functions import Coalesce
+        
+        reponses = (
+            Commentaire.objects.filter(parent=OuterRef('pk'))
+            .order_by().values('parent').annotate(nombre=Count('id')).values('nombre')
+        )
+        article.commentaires.filter(parent__isnull=True).update(nombre_reponses=Coalesce(Subquery(reponses), 0))
+
     def extract_article_id(self, url):
         return hashlib.md5(url.encode("utf-8")).hexdigest()
     
@@ -388,6 +640,164 @@ class APIScrapingStatus(View):
         ordering = ['-date_lancement']
         
         
+class APIScrapingEvenements(View):
+    """
+    Flux Server-Sent Events de l'avancement d'un lot de scraping
+
+    Les workers tournent dans d'autres processus : le flux relit la file et les
+    tentatives du lot (requêtes indexées, uniquement les nouveautés) et émet un
+    événement par étape et par URL :
+        demarre      URL réservée par un worker
+        telecharge   page téléchargée (statut HTTP, octets, durée)
+        analyse      page analysée (durée)
+        enregistre   interventions trouvées et insérées (durées de nettoyage et d'écriture)
+        echec        erreur de la tentative
+        progression  pages traitées, débit (pages/min) et temps restant estimé
+        fin          lot terminé, ou plus aucune URL du lot en attente ni en cours
+                     (lot abandonné) ; le flux se ferme
+    L'identifiant d'événement est celui de la dernière tentative transmise :
+    EventSource le renvoie (Last-Event-ID) en cas de reconnexion.
+    """
+    
+    INTERVALLE = 1.0       # secondes entre deux relectures de la base
+    DUREE_MAX = 30 * 60    # fermeture du flux (le navigateur se reconnecte)
+    
+    def get(self, request, historique_id):
+        historique = get_object_or_404(ScrapingHistory, id=historique_id)
+        try:
+            dernier_id = int(request.headers.get('Last-Event-ID') or request.GET.get('depuis') or 0)
+        except ValueError:
+            dernier_id = 0
+        
+        reponse = StreamingHttpResponse(self.iter_evenements(historique, dernier_id), content_type='text/event-stream')
+        reponse['Cache-Control'] = 'no-cache'
+        reponse['X-Accel-Buffering'] = 'no'
+        return reponse
+    
+    @staticmethod
+    def evenement(nom, donnees, identifiant=None):
+        lignes = [f"id: {identifiant}"] if identifiant is not None else []
+        lignes += [f"event: {nom}", f"data: {json.dumps(donnees)}"]
+        return "\n".join(lignes) + "\n\n"
+    
+    def iter_evenements(self, historique, dernier_id=0):
+        urls = json.loads(historique.urls_selectionnees or '[]')
+        demarrees = set()
+        debut = time.monotonic()
+        inactif = False
+        
+        yield "retry: 3000\n\n"
+        while True:
+            historique.refresh_from_db(fields=['statut', 'progression', 'date_fin', 'erreur'])
+            termine = historique.statut != ScrapingHistory.EN_COURS
+            
+            # Lot en cours sans URL en attente ni réservée (worker arrêté, URLs supprimées) :
+            # constaté deux relectures de suite, le temps que la dernière tentative soit écrite
+            actif = termine or URLStorage.objects.filter(
+                url__in=urls, statut__in=[URLStorage.EN_ATTENTE, URLStorage.EN_COURS]
+            ).exists()
+            abandonne, inactif = inactif and not actif, not actif
+            
+            # URLs réservées depuis la dernière relecture
+            en_cours = URLStorage.objects.filter(url__in=urls, statut=URLStorage.EN_COURS)
+            for url, detenteur in en_cours.values_list('url', 'bail_detenteur'):
+                if url not in demarrees:
+                    demarrees.add(url)
+                    yield self.evenement('demarre', {'url': url, 'worker': detenteur})
+            
+            # Tentatives terminées depuis la dernière relecture
+            nouvelles = list(historique.tentatives.filter(id__gt=dernier_id).order_by('id'))
+            for tentative in nouvelles:
+                dernier_id = tentative.id
+                demarrees.add(tentative.url)
+                if tentative.statut_http is not None:
+                    yield self.evenement('telecharge', {
+                        'url': tentative.url,
+                        'statut_http': tentative.statut_http,
+                        'octets': tentative.octets,
+                        'duree': tentative.duree_telechargement,
+                    })
+                if tentative.statut == ScrapeAttempt.ERREUR:
+                    yield self.evenement('echec', {'url': tentative.url, 'erreur': tentative.erreur}, dernier_id)
+                    continue
+                yield self.evenement('analyse', {'url': tentative.url, 'duree': tentative.duree_analyse})
+                yield self.evenement('enregistre', {
+                    'url': tentative.url,
+                    'statut': tentative.statut,
+                    'trouves': tentative.commentaires_trouves,
+                    'inseres': tentative.commentaires_inseres,
+                    'duree_nettoyage': tentative.duree_nettoyage,
+                    'duree_ecriture': tentative.duree_ecriture,
+                }, dernier_id)
+            
+            if abandonne:
+                # Clôt le lot si toutes ses URLs ont été traitées
+                historique.actualiser()
+            if nouvelles or termine or abandonne:
+                yield self.evenement('progression', self.progression(historique, urls), dernier_id)
+            if termine or abandonne:
+                erreur = historique.erreur or None
+                if historique.statut == ScrapingHistory.EN_COURS:
+                    erreur = "Aucune URL du lot en attente ni en cours"
+                yield self.evenement('fin', {'statut': historique.statut, 'erreur': erreur}, dernier_id)
+                return
+            
+            if time.monotonic() - debut > self.DUREE_MAX:
+                return
+            yield ": attente\n\n"  # commentaire SSE : garde la connexion ouverte
+            time.sleep(self.INTERVALLE)
+    
+    @staticmethod
+    def progression(historique, urls):
+        """Pages traitées, débit depuis la première tentative et temps restant estimé"""
+        from django.db.models import Min
+        
+        traitees = URLStorage.objects.filter(url__in=urls, statut__in=[URLStorage.TERMINE, URLStorage.ERREUR]).count()
+        premiere = historique.tentatives.aggregate(premiere=Min('date'))['premiere']
+        minutes = (timezone.now() - premiere).total_seconds() / 60 if premiere else 0
+        debit = traitees / minutes if minutes > 0 else None
+        restantes = len(urls) - traitees
+        return {
+            'progression': historique.progression,
+            'traitees': traitees,
+            'total': len(urls),
+            'pages_par_minute': round(debit, 1) if debit else None,
+            'restant_secondes': round(restantes / debit * 60) if debit and restantes else (0 if not restantes else None),
+        }
+
+
+class AnalyticsContext:
+    """
+    Mémoïsation des métriques par article le temps d'une requête
+
+    Chaque article n'est analysé qu'une fois (sentiments, engagement, mots-clés) ;
+    les agrégats globaux sont dérivés de ces résultats par article.
+    """
+
+    def __init__(self, view, articles):
+        self.view = view
+        self.articles = list(articles)
+        self._sentiments = {}
+        self._engagements = {}
+        self._mots_cles = {}
+
+    def sentiments(self, article: Article) -> Dict[str, Any]:
+        if article.pk not in self._sentiments:
+            self._sentiments[article.pk] = self.view.analyze_article_sentiments(article)
+        return self._sentiments[article.pk]
+
+    def engagement(self, article: Article) -> float:
+        if article.pk not in self._engagements:
+            self._engagements[article.pk] = self.view.calculate_engagement_rate(article)
+        return self._engagements[article.pk]
+
+    def mots_cles(self, article: Article, limit=10) -> List[str]:
+        cle = (article.pk, limit)
+        if cle not in self._mots_cles:
+            self._mots_cles[cle] = [word for word, freq in self.view.get_word_frequency([article], limit)]
+        return self._mots_cles[cle]
+
+
 class AnalyticsView(View):
     """Vue principale pour le tableau de bord analytics"""
     
@@ -550,49 +960,64 @@ class AnalyticsView(View):
         # return word_freq.most_common(limit)
         return [[word, freq] for word, freq in word_freq.most_common(limit)]
     
-    def get_activity_timeline(self, days=30) -> Dict[str, List]:
-        """Génère les données d'activité par date"""
-        end_date = timezone.now()
+    def get_activity_timeline(self, days=30, article=None, categorie=None, base='extraction') -> Dict[str, List]:
+        """
+        Génère les données d'activité par date
+
+        base='extraction' lit les agrégats journaliers (date de scraping),
+        base='publication' compte les interventions par date de publication réelle.
+        """
+        end_date = timezone.localdate()
         start_date = end_date - timedelta(days=days)
         
-        # Compter les commentaires par date
-        activity_data = (
-            Commentaire.objects
-            .filter(date_extraction__gte=start_date)
-            .extra({'date': "DATE(date_extraction)"})
-            .values('date')
-            .annotate(count=Count('id'))
-            .order_by('date')
-        )
-        
-        # Créer un DataFrame pour gérer les dates manquantes
-        date_range = pd.date_range(start=start_date.date(), end=end_date.date())
-        df = pd.DataFrame(date_range, columns=['date'])
-        df['date_str'] = df['date'].dt.strftime('%Y-%m-%d')
+        if base == 'publication':
+            activite = self.get_publication_counts(start_date, end_date, article=article, categorie=categorie)
+        else:
+            # Une ligne d'agrégat par jour actif dans la fenêtre
+            lignes = ActiviteJournaliere.serie(start_date, end_date, article=article, categorie=categorie)
+            activite = {jour: ligne.total_interventions() for jour, ligne in lignes.items()}
         
-        # Fusionner avec les données réelles
-        # activity_dict = {item['date'].strftime('%Y-%m-%d'): item['count'] for item in activity_data}
-        # df['count'] = df['date_str'].map(activity_dict).fillna(0)
-        activity_dict = {item['date']: item['count'] for item in activity_data}
-        df['count'] = df['date_str'].map(activity_dict).fillna(0)
+        # Compléter les jours sans activité
+        labels = []
+        data = []
+        for offset in range(days + 1):
+            jour = start_date + timedelta(days=offset)
+            labels.append(jour.strftime('%Y-%m-%d'))
+            data.append(activite.get(jour, 0))
     
         return {
-            'labels': df['date_str'].tolist(),
-            'data': df['count'].astype(int).tolist()
+            'labels': labels,
+            'data': data
         }
     
-    def get_top_authors(self, limit=10) -> Dict[str, List]:
-        """Retourne les auteurs les plus actifs"""
-        authors = (
-            Commentaire.objects
-            .values('auteur')
+    def get_publication_counts(self, start_date, end_date, article=None, categorie=None) -> Dict[Any, int]:
+        """Compte les interventions par jour de publication (parcours d'index sur date_publication_dt)"""
+        from django.db.models.functions import TruncDate
+        
+        debut = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        fin = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        
+        commentaires = Commentaire.objects.filter(date_publication_dt__gte=debut, date_publication_dt__lt=fin)
+        if article is not None:
+            commentaires = commentaires.filter(article=article)
+        elif categorie:
+            commentaires = commentaires.filter(article__categorie=categorie)
+        
+        activity_data = (
+            commentaires
+            .annotate(jour=TruncDate('date_publication_dt'))
+            .values('jour')
             .annotate(count=Count('id'))
-            .order_by('-count')[:limit]
         )
+        return {item['jour']: item['count'] for item in activity_data}
+    
+    def get_top_authors(self, limit=10) -> Dict[str, List]:
+        """Retourne les auteurs les plus actifs"""
+        authors = Auteur.objects.order_by('-nombre_interventions').only('nom', 'nombre_interventions')[:limit]
         
         return {
-            'labels': [author['auteur'] for author in authors],
-            'data': [author['count'] for author in authors]
+            'labels': [author.nom for author in authors],
+            'data': [author.nombre_interventions for author in authors]
         }
     
     def calculate_engagement_rate(self, article: Article) -> float:
@@ -611,28 +1036,32 @@ class AnalyticsView(View):
     def get(self, request, *args, **kwargs):
         """Affiche le tableau de bord analytics"""
         
-        # Récupérer tous les articles
+        # Récupérer tous les articles (une seule fois pour toute la requête)
         articles = Article.objects.all().prefetch_related('commentaires')
+        contexte = AnalyticsContext(self, articles)
         
         # Statistiques globales
-        total_articles = articles.count()
+        total_articles = len(contexte.articles)
         total_commentaires = Commentaire.objects.count()
-        auteurs_uniques = Commentaire.objects.values('auteur').distinct().count()
+        # Estimation HyperLogLog (erreur type ≈ 2.3 %), fusion des sketches journaliers
+        auteurs_uniques = ActiviteJournaliere.auteurs_distincts()
         
         # Analyse des sentiments globaux
-        sentiment_global = self.analyze_article_sentiments_global(articles)
+        sentiment_global = self.analyze_article_sentiments_global(contexte.articles, contexte)
         
-        # Données pour les graphiques
-        activite_par_date = self.get_activity_timeline()
+        # Données pour les graphiques (?jours=365&base=publication)
+        try:
+            jours = max(1, min(int(request.GET.get('jours', 30)), 3650))
+        except ValueError:
+            jours = 30
+        activite_par_date = self.get_activity_timeline(jours, base=request.GET.get('base', 'extraction'))
         top_auteurs = self.get_top_authors()
-        mots_frequents = self.get_word_frequency()
+        mots_frequents = self.get_word_frequency(contexte.articles)
         
         # Préparer les données pour chaque article
         articles_data = []
-        for article in articles:
-            sentiments = self.analyze_article_sentiments(article)
-            taux_engagement = self.calculate_engagement_rate(article)
-            mots_cles = [word for word, freq in self.get_word_frequency([article], 10)]
+        for article in contexte.articles:
+            sentiments = contexte.sentiments(article)
             
             articles_data.append({
                 'id': article.id,
@@ -643,9 +1072,9 @@ class AnalyticsView(View):
                 'categorie': article.categorie,
                 'nombre_commentaires': article.nombre_commentaires,
                 'nombre_reponses': article.nombre_reponses,
-                'taux_engagement': taux_engagement,
+                'taux_engagement': contexte.engagement(article),
                 'sentiment_moyen': sentiments['moyen'],
-                'mots_cles': mots_cles,
+                'mots_cles': contexte.mots_cles(article),
                 'sentiments': sentiments
             })
         print(json.dumps(activite_par_date))
@@ -655,7 +1084,7 @@ class AnalyticsView(View):
             'total_articles': total_articles,
             'total_commentaires': total_commentaires,
             'auteurs_uniques': auteurs_uniques,
-            'taux_engagement': self.calculate_global_engagement_rate(articles),
+            'taux_engagement': self.calculate_global_engagement_rate(contexte.articles, contexte),
             
             # Analyse des sentiments
             'sentiment_positif': sentiment_global['positif'],
@@ -673,13 +1102,23 @@ class AnalyticsView(View):
         
         return render(request, 'Commentaires/analytics.html', context)
     
-    def analyze_article_sentiments_global(self, articles) -> Dict[str, float]:
-        """Analyse les sentiments sur tous les articles"""
-        all_sentiments = []
+    def analyze_article_sentiments_global(self, articles, contexte=None, approximatif=False, taille_echantillon=400, confiance=0.95) -> Dict[str, float]:
+        """
+        Analyse les sentiments sur tous les articles
+
+        approximatif=True n'analyse qu'un échantillon stratifié par article et renvoie
+        en plus les intervalles de confiance (voir iter_sentiments_approximatifs).
+        """
+        if approximatif:
+            estimation = None
+            for estimation in self.iter_sentiments_approximatifs(articles, taille_echantillon, confiance=confiance):
+                pass
+            return estimation
         
-        for article in articles:
-            sentiments = self.analyze_article_sentiments(article)
-            all_sentiments.append(sentiments)
+        if contexte is None:
+            contexte = AnalyticsContext(self, articles)
+        
+        all_sentiments = [contexte.sentiments(article) for article in contexte.articles]
         
         if not all_sentiments:
             return {'positif': 0, 'negatif': 0, 'neutre': 100}
@@ -700,13 +1139,48 @@ class AnalyticsView(View):
             'neutre': round(neutre, 1)
         }
     
-    def calculate_global_engagement_rate(self, articles) -> float:
+    def iter_sentiments_approximatifs(self, articles, taille_echantillon=400, taille_lot=50, confiance=0.95, graine=None):
+        """
+        Estime progressivement les sentiments sur un échantillon stratifié
+        
+        Les commentaires sont tirés par article, proportionnellement au nombre de
+        commentaires de chacun ; une estimation (pourcentages et intervalles de
+        confiance) est produite après chaque lot analysé et s'affine jusqu'à la
+        taille d'échantillon demandée.
+        """
+        strates = {}
+        for commentaire_id, article_id in Commentaire.objects.filter(article__in=articles).values_list('id', 'article_id'):
+            strates.setdefault(article_id, []).append(commentaire_id)
+        
+        plan = plan_stratifie(strates, taille_echantillon, random.Random(graine))
+        estimateur = EstimateurStratifie({article_id: len(ids) for article_id, ids in strates.items()})
+        
+        if not plan:
+            yield estimateur.estimation(confiance)
+            return
+        
+        for debut in range(0, len(plan), taille_lot):
+            lot = plan[debut:debut + taille_lot]
+            textes = {
+                commentaire.pk: commentaire.contenu_propre if commentaire.contenu_propre else commentaire.contenu
+                for commentaire in Commentaire.objects.filter(pk__in=[identifiant for _, identifiant in lot]).only('id', 'contenu', 'contenu_propre')
+            }
+            for article_id, identifiant in lot:
+                sentiment = self.get_sentiment_bert(textes.get(identifiant, ''))
+                estimateur.ajouter(article_id, sentiment['label'])
+            
+            yield estimateur.estimation(confiance)
+    
+    def calculate_global_engagement_rate(self, articles, contexte=None) -> float:
         """Calcule le taux d'engagement global"""
-        if not articles:
+        if contexte is None:
+            contexte = AnalyticsContext(self, articles)
+        
+        if not contexte.articles:
             return 0.0
         
-        total_engagement = sum(self.calculate_engagement_rate(article) for article in articles)
-        return round(total_engagement / len(articles), 1)
+        total_engagement = sum(contexte.engagement(article) for article in contexte.articles)
+        return round(total_engagement / len(contexte.articles), 1)
 
 
 class ArticleDetailAPI(View):
@@ -746,6 +1220,72 @@ class ArticleDetailAPI(View):
             return "Neutre"
 
 
+class SentimentApproximatifAPI(View):
+    """API d'estimation progressive des sentiments sur une large sélection d'articles"""
+    
+    def get(self, request):
+        articles = Article.objects.all()
+        if request.GET.get('articles'):
+            ids = [int(i) for i in request.GET['articles'].split(',') if i.strip().isdigit()]
+            articles = articles.filter(id__in=ids)
+        if request.GET.get('categorie'):
+            articles = articles.filter(categorie=request.GET['categorie'])
+        
+        try:
+            taille_echantillon = int(request.GET.get('echantillon', 400))
+            taille_lot = max(1, int(request.GET.get('lot', 50)))
+            confiance = float(request.GET.get('confiance', 0.95))
+        except ValueError:
+            return JsonResponse({'erreur': 'Paramètres invalides'}, status=400)
+        # Vérifié avant le début du flux : une erreur pendant l'itération le tronquerait
+        if not 0 < confiance < 1:
+            return JsonResponse({'erreur': 'confiance doit être strictement comprise entre 0 et 1'}, status=400)
+        if taille_echantillon < 0:
+            return JsonResponse({'erreur': 'echantillon doit être positif'}, status=400)
+        
+        analytics_view = AnalyticsView()
+        estimations = analytics_view.iter_sentiments_approximatifs(articles, taille_echantillon, taille_lot, confiance)
+        
+        # Une ligne JSON par lot analysé : le client affiche l'estimation qui s'affine
+        return StreamingHttpResponse(
+            (json.dumps(estimation) + "\n" for estimation in estimations),
+            content_type='application/x-ndjson'
+        )
+
+
+class AuteurDetailAPI(View):
+    """API pour l'activité d'un auteur (lecture indexée, sans parcours des commentaires)"""
+    
+    def get(self, request, auteur_id):
+        auteur = get_object_or_404(Auteur, id=auteur_id)
+        
+        derniers = (
+            auteur.commentaires
+            .select_related('article')
+            .order_by('-date_extraction')[:20]
+        )
+        
+        return JsonResponse({
+            'id': auteur.id,
+            'nom': auteur.nom,
+            'nombre_commentaires': auteur.nombre_commentaires,
+            'nombre_reponses': auteur.nombre_reponses,
+            'nombre_interventions': auteur.nombre_interventions,
+            'nombre_articles': auteur.nombre_articles,
+            'derniere_activite': auteur.derniere_activite.isoformat() if auteur.derniere_activite else None,
+            'derniers_commentaires': [
+                {
+                    'article_id': commentaire.article.id,
+                    'titre_article': commentaire.article.titre,
+                    'type': commentaire.type,
+                    'date_publication': commentaire.date_publication,
+                    'contenu': commentaire.contenu,
+                }
+                for commentaire in derniers
+            ],
+        })
+
+
 class AnalyzeArticleAPI(View):
     """API pour lancer une analyse approfondie d'un article"""
     
@@ -868,3 +1408,40 @@ class WordCloudAPI(View):
         })
 
 
+
+
+class RechercheAPI(View):
+    """API de recherche plein texte dans les commentaires (FTS5, classement BM25)"""
+    
+    def get(self, request):
+        requete = request.GET.get('q', '').strip()
+        if not requete:
+            return JsonResponse({'erreur': 'Paramètre q requis'}, status=400)
+        try:
+            article = int(request.GET['article']) if request.GET.get('article') else None
+            page = int(request.GET.get('page', 1))
+            taille = int(request.GET.get('taille', 20))
+        except ValueError:
+            return JsonResponse({'erreur': 'Paramètres invalides'}, status=400)
+        
+        # Lemmes de la requête : contenu_propre est lemmatisé par clean_comment
+        lemmes = {token.text: token.lemma_ for token in nlp(requete.lower()) if token.is_alpha}
+        
+        debut = time.perf_counter()
+        try:
+            resultats = Commentaire.rechercher(
+                requete,
+                article=article,
+                categorie=request.GET.get('categorie') or None,
+                page=page,
+                taille=taille,
+                lemmes=lemmes,
+            )
+        except ValueError as e:
+            return JsonResponse({'erreur': str(e)}, status=400)
+        except NotSupportedError as e:
+            return JsonResponse({'erreur': str(e)}, status=501)
+        
+        resultats['requete'] = requete
+        resultats['duree_ms'] = round((time.perf_counter() - debut) * 1000, 2)
+        return JsonResponse(resultats)